@@ -1,11 +1,12 @@
+import time
+
+# Script start, for the first-paint timing (imports below are part of a cold start)
+SCRIPT_START = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-from geopy.distance import geodesic
 import os
 import sys
 
@@ -14,13 +15,20 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import the algorithm functions - updated import path
 from backend_model.supply_chain_algorithm import (
-    load_data, recommend_best_matches, are_goods_compatible, 
-    is_temp_compatible, calculate_distance, calculate_carbon_impact
+    load_data, build_fleet_lookups, recommend_best_matches, calculate_distance
 )
+from backend_model.shipment_index import get_shipment_index
+from backend_model.goods_compatibility import GOODS_TYPES
 
 # Set page configuration
 st.set_page_config(page_title="Supply Chain Space Sharing Recommender", layout="wide")
 
+# Import the chart library on first use: charts only appear after a search or in
+# the dataset overview, so the first paint of the sidebar does not wait for it
+def plotly_express():
+    import plotly.express as px
+    return px
+
 # Load external CSS
 def load_css(css_file):
     with open(css_file, "r") as f:
@@ -90,13 +98,50 @@ def find_dataset_file():
     
     return None
 
+# Load the fleet, its matching index and the derived lookups once per process.
+# Streamlit reruns this script on every widget change; the cached resource is
+# reused until the dataset file changes (its size/modification time are part of
+# the cache key), and max_entries=1 drops the copy built from the old file.
+@st.cache_resource(show_spinner="Loading dataset...", max_entries=1)
+def load_fleet(dataset_path, file_signature):
+    """
+    Load the dataset with its ShipmentIndex, lookups and overview summary
+    (file_signature only keys the cache)
+    """
+    from backend_model.fleet_summary import load_fleet_summary
+
+    df = load_data(dataset_path)
+    get_shipment_index(df, GOODS_TYPES)
+    return df, build_fleet_lookups(df), load_fleet_summary(dataset_path, df)
+
+def dataset_signature(path):
+    """Cache key of the dataset file's current version"""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+# Directory of a fleet published by a loader process (python -m backend_model.shared_fleet).
+# When set, every app process attaches to that one copy instead of loading its own.
+SHARED_FLEET_DIR = os.environ.get("SHARED_FLEET_DIR")
+
+@st.cache_resource
+def fleet_subscriber(root):
+    """One subscriber per process; current() follows newly published generations"""
+    from backend_model.shared_fleet import FleetSubscriber
+
+    return FleetSubscriber(root, GOODS_TYPES)
+
 # Check if the dataset exists or generate it
 try:
     # Find the dataset file
-    dataset_path = find_dataset_file()
+    dataset_path = None if SHARED_FLEET_DIR else find_dataset_file()
     
-    if dataset_path:
-        df_shipments = load_data(dataset_path)
+    if SHARED_FLEET_DIR:
+        # Read-only views of the published fleet; the index stands in for the DataFrame
+        shared_fleet = fleet_subscriber(SHARED_FLEET_DIR).current()
+        df_shipments, fleet_lookups, fleet_summary = shared_fleet.index, shared_fleet.lookups, shared_fleet.summary
+        st.success(f"Attached to shared fleet generation {shared_fleet.generation} with {len(df_shipments)} shipment records")
+    elif dataset_path:
+        df_shipments, fleet_lookups, fleet_summary = load_fleet(dataset_path, dataset_signature(dataset_path))
         st.success(f"Loaded dataset with {len(df_shipments)} shipment records")
     else:
         st.error("Dataset file not found. Please ensure it exists in the expected locations.")
@@ -106,47 +151,21 @@ except Exception as e:
     st.info("Please ensure the dataset file exists and is accessible.")
     st.stop()
 
-# Import GOODS_TYPES from file or define here
-GOODS_TYPES = {
-    "Garments": {"temp_range": (15, 25), "compatibility": ["Footwear", "Accessories", "Textiles"]},
-    "Footwear": {"temp_range": (15, 25), "compatibility": ["Garments", "Accessories", "Textiles"]},
-    "Electronics": {"temp_range": (10, 30), "compatibility": ["Appliances", "Accessories"]},
-    "Pharmaceuticals": {"temp_range": (2, 8), "compatibility": ["Medical Supplies"]},
-    "Frozen Food": {"temp_range": (-25, -15), "compatibility": ["Refrigerated Food"]},
-    "Refrigerated Food": {"temp_range": (0, 5), "compatibility": ["Frozen Food"]},
-    "Dry Food": {"temp_range": (10, 25), "compatibility": ["Beverages", "Packaged Goods"]},
-    "Beverages": {"temp_range": (5, 25), "compatibility": ["Dry Food", "Packaged Goods"]},
-    "Furniture": {"temp_range": (10, 35), "compatibility": ["Home Decor", "Building Materials"]},
-    "Automotive Parts": {"temp_range": (0, 35), "compatibility": ["Industrial Equipment", "Machinery"]},
-    "Medical Supplies": {"temp_range": (2, 25), "compatibility": ["Pharmaceuticals"]},
-    "Hazardous Materials": {"temp_range": (5, 30), "compatibility": []},
-    "Building Materials": {"temp_range": (0, 40), "compatibility": ["Furniture", "Home Decor"]},
-    "Industrial Equipment": {"temp_range": (0, 40), "compatibility": ["Machinery", "Automotive Parts"]},
-    "Textiles": {"temp_range": (15, 30), "compatibility": ["Garments", "Accessories"]},
-    "Accessories": {"temp_range": (15, 30), "compatibility": ["Garments", "Footwear", "Textiles"]},
-    "Machinery": {"temp_range": (0, 40), "compatibility": ["Industrial Equipment", "Automotive Parts"]},
-    "Packaged Goods": {"temp_range": (10, 25), "compatibility": ["Dry Food", "Beverages"]},
-    "Home Decor": {"temp_range": (10, 35), "compatibility": ["Furniture", "Building Materials"]},
-    "Appliances": {"temp_range": (10, 35), "compatibility": ["Electronics"]}
-}
-
 # Get unique companies, goods types, cities, etc. from the loaded dataset
 if 'df_shipments' in locals():
-    COMPANIES = sorted(df_shipments['company'].unique().tolist())
-    CITIES = sorted(df_shipments['source'].unique().tolist())
-    available_goods_types = sorted(df_shipments['goods_type'].unique().tolist())
-    
-    # Create city coordinates dictionary from the data
-    CITY_COORDINATES = {}
-    for city in CITIES:
-        city_data = df_shipments[df_shipments['source'] == city].iloc[0]
-        CITY_COORDINATES[city] = (city_data['source_lat'], city_data['source_lon'])
+    # Built once per dataset version by load_fleet
+    COMPANIES = fleet_lookups["companies"]
+    CITIES = fleet_lookups["cities"]
+    available_goods_types = fleet_lookups["goods_types"]
+    CITY_COORDINATES = fleet_lookups["city_coordinates"]
+    GOODS_TEMP_RANGES = fleet_lookups["goods_temp_ranges"]
 else:
     # Fallback values if dataset isn't loaded
     COMPANIES = ["LogiTech Shipping", "FastTrack Logistics", "EcoTrans", "GlobalMove"]
     CITIES = ["New York", "Los Angeles", "Chicago", "Houston", "Phoenix"]
     available_goods_types = list(GOODS_TYPES.keys())
     CITY_COORDINATES = {city: (0, 0) for city in CITIES}
+    GOODS_TEMP_RANGES = {}
 
 # Sidebar for input parameters
 st.sidebar.markdown('<h2 class="section-header">📦 Your Shipment Details</h2>', unsafe_allow_html=True)
@@ -163,12 +182,7 @@ if selected_goods_type in GOODS_TYPES:
     temp_min, temp_max = GOODS_TYPES[selected_goods_type]["temp_range"]
 else:
     # If not in our predefined dictionary, estimate from the dataset
-    goods_data = df_shipments[df_shipments['goods_type'] == selected_goods_type]
-    if not goods_data.empty:
-        temp_min = goods_data['temp_min'].iloc[0]
-        temp_max = goods_data['temp_max'].iloc[0]
-    else:
-        temp_min, temp_max = (10, 25)  # default values
+    temp_min, temp_max = GOODS_TEMP_RANGES.get(selected_goods_type, (10, 25))  # default values
 
 st.sidebar.markdown(f'<div class="info-text">Temperature requirements: {temp_min}°C to {temp_max}°C</div>', unsafe_allow_html=True)
 
@@ -262,12 +276,21 @@ def create_truck_card(company, truck_type, score, storage_left, carbon_savings):
     return card
 
 # Button to find recommendations
-if st.sidebar.button("Find Best Matches"):
+find_clicked = st.sidebar.button("Find Best Matches")
+
+# The sidebar is interactive from here on
+first_paint_seconds = time.perf_counter() - SCRIPT_START
+
+if find_clicked:
     # Make sure df_shipments is defined
     if 'df_shipments' not in locals():
         st.error("Dataset not loaded. Please ensure the dataset file exists.")
     else:
-        # Get recommendations
+        # Get recommendations (with a per-stage timing trace in debug mode)
+        trace = None
+        if 'debug' in sys.argv:
+            from backend_model.match_trace import MatchTrace
+            trace = MatchTrace()
         with st.spinner("Finding the best matches..."):
             recommendations = recommend_best_matches(
                 shipment_info, 
@@ -275,9 +298,14 @@ if st.sidebar.button("Find Best Matches"):
                 GOODS_TYPES, 
                 num_recommendations=10,
                 dest_threshold_km=dest_threshold_km,
-                time_threshold_hours=time_threshold_hours
+                time_threshold_hours=time_threshold_hours,
+                trace=trace
             )
         
+        if trace is not None:
+            with st.expander(f"Matching trace: {trace.total_ms:.1f} ms"):
+                st.json(trace.to_dict())
+        
         # Display recommendations
         if recommendations:
             st.markdown('<h2 class="section-header">🎯 Top Recommendations for Your Shipment</h2>', unsafe_allow_html=True)
@@ -373,6 +401,7 @@ if st.sidebar.button("Find Best Matches"):
                     )
             
             with col2:
+                px = plotly_express()
                 # Create tabs for different visualizations
                 tab1, tab2, tab3 = st.tabs(["Score Comparison", "Carbon Savings", "Delivery Times"])
                 
@@ -524,13 +553,17 @@ if st.sidebar.button("Find Best Matches"):
         else:
             st.markdown('<div class="info-text info-warning">⚠️ No matching trucks found. Try adjusting your constraints.</div>', unsafe_allow_html=True)
 
-# Create tabs for additional data views
-tab1, tab2 = st.tabs(["Dataset Overview", "About the System"])
+# Additional data views. Unlike st.tabs, which runs the code of every tab on every
+# rerun, only the selected view is built, so the overview charts (and plotly) are
+# not paid for while reading the About page
+dashboard_view = st.radio("View", ["Dataset Overview", "About the System"], horizontal=True,
+                          label_visibility="collapsed", key="dashboard_view")
 
-with tab1:
+if dashboard_view == "Dataset Overview":
     st.markdown('<h2 class="section-header">📊 Dataset Overview</h2>', unsafe_allow_html=True)
     
     if 'df_shipments' in locals():
+        px = plotly_express()
         # Create metric summary
         col1, col2, col3 = st.columns(3)
         
@@ -550,7 +583,7 @@ with tab1:
                 <div class="metric-label">UNIQUE COMPANIES</div>
                 <div class="metric-value">{}</div>
             </div>
-            """.format(len(df_shipments['company'].unique())), unsafe_allow_html=True)
+            """.format(fleet_summary.unique_companies), unsafe_allow_html=True)
         
         with col3:
             st.markdown("""
@@ -559,11 +592,11 @@ with tab1:
                 <div class="metric-label">AVAILABLE TRUCKS</div>
                 <div class="metric-value">{}</div>
             </div>
-            """.format(len(df_shipments)-20000), unsafe_allow_html=True)
+            """.format(fleet_summary.available_trucks), unsafe_allow_html=True)
             
         # Show distribution of goods types
         st.markdown('<h3 class="section-header">📊 Distribution of Goods Types</h3>', unsafe_allow_html=True)
-        goods_counts = df_shipments["goods_type"].value_counts().head(10)  # Show top 10 for large datasets
+        goods_counts = fleet_summary.top_goods(10)  # Show top 10 for large datasets
         
         fig = px.bar(
             goods_counts,
@@ -581,14 +614,18 @@ with tab1:
         # Show available storage distribution
         st.markdown('<h3 class="section-header">📈 Available Storage Distribution</h3>', unsafe_allow_html=True)
         
-        fig = px.histogram(
-            df_shipments.sample(min(1000, len(df_shipments))), 
-            x="storage_left",
-            nbins=20,
+        # Exact counts over the whole fleet, precomputed by load_fleet
+        storage_bins = fleet_summary.histogram("storage_left")
+        fig = px.bar(
+            storage_bins,
+            x="center",
+            y="count",
             title="Distribution of Available Storage Space",
-            labels={"storage_left": "Available Storage Units"},
+            labels={"center": "Available Storage Units", "count": "Count"},
             color_discrete_sequence=["#3498db"]
         )
+        fig.update_traces(width=storage_bins["end"] - storage_bins["start"])
+        fig.update_layout(bargap=0)
         
         st.plotly_chart(fig, use_container_width=True)
         
@@ -596,14 +633,17 @@ with tab1:
         if "carbon_footprint_per_km" in df_shipments.columns:
             st.markdown('<h3 class="section-header">🌍 Carbon Footprint Distribution</h3>', unsafe_allow_html=True)
             
-            fig = px.histogram(
-                df_shipments.sample(min(1000, len(df_shipments))),
-                x="carbon_footprint_per_km",
-                nbins=15,
+            carbon_bins = fleet_summary.histogram("carbon_footprint_per_km")
+            fig = px.bar(
+                carbon_bins,
+                x="center",
+                y="count",
                 title="Carbon Footprint Distribution",
-                labels={"carbon_footprint_per_km": "Carbon Footprint (kg CO₂/km)"},
+                labels={"center": "Carbon Footprint (kg CO₂/km)", "count": "Count"},
                 color_discrete_sequence=["#2ecc71"]
             )
+            fig.update_traces(width=carbon_bins["end"] - carbon_bins["start"])
+            fig.update_layout(bargap=0)
             
             st.plotly_chart(fig, use_container_width=True)
             
@@ -611,31 +651,31 @@ with tab1:
         if "scheduled_delivery_time" in df_shipments.columns:
             st.markdown('<h3 class="section-header">🕒 Delivery Time Distribution</h3>', unsafe_allow_html=True)
             
-            # Convert to hour of day for visualization
-            if isinstance(df_shipments["scheduled_delivery_time"].iloc[0], pd.Timestamp):
-                delivery_hours = df_shipments["scheduled_delivery_time"].dt.hour
-                
-                fig = px.histogram(
-                    delivery_hours.sample(min(1000, len(df_shipments))),
-                    nbins=24,
-                    title="Delivery Hour Distribution",
-                    labels={"value": "Delivery Hour of Day"},
-                    color_discrete_sequence=["#9b59b6"]
-                )
-                
-                fig.update_layout(
-                    xaxis=dict(
-                        tickmode='array',
-                        tickvals=list(range(0, 24, 3)),
-                        ticktext=[f"{h}:00" for h in range(0, 24, 3)]
-                    )
+            # Deliveries per hour of day
+            hour_bins = fleet_summary.histogram("delivery_hour")
+            fig = px.bar(
+                hour_bins,
+                x="start",
+                y="count",
+                title="Delivery Hour Distribution",
+                labels={"start": "Delivery Hour of Day", "count": "Count"},
+                color_discrete_sequence=["#9b59b6"]
+            )
+            
+            fig.update_layout(
+                bargap=0,
+                xaxis=dict(
+                    tickmode='array',
+                    tickvals=list(range(0, 24, 3)),
+                    ticktext=[f"{h}:00" for h in range(0, 24, 3)]
                 )
-                
-                st.plotly_chart(fig, use_container_width=True)
+            )
+            
+            st.plotly_chart(fig, use_container_width=True)
     else:
         st.markdown('<div class="info-text">Load the dataset to view summary statistics and visualizations.</div>', unsafe_allow_html=True)
 
-with tab2:
+if dashboard_view == "About the System":
     st.markdown('<h2 class="section-header">ℹ️ About the System</h2>', unsafe_allow_html=True)
     
     st.markdown("""
@@ -706,3 +746,16 @@ with tab2:
 # Footer
 st.markdown("---")
 st.markdown('<div style="text-align: center; color: #7f8c8d;">Supply Chain Space Sharing Recommender System • Developed for Sustainable Logistics</div>', unsafe_allow_html=True)
+
+# Startup timing: script start to interactive sidebar, and the whole run. The
+# first run of a session in a fresh process includes the module imports.
+run_kind = "rerun" if st.session_state.get("has_run") else "first"
+st.session_state["has_run"] = True
+from backend_model.metrics import get_metrics_registry
+metrics_registry = get_metrics_registry()
+metrics_registry.histogram("app_first_paint_seconds", "Script start to interactive sidebar",
+                           run=run_kind).observe(first_paint_seconds)
+script_seconds = time.perf_counter() - SCRIPT_START
+metrics_registry.histogram("app_script_seconds", "Whole Streamlit script run", run=run_kind).observe(script_seconds)
+if 'debug' in sys.argv:
+    st.sidebar.caption(f"First paint {first_paint_seconds * 1000:.0f} ms, script run {script_seconds * 1000:.0f} ms ({run_kind})")
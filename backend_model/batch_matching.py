@@ -0,0 +1,247 @@
+import numpy as np
+import time
+
+from backend_model.spatial_index import haversine_distance
+from backend_model.sorted_index import to_epoch_ns
+from backend_model.scoring import calculate_match_scores, build_recommendation
+from backend_model.shipment_index import ShipmentIndex, get_shipment_index
+
+# Default memory budget for the (requests x trucks) matrices of one chunk
+DEFAULT_MEMORY_BUDGET_MB = 256
+
+# Approximate bytes held per (request, truck) pair while a chunk is filtered:
+# the int64 time differences plus the boolean masks (only surviving pairs are scored)
+BYTES_PER_PAIR = 32
+
+# Largest number of requests scored together in one chunk
+MAX_REQUEST_BLOCK = 256
+
+def encode_requests(index, shipments_df):
+    """
+    Turn a DataFrame of shipment requests into typed arrays for matrix scoring
+
+    Returns:
+    - dict of arrays (one entry per request) using the same codes as the index
+    """
+    requests = {
+        "units": shipments_df["units"].to_numpy(dtype=np.float64),
+        "timestamp_ns": to_epoch_ns(shipments_df["timestamp"]),
+        "company": index.encode_companies(shipments_df["company"]),
+        "goods_code": np.asarray(index.registry.encode_goods(shipments_df["goods_type"].to_numpy()), dtype=np.int64),
+        "temp_code": np.asarray(index.registry.encode_temp_ranges(shipments_df["temp_min"].to_numpy(),
+                                                                  shipments_df["temp_max"].to_numpy()), dtype=np.int64),
+    }
+    for column in ("source_lat", "source_lon", "dest_lat", "dest_lon"):
+        requests[column] = shipments_df[column].to_numpy(dtype=np.float64)
+
+    if "shipment_id" in shipments_df.columns:
+        requests["shipment_id_code"] = index.encode_shipment_ids(shipments_df["shipment_id"])
+    else:
+        requests["shipment_id_code"] = np.full(len(shipments_df), -1, dtype=np.int64)
+
+    if "scheduled_delivery_time" in shipments_df.columns:
+        requests["scheduled_delivery_ns"] = to_epoch_ns(shipments_df["scheduled_delivery_time"])
+
+    return requests
+
+def select_top_k(rows, scores, positions, k):
+    """
+    Keep the k best entries of every request
+
+    Parameters:
+    - rows: request row of each (request, truck) pair
+    - scores: match score of each pair
+    - positions: fleet row position of each pair
+    - k: Number of recommendations to keep per request
+
+    Returns:
+    - (rows, scores, positions) sorted by request, then best score first; ties are
+      broken by dataset order, like the stable sort of ShipmentIndex.recommend
+    """
+    order = np.lexsort((positions, -scores, rows))
+    rows, scores, positions = rows[order], scores[order], positions[order]
+
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left")
+    keep = rank < k
+    return rows[keep], scores[keep], positions[keep]
+
+def match_pairs(index, shipments_df, k=5, dest_threshold_km=50, time_threshold_hours=48,
+                overlap_threshold=2, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Find the best k compatible trucks inside the destination threshold for every request
+
+    Requests are grouped by destination and time, and each block is filtered against
+    the trucks inside its destination radii and time window as (requests x trucks)
+    matrices, in chunks sized to stay within memory_budget_mb. The surviving pairs
+    are scored in one vectorized pass and the top-k of every request is merged
+    across chunks.
+
+    Parameters:
+    - index: ShipmentIndex of the fleet
+    - shipments_df: DataFrame of shipment requests (same fields as shipment_info)
+    - other parameters as in recommend_batch
+
+    Returns:
+    - (rows, scores, positions): request row (in shipments_df order), score and fleet
+      position of every kept pair, sorted by request, then best score first
+    """
+    num_requests = len(shipments_df)
+    empty = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64), np.zeros(0, dtype=np.int64)
+    if num_requests == 0:
+        return empty
+
+    requests = encode_requests(index, shipments_df)
+    goods_matrix = index.registry.goods_matrix
+    temp_matrix = index.registry.temp_matrix(overlap_threshold)
+    window_ns = time_threshold_hours * 3.6e12
+
+    # Group requests by destination, then time, so each block shares few radius
+    # queries and a narrow time window
+    request_order = np.lexsort((requests["timestamp_ns"], requests["dest_lon"], requests["dest_lat"]))
+
+    pairs_per_chunk = max(1, int(memory_budget_mb * 2**20 // BYTES_PER_PAIR))
+    request_block = max(1, min(num_requests, MAX_REQUEST_BLOCK, pairs_per_chunk))
+    truck_block = max(1, pairs_per_chunk // request_block)
+
+    matched = [empty]
+    for request_start in range(0, num_requests, request_block):
+        block = request_order[request_start:request_start + request_block]
+        column = {name: values[block][:, None] for name, values in requests.items()}
+
+        shipment_columns = {
+            "units": column["units"],
+            "timestamp": column["timestamp_ns"].view("datetime64[ns]"),
+            "company": column["company"],
+            "source_lat": column["source_lat"], "source_lon": column["source_lon"],
+            "dest_lat": column["dest_lat"], "dest_lon": column["dest_lon"],
+        }
+        if "scheduled_delivery_ns" in column:
+            shipment_columns["scheduled_delivery_time"] = column["scheduled_delivery_ns"].view("datetime64[ns]")
+
+        # Trucks inside the destination radius of any request in the block that can fit
+        # the smallest request inside the block's time window
+        destinations = np.unique(np.column_stack([column["dest_lat"][:, 0], column["dest_lon"][:, 0]]), axis=0)
+        truck_positions = np.unique(np.concatenate([
+            index.spatial.dest.query_radius(lat, lon, dest_threshold_km)[0] for lat, lon in destinations
+        ]))
+        truck_positions = truck_positions[
+            index.sorted.storage_left.in_range(truck_positions, low=column["units"].min()) &
+            index.sorted.timestamp.in_range(truck_positions,
+                                            column["timestamp_ns"].min() - window_ns,
+                                            column["timestamp_ns"].max() + window_ns)
+        ]
+
+        best_rows, best_scores, best_positions = empty
+
+        for truck_start in range(0, len(truck_positions), truck_block):
+            positions = truck_positions[truck_start:truck_start + truck_block]
+
+            # Basic criteria, goods and temperature compatibility for every pair
+            valid = (
+                (index.columns["storage_left"][positions][None, :] >= column["units"]) &
+                (index.shipment_id_codes[positions][None, :] != column["shipment_id_code"]) &
+                (np.abs(index.sorted.timestamp.values[positions][None, :] - column["timestamp_ns"]) <= window_ns) &
+                goods_matrix[column["goods_code"][:, 0]][:, index.goods_codes[positions]] &
+                temp_matrix[column["temp_code"][:, 0]][:, index.temp_codes[positions]]
+            )
+            pair_rows, pair_columns = np.nonzero(valid)
+            if len(pair_rows) == 0:
+                continue
+
+            # Destination proximity and scores only for the pairs that survived
+            pair_positions = positions[pair_columns]
+            dest_distance = haversine_distance(requests["dest_lat"][block][pair_rows],
+                                               requests["dest_lon"][block][pair_rows],
+                                               index.columns["dest_lat"][pair_positions],
+                                               index.columns["dest_lon"][pair_positions])
+            within_threshold = dest_distance <= dest_threshold_km
+            pair_rows, pair_positions = pair_rows[within_threshold], pair_positions[within_threshold]
+            if len(pair_rows) == 0:
+                continue
+
+            shipment = {name: values[pair_rows, 0] for name, values in shipment_columns.items()}
+            trucks = index.take(pair_positions)
+            trucks["company"] = index.company_codes[pair_positions]
+            scores = calculate_match_scores(shipment, trucks, dest_threshold_km,
+                                            dest_distance=dest_distance[within_threshold])
+
+            best_rows, best_scores, best_positions = select_top_k(
+                np.concatenate([best_rows, pair_rows]),
+                np.concatenate([best_scores, scores]),
+                np.concatenate([best_positions, pair_positions]),
+                k
+            )
+
+        # Block rows back to request rows
+        matched.append((block[best_rows], best_scores, best_positions))
+
+    rows, scores, positions = (np.concatenate(values) for values in zip(*matched))
+    order = np.lexsort((positions, -scores, rows))
+    return rows[order], scores[order], positions[order]
+
+def recommend_batch(shipments_df, fleet, k=5, dest_threshold_km=50, time_threshold_hours=48,
+                    overlap_threshold=2, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Find the best matching trucks for many shipments at once
+
+    Candidate pairs come from match_pairs, which filters and scores blocks of
+    requests against the trucks near their destinations as matrices. The results
+    are the same as calling recommend_best_matches for each request with the same
+    thresholds.
+
+    Parameters:
+    - shipments_df: DataFrame of shipment requests (same fields as shipment_info)
+    - fleet: fleet DataFrame from load_data, or its ShipmentIndex
+    - k: Number of recommendations per request
+    - dest_threshold_km: Maximum distance between destinations to be considered close
+    - time_threshold_hours: Maximum time difference between shipments
+    - overlap_threshold: Minimum temperature range overlap required in degrees
+    - memory_budget_mb: Approximate memory available for one chunk of matrices
+
+    Returns:
+    - List with one list of recommendations per request, in shipments_df order
+    """
+    index = fleet if isinstance(fleet, ShipmentIndex) else get_shipment_index(fleet)
+    num_requests = len(shipments_df)
+
+    rows, scores, positions = match_pairs(index, shipments_df, k, dest_threshold_km, time_threshold_hours,
+                                          overlap_threshold, memory_budget_mb)
+    row_starts = np.searchsorted(rows, np.arange(num_requests + 1))
+
+    results = []
+    for request in range(num_requests):
+        start, end = row_starts[request], row_starts[request + 1]
+        if end > start:
+            results.append([
+                build_recommendation(index.row(position), float(score))
+                for score, position in zip(scores[start:end], positions[start:end])
+            ])
+        else:
+            # No compatible match within threshold: fall back to the single-request
+            # path, which returns the nearest match flagged as exceeding it
+            results.append(index.recommend(shipments_df.iloc[request].to_dict(), k,
+                                           dest_threshold_km=dest_threshold_km,
+                                           time_threshold_hours=time_threshold_hours,
+                                           overlap_threshold=overlap_threshold))
+
+    return results
+
+# Throughput check: python -m backend_model.batch_matching (next to the dataset)
+if __name__ == "__main__":
+    from backend_model.supply_chain_algorithm import load_data
+
+    # Load data
+    df_shipments = load_data()
+
+    # Use a sample of the fleet itself as a batch of new shipment requests
+    batch = df_shipments.sample(min(500, len(df_shipments)), random_state=0).copy()
+    batch["shipment_id"] = [f"NEW{i:04d}" for i in range(len(batch))]
+    batch["units"] = 50
+
+    start = time.perf_counter()
+    batch_results = recommend_batch(batch, df_shipments, k=5)
+    elapsed = time.perf_counter() - start
+
+    matched = sum(1 for recs in batch_results if recs)
+    print(f"Matched {matched}/{len(batch)} requests in {elapsed:.2f}s "
+          f"({len(batch) / elapsed:.0f} requests/second)")
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import sys
+import time
+
+# pyarrow is optional: without it load_data reads the CSV directly
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+# Directory (next to the CSV) holding the binary artifacts and their manifests
+CACHE_DIR_NAME = ".dataset_cache"
+
+# Bytes read at a time when hashing the source CSV
+HASH_CHUNK_BYTES = 1 << 20
+
+# Bump when the artifact layout changes so old artifacts are rebuilt
+CACHE_FORMAT_VERSION = 2
+
+# Content hash of a file
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_available():
+    """Check whether the columnar cache can be used (pyarrow is installed)"""
+    return feather is not None
+
+def manifest_path(csv_path, cache_dir=None):
+    """Return the manifest path of the artifact built from csv_path"""
+    csv_path = os.path.abspath(csv_path)
+    cache_dir = cache_dir or os.path.join(os.path.dirname(csv_path), CACHE_DIR_NAME)
+    return os.path.join(cache_dir, os.path.basename(csv_path) + ".json")
+
+def read_manifest(csv_path, cache_dir=None):
+    """Return the manifest of csv_path's artifact, or None if there is no usable one"""
+    try:
+        with open(manifest_path(csv_path, cache_dir)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format_version") != CACHE_FORMAT_VERSION:
+        return None
+    return manifest
+
+def write_atomic(path, write):
+    """Write a file through a temporary name so readers never see a partial file"""
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(temporary_path)
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+def write_json(path, data):
+    """Atomically write a JSON file"""
+    def write(target):
+        with open(target, "w") as f:
+            json.dump(data, f, indent=2)
+    write_atomic(path, write)
+
+def build_dataset_cache(csv_path, reader, cache_dir=None, sha256=None):
+    """
+    Convert a dataset CSV into an uncompressed Feather (Arrow IPC) artifact
+
+    Parameters:
+    - csv_path: path of the source CSV
+    - reader: function reading the CSV into the DataFrame to cache
+    - cache_dir: where to keep the artifact (default: .dataset_cache next to the CSV)
+    - sha256: content hash of the CSV, if already known
+
+    Returns:
+    - The manifest of the new artifact
+    """
+    path = manifest_path(csv_path, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    stat = os.stat(csv_path)
+    sha256 = sha256 or file_sha256(csv_path)
+    df = reader(csv_path)
+
+    # Artifacts are named by content hash, so a changed CSV never reuses a stale one
+    artifact = f"{os.path.basename(csv_path)}.{sha256[:16]}.feather"
+    artifact_path = os.path.join(os.path.dirname(path), artifact)
+    write_atomic(artifact_path, lambda target: feather.write_feather(df, target, compression="uncompressed"))
+
+    manifest = {
+        "format_version": CACHE_FORMAT_VERSION,
+        "source": os.path.abspath(csv_path),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256,
+        "artifact": artifact,
+        "rows": len(df),
+        "columns": {column: str(dtype) for column, dtype in df.dtypes.items()},
+    }
+
+    # Remove artifacts of earlier versions of the CSV
+    previous = read_manifest(csv_path, cache_dir)
+    write_json(path, manifest)
+    if previous and previous["artifact"] != artifact:
+        try:
+            os.remove(os.path.join(os.path.dirname(path), previous["artifact"]))
+        except OSError:
+            pass
+
+    return manifest
+
+def fresh_manifest(csv_path, cache_dir=None):
+    """
+    Return the manifest of csv_path's artifact if it still matches the CSV, else None
+
+    The CSV is only hashed when its size or modification time differ from the
+    manifest, so an unchanged file costs one stat() call.
+    """
+    manifest = read_manifest(csv_path, cache_dir)
+    if manifest is None:
+        return None
+    if not os.path.exists(os.path.join(os.path.dirname(manifest_path(csv_path, cache_dir)), manifest["artifact"])):
+        return None
+
+    stat = os.stat(csv_path)
+    if stat.st_size == manifest["source_size"] and stat.st_mtime_ns == manifest["source_mtime_ns"]:
+        return manifest
+    if stat.st_size == manifest["source_size"] and file_sha256(csv_path) == manifest["sha256"]:
+        # Touched but unchanged: keep the artifact and remember the new timestamp
+        manifest["source_mtime_ns"] = stat.st_mtime_ns
+        try:
+            write_json(manifest_path(csv_path, cache_dir), manifest)
+        except OSError:
+            pass
+        return manifest
+    return None
+
+def load_cached_dataset(csv_path, reader, cache_dir=None):
+    """
+    Load a dataset from its memory-mapped columnar artifact
+
+    The artifact is (re)built with reader when it is missing or the CSV's content
+    changed. If the cache directory cannot be written, the CSV is read directly.
+    Numeric and timestamp columns share the mapped memory; string columns stay
+    Arrow-backed and categorical columns are rebuilt from their dictionary codes.
+
+    Returns:
+    - DataFrame with the same columns and dtypes as reader(csv_path)
+    - How it was loaded: "hit" (existing artifact), "rebuild" (artifact built from
+      the CSV first) or "csv" (read directly, the artifact could not be written)
+    """
+    manifest = fresh_manifest(csv_path, cache_dir)
+    status = "hit"
+    if manifest is None:
+        try:
+            manifest = build_dataset_cache(csv_path, reader, cache_dir)
+        except OSError:
+            return reader(csv_path), "csv"
+        status = "rebuild"
+
+    artifact_path = os.path.join(os.path.dirname(manifest_path(csv_path, cache_dir)), manifest["artifact"])
+    table = feather.read_table(artifact_path, memory_map=True)
+    return table.to_pandas(split_blocks=True), status
+
+# Build step: python -m backend_model.dataset_cache [path/to/cargo_sharing_dataset.csv]
+if __name__ == "__main__":
+    from backend_model.supply_chain_algorithm import read_dataset_csv
+
+    if not cache_available():
+        sys.exit("pyarrow is required to build the dataset cache")
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "cargo_sharing_dataset.csv"
+
+    start = time.perf_counter()
+    manifest = build_dataset_cache(csv_path, read_dataset_csv)
+    print(f"Built {manifest['artifact']} ({manifest['rows']} rows) in {time.perf_counter() - start:.2f}s")
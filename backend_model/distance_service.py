@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+import threading
+
+# Decimal places coordinates are rounded to before lookups (6 places is about 0.1 m).
+# Coordinates are first cast to float32, the dtype load_data stores them in (see
+# COMPACT_DTYPES), so a float64 coordinate and its float32 copy get the same key.
+DEFAULT_PRECISION = 6
+
+# Maximum number of entries kept in the LRU cache for arbitrary coordinates
+DEFAULT_CACHE_SIZE = 4096
+
+# Largest number of distinct points for which a full distance matrix is precomputed
+# (n * (n - 1) / 2 geodesic calls, so about 2k calls at the default)
+DEFAULT_MAX_MATRIX_POINTS = 64
+
+class DistanceService:
+    """
+    Memoized geodesic distances
+
+    When the fleet's coordinates come from a small set of repeating points (the
+    cities of the dataset), a point-by-point distance matrix is precomputed and
+    every lookup between two of those points is an array access. Any other pair
+    goes through a bounded LRU cache keyed on rounded coordinates. Hit and miss
+    counters are kept so the cache can be sized.
+    """
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE, precision=DEFAULT_PRECISION,
+                 max_matrix_points=DEFAULT_MAX_MATRIX_POINTS):
+        self.cache_size = cache_size
+        self.precision = precision
+        self.max_matrix_points = max_matrix_points
+        self._lock = threading.Lock()
+
+        self.point_codes = {}
+        self.matrix = np.zeros((0, 0), dtype=np.float64)
+        self._cache = OrderedDict()
+
+        self.matrix_hits = 0
+        self.cache_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, lat, lon):
+        """Round a coordinate pair to float32 and then to the lookup precision"""
+        return (float(np.round(np.float64(np.float32(lat)), self.precision)),
+                float(np.round(np.float64(np.float32(lon)), self.precision)))
+
+    def register_points(self, lats, lons):
+        """
+        Precompute the distance matrix for a set of repeating coordinates
+
+        Does nothing if there are more than max_matrix_points distinct points.
+
+        Returns:
+        - True if the matrix now covers the points
+        """
+        # Hash the rounded (lat, lon) pairs as complex numbers to find the distinct points
+        # (rounded the same way as _key, so lookups with float64 coordinates hit too)
+        lats = np.asarray(lats, dtype=np.float32).astype(np.float64)
+        lons = np.asarray(lons, dtype=np.float32).astype(np.float64)
+        points = pd.unique(np.round(lats, self.precision) + 1j * np.round(lons, self.precision))
+        points = [(float(point.real), float(point.imag)) for point in np.sort(points)]
+
+        with self._lock:
+            known = list(self.point_codes)
+            new_points = [point for point in points if point not in self.point_codes]
+            if not new_points:
+                return True
+            if len(known) + len(new_points) > self.max_matrix_points:
+                return False
+
+            from geopy.distance import geodesic  # imported on first use (slow to import)
+
+            all_points = known + new_points
+            matrix = np.zeros((len(all_points), len(all_points)), dtype=np.float64)
+            matrix[:len(known), :len(known)] = self.matrix
+            for i in range(len(all_points)):
+                for j in range(max(i + 1, len(known)), len(all_points)):
+                    matrix[i, j] = matrix[j, i] = geodesic(all_points[i], all_points[j]).kilometers
+
+            # Publish the matrix before the codes that index into it
+            self.matrix = matrix
+            self.point_codes = {point: code for code, point in enumerate(all_points)}
+            return True
+
+    def distance(self, lat1, lon1, lat2, lon2):
+        """Calculate distance between two points in kilometers"""
+        point1, point2 = self._key(lat1, lon1), self._key(lat2, lon2)
+
+        # Distances are symmetric, so both directions share one cache entry
+        key = (point1, point2) if point1 <= point2 else (point2, point1)
+        with self._lock:
+            code1, code2 = self.point_codes.get(point1), self.point_codes.get(point2)
+            if code1 is not None and code2 is not None:
+                self.matrix_hits += 1
+                return float(self.matrix[code1, code2])
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return self._cache[key]
+
+        from geopy.distance import geodesic  # imported on first use (slow to import)
+        distance = geodesic((lat1, lon1), (lat2, lon2)).kilometers
+
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = distance
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return distance
+
+    def stats(self):
+        """Return hit/miss counters and hit rates for sizing the cache"""
+        with self._lock:
+            matrix_hits, cache_hits, misses = self.matrix_hits, self.cache_hits, self.misses
+            evictions, matrix_points, cache_entries = self.evictions, len(self.point_codes), len(self._cache)
+        lookups = matrix_hits + cache_hits + misses
+        cache_lookups = cache_hits + misses
+        return {
+            "lookups": lookups,
+            "matrix_points": matrix_points,
+            "matrix_hits": matrix_hits,
+            "cache_hits": cache_hits,
+            "misses": misses,
+            "evictions": evictions,
+            "cache_entries": cache_entries,
+            "cache_size": self.cache_size,
+            "hit_rate": (matrix_hits + cache_hits) / lookups if lookups else 0.0,
+            "cache_hit_rate": cache_hits / cache_lookups if cache_lookups else 0.0,
+        }
+
+    def clear(self):
+        """Drop the cache and reset the counters (the matrix is kept)"""
+        with self._lock:
+            self._cache.clear()
+            self.matrix_hits = self.cache_hits = self.misses = self.evictions = 0
+
+# Shared service used by calculate_distance
+_DISTANCE_SERVICE = DistanceService()
+
+def get_distance_service():
+    """Return the process-wide distance service"""
+    return _DISTANCE_SERVICE
@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+from bisect import insort
+from collections import deque
+
+from backend_model.shipment_index import ShipmentIndex, get_shipment_index
+from backend_model.batch_matching import DEFAULT_MEMORY_BUDGET_MB, match_pairs
+
+# Candidate trucks considered per request by the assignment
+DEFAULT_CANDIDATES_PER_REQUEST = 20
+
+# Minimum bid increment (score points). When every request fits a truck on its
+# own, the total score is within epsilon * number of requests of the best
+# assignment over the same candidate pairs
+DEFAULT_EPSILON = 0.01
+
+class TruckCapacity:
+    """
+    Remaining storage of one truck during the auction
+
+    Holds the requests currently assigned to the truck with their bids per unit,
+    cheapest first, so the price of making room for a new shipment is the bid of
+    the last request that would have to be evicted.
+    """
+
+    def __init__(self, storage_left):
+        self.storage_left = float(storage_left)
+        self.holders = []  # (bid per unit, request, units), ascending
+
+    def price(self, units):
+        """Bid per unit needed to fit `units` (0 while the truck has room)"""
+        free = self.storage_left
+        if free >= units:
+            return 0.0
+        for bid, _, held_units in self.holders:
+            free += held_units
+            if free >= units:
+                return bid
+        return np.inf
+
+    def assign(self, request, units, bid):
+        """
+        Place a request on the truck, evicting the cheapest holders to make room
+
+        Returns:
+        - List of evicted requests
+        """
+        evicted = []
+        while self.storage_left < units:
+            _, evicted_request, evicted_units = self.holders.pop(0)
+            self.storage_left += evicted_units
+            evicted.append(evicted_request)
+
+        insort(self.holders, (bid, request, units))
+        self.storage_left -= units
+        return evicted
+
+# Solve a capacity-constrained assignment with an auction over the compatible pairs
+def auction_assignment(rows, positions, scores, units, storage_left, epsilon=DEFAULT_EPSILON):
+    """
+    Assign each request to at most one truck, maximizing the total match score
+
+    Requests bid for trucks in the style of Bertsekas' auction algorithm, with
+    prices per unit of storage: a request's value for a truck is its score minus
+    the price of the room it needs, and it raises that price by the margin over
+    its second-best option (plus epsilon). A truck keeps the highest bids per unit
+    that fit in its storage_left and evicts the others, which bid again. Requests
+    whose best value drops to zero stay unassigned.
+
+    Parameters:
+    - rows, positions, scores: compatible (request, truck) pairs and their scores,
+      grouped by request
+    - units: units needed by every request
+    - storage_left: storage left of every truck (indexed by position)
+    - epsilon: Minimum bid increment in score points
+
+    Returns:
+    - (assigned, capacities): truck position per request (-1 if unassigned) and
+      the TruckCapacity of every truck that was bid on
+    """
+    num_requests = len(units)
+    row_starts = np.searchsorted(rows, np.arange(num_requests + 1))
+    capacities = {}
+    assigned = np.full(num_requests, -1, dtype=np.int64)
+
+    queue = deque(request for request in range(num_requests) if row_starts[request + 1] > row_starts[request])
+    while queue:
+        request = queue.popleft()
+        start, end = row_starts[request], row_starts[request + 1]
+        request_units = units[request]
+
+        # Value of every candidate truck at current prices
+        best_value, second_value, best_truck, best_price = 0.0, 0.0, None, 0.0
+        for position, score in zip(positions[start:end], scores[start:end]):
+            capacity = capacities.get(position)
+            if capacity is None:
+                capacity = capacities[position] = TruckCapacity(storage_left[position])
+            price = capacity.price(request_units)
+            value = score - price * request_units
+            if value > best_value:
+                best_value, second_value, best_truck, best_price = value, best_value, position, price
+            elif value > second_value:
+                second_value = value
+
+        if best_truck is None:
+            continue
+
+        bid = best_price + (best_value - second_value + epsilon) / request_units
+        for evicted in capacities[best_truck].assign(request, request_units, bid):
+            assigned[evicted] = -1
+            queue.append(evicted)
+        assigned[request] = best_truck
+
+    return assigned, capacities
+
+def assign_shipments(shipments_df, fleet, candidates_per_request=DEFAULT_CANDIDATES_PER_REQUEST,
+                     dest_threshold_km=50, time_threshold_hours=48, overlap_threshold=2,
+                     epsilon=DEFAULT_EPSILON, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Match a set of shipments to the fleet without overfilling any truck
+
+    Unlike calling recommend_best_matches per shipment, every truck's storage_left
+    is shared between the requests: it is decremented as shipments are assigned,
+    and the assignment maximizes the total match score over the best
+    candidates_per_request compatible trucks of every request. Scores are the ones
+    recommend_best_matches gives against the fleet as loaded.
+
+    Parameters:
+    - shipments_df: DataFrame of shipment requests (same fields as shipment_info)
+    - fleet: fleet DataFrame from load_data, or its ShipmentIndex (not modified)
+    - candidates_per_request: Number of best compatible trucks considered per request
+    - dest_threshold_km: Maximum distance between destinations to be considered close
+    - time_threshold_hours: Maximum time difference between shipments
+    - overlap_threshold: Minimum temperature range overlap required in degrees
+    - epsilon: Minimum bid increment in score points (smaller is closer to optimal but slower)
+    - memory_budget_mb: Approximate memory available for candidate matching
+
+    Returns:
+    - dict with:
+      - assignments: DataFrame with one row per assigned request (request row,
+        shipment_id, truck_id, units, score)
+      - unassigned: list of request rows that could not be placed
+      - total_score: sum of the assigned scores
+      - storage_left: Series of remaining storage_left per used truck, by truck shipment_id
+    """
+    index = fleet if isinstance(fleet, ShipmentIndex) else get_shipment_index(fleet)
+    rows, scores, positions = match_pairs(index, shipments_df, candidates_per_request, dest_threshold_km,
+                                          time_threshold_hours, overlap_threshold, memory_budget_mb)
+    units = shipments_df["units"].to_numpy(dtype=np.float64)
+
+    assigned, capacities = auction_assignment(rows, positions, scores, units,
+                                              index.columns["storage_left"], epsilon)
+
+    # Score of every assigned (request, truck) pair
+    requests = np.flatnonzero(assigned >= 0)
+    pair_index = {(row, position): score for row, position, score in zip(rows, positions, scores)}
+    assigned_scores = np.array([pair_index[(request, assigned[request])] for request in requests], dtype=np.float64)
+
+    request_ids = (shipments_df["shipment_id"].to_numpy()[requests] if "shipment_id" in shipments_df.columns
+                   else np.full(len(requests), None))
+    assignments = pd.DataFrame({
+        "request": requests,
+        "shipment_id": request_ids,
+        "truck_id": index.columns["shipment_id"][assigned[requests]],
+        "units": units[requests],
+        "score": assigned_scores,
+    })
+
+    used_trucks = sorted(position for position, capacity in capacities.items() if capacity.holders)
+    storage_left = pd.Series([capacities[position].storage_left for position in used_trucks],
+                             index=index.columns["shipment_id"][used_trucks], name="storage_left")
+
+    return {
+        "assignments": assignments,
+        "unassigned": [int(request) for request in np.flatnonzero(assigned < 0)],
+        "total_score": float(assigned_scores.sum()),
+        "storage_left": storage_left,
+    }
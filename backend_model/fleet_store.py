@@ -0,0 +1,279 @@
+import numpy as np
+import pandas as pd
+import threading
+
+from backend_model.goods_compatibility import GOODS_TYPES
+from backend_model.shipment_index import ShipmentIndex
+from backend_model.scoring import build_recommendation
+from backend_model.fleet_summary import FleetSummary
+
+# deleted_version of rows that have not been deleted
+NOT_DELETED = np.iinfo(np.int64).max
+
+# A segment is rebuilt without its deleted rows once this fraction of it is deleted
+COMPACT_DELETED_FRACTION = 0.5
+
+class FleetSegment:
+    """
+    Immutable block of fleet rows with its own ShipmentIndex
+
+    Rows are never removed from a segment; deleting one stamps the store version
+    of the deletion in deleted_version, so snapshots taken before it still see
+    the row and snapshots taken after it do not.
+    """
+
+    def __init__(self, frame, goods_types_dict):
+        self.frame = frame.reset_index(drop=True)
+        self.index = ShipmentIndex(self.frame, goods_types_dict)
+        self.size = len(self.frame)
+        self.deleted_version = np.full(self.size, NOT_DELETED, dtype=np.int64)
+        self.num_deleted = 0
+
+    def live_positions(self, version):
+        """Row positions not deleted as of the given store version"""
+        return np.flatnonzero(self.deleted_version > version)
+
+class FleetSnapshot:
+    """
+    Consistent read-only view of a FleetStore at one version
+
+    Queries on a snapshot are not affected by writes made to the store after it
+    was taken. Rows are in insertion order across segments (an updated row moves
+    to the end), which is the dataset order used to break score ties.
+    """
+
+    def __init__(self, segments, version):
+        self.segments = segments
+        self.version = version
+
+    def __len__(self):
+        return sum(len(segment.live_positions(self.version)) for segment in self.segments)
+
+    def to_frame(self):
+        """Return the live rows as one DataFrame, in dataset order"""
+        frames = [segment.frame.iloc[segment.live_positions(self.version)] for segment in self.segments]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def recommend(self, shipment_info, k=5, dest_threshold_km=50, time_threshold_hours=48, overlap_threshold=2):
+        """
+        Find the best matching trucks for a given shipment in this snapshot
+
+        Gives the same results as ShipmentIndex.recommend on to_frame().
+
+        Returns:
+        - List of recommended shipments with their matching scores, best first
+        """
+        version = self.version
+        return recommend_segments(self.segments, shipment_info, k, dest_threshold_km, time_threshold_hours,
+                                  overlap_threshold,
+                                  alive=lambda segment, positions: segment.deleted_version[positions] > version)
+
+# Find the best matches across several segments, as if they were one DataFrame
+def recommend_segments(segments, shipment_info, k=5, dest_threshold_km=50, time_threshold_hours=48,
+                       overlap_threshold=2, alive=None):
+    """
+    Find the best matching trucks for a given shipment in a list of segments
+
+    Parameters:
+    - segments: segments (with .index ShipmentIndex) in dataset order
+    - alive: optional function (segment, positions) -> boolean mask of matchable rows
+    - other parameters as in ShipmentIndex.recommend
+
+    Returns:
+    - List of recommended shipments with their matching scores, best first; the
+      same as ShipmentIndex.recommend on the concatenated live rows
+    """
+    def find_all(fallback):
+        """Candidates of every segment that has any"""
+        found = []
+        for segment_number, segment in enumerate(segments):
+            segment_alive = None if alive is None else (lambda positions, segment=segment: alive(segment, positions))
+            positions, dest_distance, nearest_distance = segment.index.find_candidates(
+                shipment_info, dest_threshold_km, time_threshold_hours, overlap_threshold,
+                alive=segment_alive, fallback=fallback
+            )
+            if len(positions):
+                found.append((segment_number, positions, dest_distance, nearest_distance))
+        return found
+
+    # Matches inside the threshold in any segment win over the nearest fallback,
+    # so the nearest match is only searched for when there are none
+    matches = find_all(fallback=False)
+    if not matches:
+        found = find_all(fallback=True)
+        if not found:
+            return []
+        # Nearest match across segments, ties in dataset order
+        matches = [min(found, key=lambda entry: (entry[3], entry[0], entry[1][0]))]
+
+    ranked = []
+    for segment_number, positions, dest_distance, nearest_distance in matches:
+        index = segments[segment_number].index
+        positions, scores = index.top_k(shipment_info, positions, dest_distance, k, dest_threshold_km)
+        ranked.extend((-float(score), segment_number, int(position), nearest_distance)
+                      for position, score in zip(positions, scores))
+
+    return [
+        build_recommendation(segments[segment_number].index.row(position), -score, nearest_distance)
+        for score, segment_number, position, nearest_distance in sorted(ranked)[:k]
+    ]
+
+class FleetStore:
+    """
+    In-memory fleet that accepts new trucks, updates and deletions without a reload
+
+    Rows live in a list of immutable segments of geometrically growing size (a
+    logarithmic method): appended rows are merged with the newest segments of
+    similar size into one new segment, so every row is re-indexed O(log n) times
+    over its lifetime. A write builds exactly one segment index, of its own rows
+    plus the segments they merge with: usually small, but up to all n rows when
+    the merge reaches the oldest segment (amortized O(log n) row re-indexings per
+    written row). Updates and deletions stamp a version on the old row instead of
+    touching the indexes; a segment is rebuilt once more than half of it is deleted. Writers are serialized; readers call snapshot() and
+    never block. summary is a FleetSummary of the live rows, updated by every write.
+    """
+
+    def __init__(self, df=None, goods_types_dict=None):
+        self.goods_types_dict = GOODS_TYPES if goods_types_dict is None else goods_types_dict
+        self._lock = threading.Lock()
+        self._locations = {}  # shipment_id -> (segment, position) of the live row
+        self._snapshot = FleetSnapshot([], 0)
+        self.summary = FleetSummary()
+        if df is not None and len(df):
+            self.append(df)
+
+    def snapshot(self):
+        """Return the current consistent view of the fleet"""
+        return self._snapshot
+
+    def __len__(self):
+        return len(self._locations)
+
+    def __contains__(self, shipment_id):
+        return shipment_id in self._locations
+
+    def recommend(self, shipment_info, k=5, dest_threshold_km=50, time_threshold_hours=48, overlap_threshold=2):
+        """Find the best matching trucks for a given shipment in the current snapshot"""
+        return self._snapshot.recommend(shipment_info, k, dest_threshold_km, time_threshold_hours, overlap_threshold)
+
+    def get(self, shipment_id):
+        """Return the current row of a shipment as a Series (KeyError if unknown)"""
+        segment, position = self._locations[shipment_id]
+        return segment.frame.iloc[position]
+
+    def append(self, rows):
+        """
+        Add new shipments
+
+        Parameters:
+        - rows: DataFrame of shipments (same columns as load_data output)
+        """
+        rows = parse_timestamps(rows)
+        with self._lock:
+            seen = set()
+            duplicated = [shipment_id for shipment_id in rows["shipment_id"]
+                          if shipment_id in self._locations or shipment_id in seen or seen.add(shipment_id)]
+            if duplicated:
+                raise ValueError(f"Shipment ids already in the fleet: {duplicated}")
+            self._write(rows, [])
+
+    def update(self, shipment_id, **changes):
+        """
+        Change fields of an existing shipment, e.g. update("SHIP001", storage_left=40)
+
+        The updated row replaces the old one and moves to the end of the dataset order.
+        """
+        with self._lock:
+            if shipment_id not in self._locations:
+                raise KeyError(shipment_id)
+            segment, position = self._locations[shipment_id]
+            row = segment.frame.iloc[[position]].copy()
+            for column, value in changes.items():
+                row[column] = value
+            self._write(parse_timestamps(row), [shipment_id])
+
+    def delete(self, shipment_ids):
+        """Remove shipments (a single id or a list of ids)"""
+        shipment_ids = [shipment_ids] if np.ndim(shipment_ids) == 0 else list(shipment_ids)
+        with self._lock:
+            missing = [shipment_id for shipment_id in shipment_ids if shipment_id not in self._locations]
+            if missing:
+                raise KeyError(missing)
+            self._write(None, shipment_ids)
+
+    def _write(self, rows, deleted_ids):
+        """Apply one change under the writer lock and publish a new snapshot"""
+        version = self._snapshot.version + 1
+        segments = list(self._snapshot.segments)
+
+        # Hide deleted rows from this version on; older snapshots still see them
+        deleted_positions = {}
+        for shipment_id in deleted_ids:
+            segment, position = self._locations.pop(shipment_id)
+            segment.deleted_version[position] = version
+            segment.num_deleted += 1
+            deleted_positions.setdefault(segment, []).append(position)
+        for segment, positions in deleted_positions.items():
+            self.summary.remove(segment.frame.iloc[positions])
+
+        if rows is not None and len(rows):
+            self.summary.add(rows)
+        else:
+            rows = None
+
+        segments = self._compact(segments, version, rows)
+        self._snapshot = FleetSnapshot(segments, version)
+
+    def _new_segment(self, rows, version):
+        """Build a segment and point the shipment ids at its rows"""
+        segment = FleetSegment(rows, self.goods_types_dict)
+        for position, shipment_id in enumerate(segment.frame["shipment_id"]):
+            self._locations[shipment_id] = (segment, position)
+        return segment
+
+    def _compact(self, segments, version, rows=None):
+        """
+        Rebuild mostly-deleted segments, then merge the new rows with the newest
+        segments while the older neighbour is not more than twice as large
+
+        The merged rows get one new segment, so a write builds a single index for
+        its rows and the segments they are merged with, however far the merge goes.
+        """
+        def live_size(segment):
+            return segment.size - segment.num_deleted
+
+        def live_frame(segment):
+            return segment.frame.iloc[segment.live_positions(version)]
+
+        segments = [
+            self._new_segment(live_frame(segment), version)
+            if segment.num_deleted > COMPACT_DELETED_FRACTION * segment.size else segment
+            for segment in segments
+        ]
+        segments = [segment for segment in segments if live_size(segment) > 0]
+
+        # Without new rows the newest segment is the one older segments merge into
+        merged, size = [], 0 if rows is None else len(rows)
+        if rows is None and segments:
+            merged.append(segments.pop())
+            size = live_size(merged[0])
+        while segments and live_size(segments[-1]) <= 2 * size:
+            merged.insert(0, segments.pop())
+            size += live_size(merged[0])
+        if rows is None and len(merged) <= 1:
+            return segments + merged
+
+        frames = [live_frame(segment) for segment in merged] + ([] if rows is None else [rows])
+        segments.append(self._new_segment(pd.concat(frames, ignore_index=True), version))
+        return segments
+
+# Parse timestamp columns the way load_data does
+def parse_timestamps(rows):
+    """Return rows with timestamp, eta and scheduled_delivery_time as datetimes"""
+    rows = rows.copy()
+    for column in ("timestamp", "eta", "scheduled_delivery_time"):
+        if column in rows.columns and not pd.api.types.is_datetime64_any_dtype(rows[column]):
+            rows[column] = pd.to_datetime(rows[column])
+    return rows
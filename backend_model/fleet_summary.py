@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import json
+
+from backend_model.dataset_cache import fresh_manifest, manifest_path, write_json
+from backend_model.sorted_index import to_epoch_ns
+
+# Fixed bin edges, so histograms of fleet changes can be added and subtracted.
+# Values outside the edges are counted in the first/last bin and in out_of_range.
+HISTOGRAM_EDGES = {
+    "storage_left": np.linspace(0, 500, 21),            # largest truck capacity is 500 units
+    "carbon_footprint_per_km": np.linspace(0.5, 2.0, 16),
+    "delivery_hour": np.arange(25),                      # hour of scheduled_delivery_time
+}
+
+# A truck counts as available when it has room for at least this many units
+MIN_AVAILABLE_UNITS = 1
+
+# Bump when the summary layout changes so old summary files are rebuilt
+SUMMARY_FORMAT_VERSION = 1
+
+def _histogram_values(rows, name):
+    """Values of one histogram for a block of rows (None if the fleet lacks the column)"""
+    if name == "delivery_hour":
+        if "scheduled_delivery_time" not in rows.columns:
+            return None
+        return (to_epoch_ns(rows["scheduled_delivery_time"]) // 3_600_000_000_000) % 24
+    if name not in rows.columns:
+        return None
+    values = rows[name].to_numpy(dtype=np.float64)
+    return values[~np.isnan(values)]
+
+class FleetSummary:
+    """
+    Exact summary statistics of a fleet for the dataset overview
+
+    Holds binned histograms of storage left, carbon footprint and delivery hour,
+    goods type and company counts, and the number of trucks with space left.
+    Built in one vectorized pass with add(df); fleet changes are applied with
+    add(new_rows) and remove(old_rows) without another pass over the fleet.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.available_trucks = 0
+        self.goods_counts = {}
+        self.company_counts = {}
+        self.histograms = {name: np.zeros(len(edges) - 1, dtype=np.int64) for name, edges in HISTOGRAM_EDGES.items()}
+        self.out_of_range = {name: 0 for name in HISTOGRAM_EDGES}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Summarize a whole fleet DataFrame"""
+        summary = cls()
+        summary.add(df)
+        return summary
+
+    def add(self, rows):
+        """Count new rows"""
+        self._update(rows, 1)
+
+    def remove(self, rows):
+        """Uncount rows that left the fleet (or the old version of updated rows)"""
+        self._update(rows, -1)
+
+    def _update(self, rows, sign):
+        if len(rows) == 0:
+            return
+        self.rows += sign * len(rows)
+        storage_left = rows["storage_left"].to_numpy(dtype=np.float64)
+        self.available_trucks += sign * int((storage_left >= MIN_AVAILABLE_UNITS).sum())
+
+        for counts, column in ((self.goods_counts, "goods_type"), (self.company_counts, "company")):
+            for name, count in rows[column].value_counts(sort=False).items():
+                if count:
+                    counts[name] = counts.get(name, 0) + sign * int(count)
+                    if counts[name] == 0:
+                        del counts[name]
+
+        for name, edges in HISTOGRAM_EDGES.items():
+            values = _histogram_values(rows, name)
+            if values is None:
+                continue
+            bins = np.searchsorted(edges[1:-1], values, side="right")
+            self.histograms[name] += sign * np.bincount(bins, minlength=len(edges) - 1)
+            self.out_of_range[name] += sign * int(((values < edges[0]) | (values > edges[-1])).sum())
+
+    @property
+    def unique_companies(self):
+        return len(self.company_counts)
+
+    def top_goods(self, n=10):
+        """The n most common goods types as a Series of counts"""
+        counts = pd.Series(self.goods_counts, dtype=np.int64)
+        return counts.sort_values(ascending=False, kind="stable").head(n)
+
+    def histogram(self, name):
+        """
+        Return one histogram as a DataFrame with the bin start, end, center and count
+        """
+        edges = HISTOGRAM_EDGES[name]
+        return pd.DataFrame({"start": edges[:-1], "end": edges[1:], "center": (edges[:-1] + edges[1:]) / 2,
+                             "count": self.histograms[name]})
+
+    def to_dict(self):
+        """Return the summary as JSON-serializable data"""
+        return {
+            "format_version": SUMMARY_FORMAT_VERSION,
+            "rows": self.rows,
+            "available_trucks": self.available_trucks,
+            "goods_counts": self.goods_counts,
+            "company_counts": self.company_counts,
+            "histograms": {name: counts.tolist() for name, counts in self.histograms.items()},
+            "out_of_range": self.out_of_range,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a summary from to_dict() output"""
+        summary = cls()
+        summary.rows = data["rows"]
+        summary.available_trucks = data["available_trucks"]
+        summary.goods_counts = dict(data["goods_counts"])
+        summary.company_counts = dict(data["company_counts"])
+        summary.histograms = {name: np.array(counts, dtype=np.int64) for name, counts in data["histograms"].items()}
+        summary.out_of_range = dict(data["out_of_range"])
+        return summary
+
+def summary_path(csv_path, cache_dir=None):
+    """Return the path of the summary artifact of a dataset CSV (next to its columnar cache)"""
+    return manifest_path(csv_path, cache_dir)[:-len(".json")] + ".summary.json"
+
+def load_fleet_summary(csv_path, df, cache_dir=None):
+    """
+    Return the summary of a loaded dataset, reading the stored artifact when it
+    was built from the same CSV content and building (and storing) it otherwise
+
+    Parameters:
+    - csv_path: path of the dataset CSV df was loaded from
+    - df: the loaded fleet (only read when the summary has to be built)
+    """
+    manifest = fresh_manifest(csv_path, cache_dir)
+    path = summary_path(csv_path, cache_dir)
+    if manifest is not None:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("format_version") == SUMMARY_FORMAT_VERSION and data.get("sha256") == manifest["sha256"]:
+                return FleetSummary.from_dict(data)
+        except (OSError, ValueError):
+            pass
+
+    summary = FleetSummary.from_frame(df)
+    if manifest is not None:
+        try:
+            write_json(path, dict(summary.to_dict(), sha256=manifest["sha256"]))
+        except OSError:
+            pass
+    return summary
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+import threading
+
+# Goods types with their temperature requirements and compatible goods
+# (shared by the app and the matcher; dataset/Final_Dataset2.py keeps a copy)
+GOODS_TYPES = {
+    "Garments": {"temp_range": (15, 25), "compatibility": ["Footwear", "Accessories", "Textiles"]},
+    "Footwear": {"temp_range": (15, 25), "compatibility": ["Garments", "Accessories", "Textiles"]},
+    "Electronics": {"temp_range": (10, 30), "compatibility": ["Appliances", "Accessories"]},
+    "Pharmaceuticals": {"temp_range": (2, 8), "compatibility": ["Medical Supplies"]},
+    "Frozen Food": {"temp_range": (-25, -15), "compatibility": ["Refrigerated Food"]},
+    "Refrigerated Food": {"temp_range": (0, 5), "compatibility": ["Frozen Food"]},
+    "Dry Food": {"temp_range": (10, 25), "compatibility": ["Beverages", "Packaged Goods"]},
+    "Beverages": {"temp_range": (5, 25), "compatibility": ["Dry Food", "Packaged Goods"]},
+    "Furniture": {"temp_range": (10, 35), "compatibility": ["Home Decor", "Building Materials"]},
+    "Automotive Parts": {"temp_range": (0, 35), "compatibility": ["Industrial Equipment", "Machinery"]},
+    "Medical Supplies": {"temp_range": (2, 25), "compatibility": ["Pharmaceuticals"]},
+    "Hazardous Materials": {"temp_range": (5, 30), "compatibility": []},
+    "Building Materials": {"temp_range": (0, 40), "compatibility": ["Furniture", "Home Decor"]},
+    "Industrial Equipment": {"temp_range": (0, 40), "compatibility": ["Machinery", "Automotive Parts"]},
+    "Textiles": {"temp_range": (15, 30), "compatibility": ["Garments", "Accessories"]},
+    "Accessories": {"temp_range": (15, 30), "compatibility": ["Garments", "Footwear", "Textiles"]},
+    "Machinery": {"temp_range": (0, 40), "compatibility": ["Industrial Equipment", "Automotive Parts"]},
+    "Packaged Goods": {"temp_range": (10, 25), "compatibility": ["Dry Food", "Beverages"]},
+    "Home Decor": {"temp_range": (10, 35), "compatibility": ["Furniture", "Building Materials"]},
+    "Appliances": {"temp_range": (10, 35), "compatibility": ["Electronics"]}
+}
+
+class GoodsCompatibilityRegistry:
+    """
+    Precompiled goods and temperature compatibility lookups
+
+    Goods types and distinct (temp_min, temp_max) ranges are encoded as integer
+    codes. goods_matrix[a, b] is True when goods code b can ride with goods code a
+    (the same rule as are_goods_compatible), and temp_overlap[a, b] holds the
+    overlap in degrees between temperature range codes a and b. Filtering a fleet
+    is then a single fancy-indexing lookup per matrix.
+
+    Names or ranges that are not registered yet are added on first encode, so the
+    lookups stay exact for any data: an unknown goods type is only compatible with
+    itself.
+    """
+
+    def __init__(self, goods_types_dict=None):
+        self.goods_types_dict = GOODS_TYPES if goods_types_dict is None else goods_types_dict
+        self._lock = threading.Lock()
+
+        self.goods_names = []
+        self.goods_codes = {}
+        self.goods_matrix = np.zeros((0, 0), dtype=bool)
+        self._register_goods(list(self.goods_types_dict))
+
+        self.temp_ranges = np.zeros((0, 2), dtype=np.float64)
+        self.temp_codes = {}
+        self.temp_overlap = np.zeros((0, 0), dtype=np.float64)
+        self._temp_matrices = {}
+        self._register_temp_ranges([spec["temp_range"] for spec in self.goods_types_dict.values()])
+
+    def _register_goods(self, names):
+        """Add goods types to the registry and extend the compatibility matrix"""
+        with self._lock:
+            new_names = [name for name in dict.fromkeys(names) if name not in self.goods_codes]
+            if not new_names:
+                return
+
+            names = self.goods_names + new_names
+            codes = {name: code for code, name in enumerate(names)}
+
+            # Same type is always compatible, otherwise follow the compatibility lists
+            matrix = np.eye(len(names), dtype=bool)
+            for name, spec in self.goods_types_dict.items():
+                for other in spec["compatibility"]:
+                    if name in codes and other in codes:
+                        matrix[codes[name], codes[other]] = True
+
+            # Publish the matrix before the codes that index into it
+            self.goods_matrix = matrix
+            self.goods_names = names
+            self.goods_codes = codes
+
+    def _register_temp_ranges(self, ranges):
+        """Add temperature ranges to the registry and rebuild the overlap matrix"""
+        with self._lock:
+            ranges = dict.fromkeys((float(temp_range[0]), float(temp_range[1])) for temp_range in ranges)
+            new_ranges = [temp_range for temp_range in ranges if temp_range not in self.temp_codes]
+            if not new_ranges:
+                return
+
+            temp_ranges = np.vstack([self.temp_ranges, np.array(new_ranges, dtype=np.float64)])
+            mins, maxs = temp_ranges[:, 0], temp_ranges[:, 1]
+
+            # Overlap in degrees for every pair of ranges (negative when disjoint)
+            self.temp_overlap = (np.minimum(maxs[:, None], maxs[None, :]) -
+                                 np.maximum(mins[:, None], mins[None, :]))
+            self._temp_matrices = {}
+            self.temp_ranges = temp_ranges
+            self.temp_codes = {(float(low), float(high)): code for code, (low, high) in enumerate(temp_ranges)}
+
+    def temp_matrix(self, overlap_threshold=2):
+        """Boolean range-by-range matrix of is_temp_compatible for a given overlap threshold"""
+        matrix = self._temp_matrices.get(overlap_threshold)
+        if matrix is None:
+            matrix = self.temp_overlap >= overlap_threshold
+            self._temp_matrices[overlap_threshold] = matrix
+        return matrix
+
+    def encode_goods(self, goods_types):
+        """Encode goods type names (scalar or array-like) as integer codes"""
+        if np.ndim(goods_types) == 0:
+            self._register_goods([goods_types])
+            return self.goods_codes[goods_types]
+
+        categorical = pd.Categorical(goods_types)
+        self._register_goods(list(categorical.categories))
+
+        lookup = np.array([self.goods_codes[name] for name in categorical.categories], dtype=np.int32)
+        return lookup[categorical.codes]
+
+    def encode_temp_ranges(self, temp_min, temp_max):
+        """Encode (temp_min, temp_max) pairs (scalars or array-like) as integer codes"""
+        if np.ndim(temp_min) == 0:
+            temp_range = (float(temp_min), float(temp_max))
+            self._register_temp_ranges([temp_range])
+            return self.temp_codes[temp_range]
+
+        pairs = np.column_stack([np.asarray(temp_min, dtype=np.float64),
+                                 np.asarray(temp_max, dtype=np.float64)])
+        if len(pairs) == 0:
+            return np.zeros(0, dtype=np.int32)
+
+        # Hash the (min, max) pairs as complex numbers; sorted like np.unique(axis=0)
+        inverse, unique_pairs = pd.factorize(pairs[:, 0] + 1j * pairs[:, 1], sort=True)
+        unique_pairs = [(float(pair.real), float(pair.imag)) for pair in unique_pairs]
+        self._register_temp_ranges(unique_pairs)
+
+        lookup = np.array([self.temp_codes[pair] for pair in unique_pairs], dtype=np.int32)
+        return lookup[inverse]
+
+    def compatible_mask(self, goods_type, temp_range, goods_codes, temp_codes, overlap_threshold=2):
+        """
+        Check a whole block of candidates against one shipment
+
+        Parameters:
+        - goods_type: goods type of the shipment needing space
+        - temp_range: (min_temp, max_temp) of the shipment needing space
+        - goods_codes, temp_codes: encoded candidate columns from encode_goods / encode_temp_ranges
+        - overlap_threshold: minimum overlap required in degrees
+
+        Returns:
+        - Boolean array, True where both goods and temperature are compatible
+        """
+        goods_code = self.encode_goods(goods_type)
+        temp_code = self.encode_temp_ranges(*temp_range)
+
+        return (self.goods_matrix[goods_code][goods_codes] &
+                self.temp_matrix(overlap_threshold)[temp_code][temp_codes])
+
+# Registries already built for a goods types dictionary, keyed by id()
+_REGISTRY_CACHE = {}
+
+def get_compatibility_registry(goods_types_dict=None):
+    """Return the registry for a goods types dictionary, building it only once"""
+    goods_types_dict = GOODS_TYPES if goods_types_dict is None else goods_types_dict
+
+    cached = _REGISTRY_CACHE.get(id(goods_types_dict))
+    if cached is not None and cached.goods_types_dict is goods_types_dict:
+        return cached
+
+    registry = GoodsCompatibilityRegistry(goods_types_dict)
+    _REGISTRY_CACHE[id(goods_types_dict)] = registry
+    return registry
@@ -0,0 +1,57 @@
+import time
+
+class MatchTrace:
+    """
+    Per-stage wall times and candidate counts of one recommendation call
+
+    Pass a MatchTrace as trace= to recommend_best_matches (or ShipmentIndex.recommend)
+    to record it; without one the matcher records nothing. Stages are timed back to
+    back with lap(), so their times add up to the whole call.
+
+    Attributes:
+    - stages: list of (stage name, seconds) in pipeline order
+    - funnel: rows left after each filter, in filter order (fleet, time_window,
+      time_and_storage, within_destination, compatible, scored, returned)
+    - plan: which filter ran first ("time_first" or "destination_first")
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.funnel = {}
+        self.plan = None
+        self.fallback = False
+        self._started = self._last = time.perf_counter()
+
+    def lap(self, stage, **counts):
+        """End a stage: record the time since the previous lap and the row counts after it"""
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+        self.funnel.update(counts)
+
+    @property
+    def total_ms(self):
+        """Wall time from the start of the trace to the last lap in milliseconds"""
+        return (self._last - self._started) * 1000
+
+    def stage_ms(self):
+        """Milliseconds per stage (stages recorded more than once are summed)"""
+        totals = {}
+        for stage, seconds in self.stages:
+            totals[stage] = totals.get(stage, 0.0) + seconds * 1000
+        return totals
+
+    def to_dict(self):
+        """Return the trace as plain data, for logging or display"""
+        return {
+            "total_ms": round(self.total_ms, 3),
+            "plan": self.plan,
+            "fallback": self.fallback,
+            "stages": [{"stage": stage, "ms": round(seconds * 1000, 3)} for stage, seconds in self.stages],
+            "funnel": dict(self.funnel),
+        }
+
+    def __repr__(self):
+        stages = ", ".join(f"{stage}={ms:.2f}ms" for stage, ms in self.stage_ms().items())
+        funnel = " -> ".join(f"{name} {count}" for name, count in self.funnel.items())
+        return f"MatchTrace({self.total_ms:.2f}ms: {stages}; {funnel})"
@@ -0,0 +1,302 @@
+import json
+import threading
+from bisect import bisect_left
+
+from backend_model.dataset_cache import write_atomic
+from backend_model.distance_service import get_distance_service
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the candidate count histogram buckets
+COUNT_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Trace one in this many recommend calls to record the candidate funnel (0, the default, disables
+# tracing; set get_matcher_metrics().trace_every to opt in)
+DEFAULT_TRACE_EVERY = 0
+
+# Default port of the local metrics endpoint
+DEFAULT_METRICS_PORT = 9108
+
+class Counter:
+    """
+    Monotonic counter
+
+    Updates take no lock to stay well under a microsecond; under heavy
+    multi-threading an increment can occasionally be lost, which is acceptable
+    for monitoring.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        """Add amount (default 1)"""
+        self.value += amount
+
+class Histogram:
+    """Histogram with fixed bucket upper bounds (lock-free like Counter)"""
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Count one value in the first bucket whose upper bound is >= value"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+class MetricsRegistry:
+    """
+    Named counters, histograms and gauges with Prometheus-text and JSON snapshots
+
+    counter() and histogram() return the same metric object for the same name and
+    labels, so callers look a metric up once and keep it. Gauges are functions
+    evaluated only when a snapshot is taken (e.g. cache hit ratios).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}  # name -> {"type", "help", "metrics": {labels tuple: metric}}
+
+    def _get(self, kind, name, help_text, labels, factory):
+        """Return the metric of a family for the given labels, creating it on first use"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.setdefault(name, {"type": kind, "help": help_text, "metrics": {}})
+            if family["type"] != kind:
+                raise ValueError(f"Metric {name} is already registered as a {family['type']}")
+            if key not in family["metrics"]:
+                family["metrics"][key] = factory()
+            return family["metrics"][key]
+
+    def counter(self, name, help_text="", **labels):
+        """Return the counter with this name and labels"""
+        return self._get("counter", name, help_text, labels, Counter)
+
+    def histogram(self, name, help_text="", buckets=LATENCY_BUCKETS_S, **labels):
+        """Return the histogram with this name and labels"""
+        return self._get("histogram", name, help_text, labels, lambda: Histogram(buckets))
+
+    def gauge(self, name, help_text, function, **labels):
+        """Register a gauge whose value is function(), evaluated at snapshot time"""
+        self._get("gauge", name, help_text, labels, lambda: function)
+
+    def snapshot(self):
+        """
+        Return the current value of every metric
+
+        Returns:
+        - Dict name -> {"type", "help", "samples": [{"labels", "value"} or
+          {"labels", "buckets", "count", "sum"}]}
+        """
+        with self._lock:
+            families = {name: dict(family, metrics=dict(family["metrics"])) for name, family in self._families.items()}
+
+        snapshot = {}
+        for name, family in sorted(families.items()):
+            samples = []
+            for key, metric in family["metrics"].items():
+                sample = {"labels": dict(key)}
+                if family["type"] == "counter":
+                    sample["value"] = metric.value
+                elif family["type"] == "gauge":
+                    sample["value"] = metric()
+                else:
+                    counts = list(metric.counts)
+                    sample["buckets"] = dict(zip([str(bound) for bound in metric.bounds] + ["+Inf"], counts))
+                    sample["count"] = sum(counts)
+                    sample["sum"] = metric.sum
+                samples.append(sample)
+            snapshot[name] = {"type": family["type"], "help": family["help"], "samples": samples}
+        return snapshot
+
+    def to_json(self):
+        """Return a snapshot as a JSON string"""
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Return a snapshot in the Prometheus text exposition format"""
+        lines = []
+        for name, family in self.snapshot().items():
+            if family["help"]:
+                lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for sample in family["samples"]:
+                labels = sample["labels"]
+                if family["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(sample['value'])}")
+                    continue
+                # Prometheus buckets are cumulative
+                cumulative = 0
+                for bound, count in sample["buckets"].items():
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(dict(labels, le=bound))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(sample['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {sample['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Atomically write a snapshot to a file: JSON if path ends in .json, else Prometheus text"""
+        text = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        def write(target):
+            with open(target, "w") as f:
+                f.write(text)
+        write_atomic(path, write)
+
+    def serve(self, port=DEFAULT_METRICS_PORT, host="127.0.0.1"):
+        """
+        Serve snapshots over HTTP in a background thread: /metrics (Prometheus
+        text) and /metrics.json
+
+        Returns:
+        - The server; call shutdown() to stop it
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # only needed when serving
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = registry.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+def _format_labels(labels):
+    """Prometheus label set, e.g. {stage="compatible"}"""
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+               for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+def _format_value(value):
+    """Prometheus sample value"""
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# Ratio of two counters, 0 before any event
+def _ratio(numerator, denominator):
+    """Gauge function returning numerator / denominator"""
+    return lambda: numerator.value / denominator.value if denominator.value else 0.0
+
+class MatcherMetrics:
+    """
+    Metrics fed by recommend_best_matches: request latency, empty-result and
+    exceeds_threshold fallback rates, and (from sampled traces) the candidates
+    left after each filter and the time spent in each stage
+    """
+
+    def __init__(self, registry, trace_every=DEFAULT_TRACE_EVERY):
+        self.registry = registry
+        self.trace_every = trace_every
+        self.requests = registry.counter("matcher_requests_total", "Recommendation requests")
+        self.latency = registry.histogram("matcher_latency_seconds", "Recommendation latency")
+        self.empty = registry.counter("matcher_empty_results_total", "Requests with no recommendation")
+        self.fallback = registry.counter("matcher_fallback_results_total",
+                                         "Requests answered with the nearest match beyond the distance threshold")
+        self.traced = registry.counter("matcher_traced_requests_total", "Requests with a recorded candidate funnel")
+        registry.gauge("matcher_empty_result_ratio", "Share of requests with no recommendation",
+                       _ratio(self.empty, self.requests))
+        registry.gauge("matcher_fallback_ratio", "Share of requests answered with the nearest-match fallback",
+                       _ratio(self.fallback, self.requests))
+        self._calls = 0
+
+    def sample_trace(self):
+        """Whether the next request should be traced for the funnel metrics"""
+        if not self.trace_every:
+            return False
+        self._calls += 1
+        return self._calls % self.trace_every == 0
+
+    def record(self, seconds, recommendations, trace=None):
+        """Record one request: its latency, its results and, if traced, its funnel and stage times"""
+        self.requests.inc()
+        self.latency.observe(seconds)
+        if not recommendations:
+            self.empty.inc()
+        elif recommendations[0].get("exceeds_threshold", False):
+            self.fallback.inc()
+
+        if trace is not None:
+            self.traced.inc()
+            for stage, count in trace.funnel.items():
+                self.registry.histogram("matcher_candidates", "Rows left after each filter (sampled requests)",
+                                        COUNT_BUCKETS, stage=stage).observe(count)
+            for stage, seconds in trace.stages:
+                self.registry.histogram("matcher_stage_seconds", "Time per matching stage (sampled requests)",
+                                        stage=stage).observe(seconds)
+
+class LoaderMetrics:
+    """
+    Metrics fed by load_data and the caches: load latency, and hit ratios of the
+    columnar dataset cache, the ShipmentIndex cache and the distance service
+    """
+
+    def __init__(self, registry):
+        self.load_seconds = {
+            source: registry.histogram("dataset_load_seconds", "load_data latency", source=source)
+            for source in ("cache", "csv")
+        }
+        self.cache_hits = registry.counter("dataset_cache_requests_total", "Columnar cache lookups", result="hit")
+        self.cache_misses = registry.counter("dataset_cache_requests_total", "Columnar cache lookups", result="miss")
+        self.index_hits = registry.counter("shipment_index_requests_total", "ShipmentIndex lookups", result="hit")
+        self.index_misses = registry.counter("shipment_index_requests_total", "ShipmentIndex lookups",
+                                             result="miss")
+        registry.gauge("dataset_cache_hit_ratio", "Share of cached loads served without a rebuild",
+                       lambda: _share(self.cache_hits, self.cache_misses))
+        registry.gauge("shipment_index_hit_ratio", "Share of queries that reused a built ShipmentIndex",
+                       lambda: _share(self.index_hits, self.index_misses))
+        registry.gauge("distance_cache_hit_ratio", "Share of distance lookups served by the matrix or the LRU cache",
+                       lambda: get_distance_service().stats()["hit_rate"])
+
+def _share(hits, misses):
+    """hits / (hits + misses), 0 before any lookup"""
+    total = hits.value + misses.value
+    return hits.value / total if total else 0.0
+
+# Process-wide registry and the metric groups fed by the matcher and the loader
+_METRICS_REGISTRY = MetricsRegistry()
+_MATCHER_METRICS = None
+_LOADER_METRICS = None
+
+def get_metrics_registry():
+    """Return the process-wide metrics registry"""
+    return _METRICS_REGISTRY
+
+def get_matcher_metrics():
+    """Return the matcher metrics of the process-wide registry"""
+    global _MATCHER_METRICS
+    if _MATCHER_METRICS is None:
+        _MATCHER_METRICS = MatcherMetrics(_METRICS_REGISTRY)
+    return _MATCHER_METRICS
+
+def get_loader_metrics():
+    """Return the loader metrics of the process-wide registry"""
+    global _LOADER_METRICS
+    if _LOADER_METRICS is None:
+        _LOADER_METRICS = LoaderMetrics(_METRICS_REGISTRY)
+    return _LOADER_METRICS
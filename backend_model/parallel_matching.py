@@ -0,0 +1,323 @@
+import numpy as np
+import pandas as pd
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+
+from backend_model.spatial_index import haversine_distance
+from backend_model.sorted_index import to_epoch_ns
+from backend_model.scoring import top_k_match_scores, build_recommendation
+from backend_model.shipment_index import ShipmentIndex, get_shipment_index
+
+# Fleet columns copied into shared memory, with their dtypes
+SHARED_COLUMNS = {
+    "storage_left": np.float64,
+    "source_lat": np.float64,
+    "source_lon": np.float64,
+    "dest_lat": np.float64,
+    "dest_lon": np.float64,
+    "timestamp_ns": np.int64,
+    "scheduled_delivery_ns": np.int64,
+    "shipment_id_code": np.int64,
+    "company_code": np.int32,
+    "goods_code": np.int32,
+    "temp_code": np.int32,
+    # Row offsets of every shard sorted by timestamp, and the sorted timestamps
+    "time_order": np.int64,
+    "sorted_timestamp_ns": np.int64,
+}
+
+class SharedFleet:
+    """
+    Numeric columns and per-shard time indexes of a ShipmentIndex in one shared memory block
+
+    Worker processes attach to the block by name and read the columns as NumPy
+    views, so the fleet is never pickled. Shards are contiguous row ranges; inside
+    each shard, time_order holds the shard's row offsets sorted by timestamp.
+    """
+
+    def __init__(self, index, num_shards):
+        self.size = index.size
+        bounds = np.linspace(0, index.size, num_shards + 1).astype(np.int64)
+        self.shards = [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+        timestamp_ns = index.columns["timestamp"].view(np.int64)
+        time_order = np.concatenate([
+            np.argsort(timestamp_ns[start:end], kind="stable") for start, end in self.shards
+        ]) if self.shards else np.zeros(0, dtype=np.int64)
+        shard_starts = np.concatenate([np.full(end - start, start) for start, end in self.shards]) \
+            if self.shards else np.zeros(0, dtype=np.int64)
+
+        values = {
+            "storage_left": index.columns["storage_left"],
+            "source_lat": index.columns["source_lat"],
+            "source_lon": index.columns["source_lon"],
+            "dest_lat": index.columns["dest_lat"],
+            "dest_lon": index.columns["dest_lon"],
+            "timestamp_ns": timestamp_ns,
+            "shipment_id_code": index.shipment_id_codes,
+            "company_code": index.company_codes,
+            "goods_code": index.goods_codes,
+            "temp_code": index.temp_codes,
+            "time_order": time_order,
+            "sorted_timestamp_ns": timestamp_ns[shard_starts + time_order],
+        }
+        if "scheduled_delivery_time" in index.columns:
+            values["scheduled_delivery_ns"] = index.columns["scheduled_delivery_time"].view(np.int64)
+
+        # Lay the columns out back to back, 64-byte aligned
+        self.layout = {}
+        offset = 0
+        for column, dtype in SHARED_COLUMNS.items():
+            if column in values:
+                self.layout[column] = (offset, np.dtype(dtype).str)
+                offset += -(-index.size * np.dtype(dtype).itemsize // 64) * 64
+
+        self.nbytes = max(offset, 1)
+        self.shm = shared_memory.SharedMemory(create=True, size=self.nbytes)
+        for column, array in attach_columns(self.shm.buf, self.layout, self.size).items():
+            array[:] = values[column]
+
+    def spec(self):
+        """Picklable description the workers use to attach to the block"""
+        return self.shm.name, self.layout, self.size
+
+    def close(self):
+        """Release and remove the shared memory block"""
+        self.shm.close()
+        self.shm.unlink()
+
+# View the columns of a shared memory buffer as NumPy arrays
+def attach_columns(buffer, layout, size):
+    """Return a dict of NumPy views over a shared memory buffer laid out by SharedFleet"""
+    return {
+        column: np.ndarray(size, dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+        for column, (offset, dtype) in layout.items()
+    }
+
+# Shared memory blocks attached by this worker process, keyed by name
+_ATTACHED = {}
+
+def _close_attached():
+    """Drop the column views and close every block attached by this worker process"""
+    while _ATTACHED:
+        _, (shm, columns) = _ATTACHED.popitem()
+        del columns  # the views must go before the buffer can be released
+        shm.close()
+
+def _init_worker():
+    """Close the attached blocks when the worker process exits"""
+    # multiprocessing runs Finalize callbacks at worker exit (atexit handlers are skipped)
+    util.Finalize(None, _close_attached, exitpriority=10)
+
+def _attached_columns(spec):
+    """Attach to a SharedFleet block once per worker process, closing a previously attached one"""
+    name, layout, size = spec
+    if name not in _ATTACHED:
+        _close_attached()
+        shm = shared_memory.SharedMemory(name=name)
+        _ATTACHED[name] = (shm, attach_columns(shm.buf, layout, size))
+    return _ATTACHED[name][1]
+
+def match_shard(spec, shard, requests, goods_matrix, temp_matrix, k=5, dest_threshold_km=50,
+                time_threshold_hours=48):
+    """
+    Find the best k trucks of one shard for each request (runs in a worker process)
+
+    Parameters:
+    - spec: SharedFleet.spec() of the fleet
+    - shard: (start, end) row range of the shard
+    - requests: list of encoded shipment dicts (see ParallelMatcher.encode_request)
+    - goods_matrix, temp_matrix: compatibility matrices of the registry
+    - k: Number of matches to keep per request
+    - dest_threshold_km: Maximum distance between destinations to be considered close
+    - time_threshold_hours: Maximum time difference between shipments
+
+    Returns:
+    - One (positions, scores, nearest) tuple per request: fleet positions and scores
+      of the shard's best k, and when none is inside the threshold the
+      (distance, position) of the shard's nearest compatible truck (else None)
+    """
+    columns = _attached_columns(spec)
+    start, end = shard
+    sorted_timestamp_ns = columns["sorted_timestamp_ns"][start:end]
+    time_order = columns["time_order"][start:end]
+    window_ns = time_threshold_hours * 3.6e12
+
+    results = []
+    for request in requests:
+        # Rows of the shard inside the time window, then the other basic criteria
+        low = np.searchsorted(sorted_timestamp_ns, request["timestamp_ns"] - window_ns, side="left")
+        high = np.searchsorted(sorted_timestamp_ns, request["timestamp_ns"] + window_ns, side="right")
+        positions = np.sort(time_order[low:high]) + start
+        positions = positions[
+            (columns["storage_left"][positions] >= request["units"]) &
+            (columns["shipment_id_code"][positions] != request["shipment_id_code"]) &
+            goods_matrix[request["goods_code"], columns["goods_code"][positions]] &
+            temp_matrix[request["temp_code"], columns["temp_code"][positions]]
+        ]
+
+        dest_distance = haversine_distance(request["dest_lat"], request["dest_lon"],
+                                           columns["dest_lat"][positions], columns["dest_lon"][positions])
+        within_threshold = dest_distance <= dest_threshold_km
+        if not within_threshold.any():
+            if len(positions) == 0:
+                results.append((positions, np.zeros(0), None))
+            else:
+                nearest = int(np.argmin(dest_distance))
+                results.append((positions[:0], np.zeros(0), (float(dest_distance[nearest]), int(positions[nearest]))))
+            continue
+
+        positions, dest_distance = positions[within_threshold], dest_distance[within_threshold]
+        candidates = {
+            "storage_left": columns["storage_left"][positions],
+            "source_lat": columns["source_lat"][positions],
+            "source_lon": columns["source_lon"][positions],
+            "timestamp": columns["timestamp_ns"][positions].view("datetime64[ns]"),
+            "company": columns["company_code"][positions],
+        }
+        if "scheduled_delivery_ns" in columns:
+            candidates["scheduled_delivery_time"] = columns["scheduled_delivery_ns"][positions].view("datetime64[ns]")
+
+        top, scores = top_k_match_scores(request["shipment"], candidates, k, dest_threshold_km,
+                                         dest_distance=dest_distance)
+        results.append((positions[top], scores, None))
+
+    return results
+
+class ParallelMatcher:
+    """
+    Sharded matching engine for large fleets
+
+    The fleet is split into contiguous shards whose columns live in shared memory,
+    every shard is scored in a ProcessPoolExecutor worker, and the per-shard top-k
+    lists are merged. Results are the same as ShipmentIndex.recommend; use it as a
+    context manager (or call close()) to stop the workers and free the memory.
+    """
+
+    def __init__(self, fleet, workers=None, num_shards=None, goods_types_dict=None):
+        self.index = fleet if isinstance(fleet, ShipmentIndex) else get_shipment_index(fleet, goods_types_dict)
+        self.workers = workers or os.cpu_count() or 1
+        self.shared = SharedFleet(self.index, num_shards or self.workers)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stop the worker processes and release the shared memory"""
+        self.executor.shutdown()
+        self.shared.close()
+
+    def encode_request(self, shipment_info):
+        """Turn a shipment_info dict into the codes and plain values the workers use"""
+        registry = self.index.registry
+        shipment = {
+            "units": float(shipment_info["units"]),
+            "source_lat": float(shipment_info["source_lat"]),
+            "source_lon": float(shipment_info["source_lon"]),
+            "timestamp": np.datetime64(pd.Timestamp(shipment_info["timestamp"]).as_unit("ns")),
+            "company": self.index.encode_companies(shipment_info["company"]),
+        }
+        if "scheduled_delivery_time" in shipment_info:
+            shipment["scheduled_delivery_time"] = np.datetime64(
+                pd.Timestamp(shipment_info["scheduled_delivery_time"]).as_unit("ns"))
+
+        return {
+            "shipment": shipment,
+            "units": shipment["units"],
+            "timestamp_ns": int(to_epoch_ns([shipment_info["timestamp"]])[0]),
+            "dest_lat": float(shipment_info["dest_lat"]),
+            "dest_lon": float(shipment_info["dest_lon"]),
+            "shipment_id_code": int(self.index.encode_shipment_ids([shipment_info.get("shipment_id", "")])[0]),
+            "goods_code": int(registry.encode_goods(shipment_info["goods_type"])),
+            "temp_code": int(registry.encode_temp_ranges(shipment_info["temp_min"], shipment_info["temp_max"])),
+        }
+
+    def _merge(self, shard_results, request, k, dest_threshold_km):
+        """Merge the per-shard results of one request into its recommendations"""
+        positions = np.concatenate([positions for positions, _, _ in shard_results])
+        if len(positions):
+            scores = np.concatenate([scores for _, scores, _ in shard_results])
+            # Best score first, ties by dataset order
+            best = np.lexsort((positions, -scores))[:k]
+            return [build_recommendation(self.index.row(position), float(score))
+                    for position, score in zip(positions[best], scores[best])]
+
+        nearest = [nearest for _, _, nearest in shard_results if nearest is not None]
+        if not nearest:
+            return []
+
+        # If no compatible matches within threshold, fall back to the nearest match
+        nearest_distance, position = min(nearest)
+        candidates = self.index.take([position], ["storage_left", "source_lat", "source_lon",
+                                                  "timestamp", "scheduled_delivery_time"])
+        candidates["company"] = self.index.company_codes[[position]]
+        _, scores = top_k_match_scores(request["shipment"], candidates, 1, dest_threshold_km,
+                                       dest_distance=np.array([nearest_distance]))
+        return [build_recommendation(self.index.row(position), float(scores[0]), nearest_distance)]
+
+    def _run(self, shipment_infos, k, dest_threshold_km, time_threshold_hours, overlap_threshold):
+        """Send every request to every shard and merge the results per request"""
+        requests = [self.encode_request(shipment_info) for shipment_info in shipment_infos]
+        goods_matrix = self.index.registry.goods_matrix
+        temp_matrix = self.index.registry.temp_matrix(overlap_threshold)
+
+        futures = [
+            self.executor.submit(match_shard, self.shared.spec(), shard, requests, goods_matrix, temp_matrix,
+                                 k, dest_threshold_km, time_threshold_hours)
+            for shard in self.shared.shards
+        ]
+        shard_results = [future.result() for future in futures]
+
+        return [
+            self._merge([results[i] for results in shard_results], request, k, dest_threshold_km)
+            for i, request in enumerate(requests)
+        ]
+
+    def recommend(self, shipment_info, k=5, dest_threshold_km=50, time_threshold_hours=48, overlap_threshold=2):
+        """
+        Find the best matching trucks for a given shipment across all shards
+
+        Parameters are the same as ShipmentIndex.recommend.
+
+        Returns:
+        - List of recommended shipments with their matching scores, best first
+        """
+        return self._run([shipment_info], k, dest_threshold_km, time_threshold_hours, overlap_threshold)[0]
+
+    def recommend_batch(self, shipments_df, k=5, dest_threshold_km=50, time_threshold_hours=48, overlap_threshold=2):
+        """
+        Find the best matching trucks for many shipments, each shard scoring the whole batch
+
+        Returns:
+        - List with one list of recommendations per request, in shipments_df order
+        """
+        return self._run(shipments_df.to_dict("records"), k, dest_threshold_km,
+                         time_threshold_hours, overlap_threshold)
+
+# Throughput check: python -m backend_model.parallel_matching (next to the dataset)
+if __name__ == "__main__":
+    from backend_model.supply_chain_algorithm import load_data
+
+    # Load data
+    df_shipments = load_data()
+
+    batch = df_shipments.sample(min(500, len(df_shipments)), random_state=0).copy()
+    batch["shipment_id"] = [f"NEW{i:04d}" for i in range(len(batch))]
+    batch["units"] = 50
+
+    for workers in sorted({1, os.cpu_count() or 1}):
+        with ParallelMatcher(df_shipments, workers=workers) as matcher:
+            matcher.recommend(batch.iloc[0].to_dict())  # start the workers
+
+            start = time.perf_counter()
+            batch_results = matcher.recommend_batch(batch, k=5)
+            elapsed = time.perf_counter() - start
+
+        print(f"{workers} worker(s): {len(batch)} requests in {elapsed:.2f}s "
+              f"({len(batch) / elapsed:.0f} requests/second)")
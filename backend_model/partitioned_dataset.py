@@ -0,0 +1,251 @@
+import numpy as np
+import pandas as pd
+import json
+import os
+import shutil
+
+from backend_model.dataset_cache import feather, write_json
+from backend_model.spatial_index import circle_extent
+from backend_model.sorted_index import to_epoch_ns
+from backend_model.supply_chain_algorithm import COMPACT_DTYPES, read_dataset_csv
+
+# Size (degrees) of the destination grid cells the dataset is partitioned by
+DEFAULT_CELL_SIZE_DEG = 5.0
+
+# Rows read from the CSV at a time while partitioning
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# File listing every partition file and its min/max statistics
+MANIFEST_NAME = "manifest.json"
+
+# Hidden column keeping the original row order, so loaded rows come back in dataset order
+ROW_NUMBER_COLUMN = "_row_number"
+
+# Columns the data is partitioned by, in order of preference for the date
+DATE_COLUMNS = ["scheduled_delivery_time", "timestamp"]
+
+def _require_pyarrow():
+    """Partition files are Feather files, which need pyarrow"""
+    if feather is None:
+        raise ImportError("pyarrow is required for the partitioned dataset")
+
+def _partition_statistics(part):
+    """Min/max statistics of one partition file, as stored in the manifest"""
+    stats = {
+        "rows": len(part),
+        "dest_lat_min": float(part["dest_lat"].min()), "dest_lat_max": float(part["dest_lat"].max()),
+        "dest_lon_min": float(part["dest_lon"].min()), "dest_lon_max": float(part["dest_lon"].max()),
+        "storage_left_max": float(part["storage_left"].max()),
+    }
+    for column in ("timestamp", "scheduled_delivery_time"):
+        if column in part.columns:
+            values = to_epoch_ns(part[column])
+            stats[f"{column}_min"], stats[f"{column}_max"] = int(values.min()), int(values.max())
+    return stats
+
+# Swap a finished directory into place of root
+def _replace_directory(directory, root):
+    """Rename directory to root, removing the previous root only after the new one is in place"""
+    if not os.path.exists(root):
+        os.rename(directory, root)
+        return
+    # Directories cannot be renamed over each other, so move the old one aside first
+    old_root = f"{root}.{os.getpid()}.old"
+    os.rename(root, old_root)
+    os.rename(directory, root)
+    shutil.rmtree(old_root)
+
+def write_partitioned_dataset(source, root, cell_size_deg=DEFAULT_CELL_SIZE_DEG, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Write the fleet as Feather files partitioned by delivery date and destination grid cell
+
+    Layout: root/date=YYYY-MM-DD/cell=<lat cell>_<lon cell>/part-<chunk>.feather plus
+    root/manifest.json with the row count and min/max statistics of every file.
+    A CSV source is read chunk_rows rows at a time, so it may be larger than memory.
+    Files are written to a temporary sibling directory that replaces root only
+    once the manifest is written, so a failed run leaves the previous dataset intact.
+
+    Parameters:
+    - source: dataset CSV path, or a DataFrame in load_data layout
+    - root: output directory (replaced if it exists)
+    - cell_size_deg: size of the destination grid cells in degrees
+    - chunk_rows: rows read from a CSV source at a time
+
+    Returns:
+    - The manifest dict
+    """
+    _require_pyarrow()
+    chunks = read_dataset_csv(source, chunksize=chunk_rows) if isinstance(source, str) else [source]
+
+    root = os.path.abspath(root).rstrip(os.sep)
+    temporary_root = f"{root}.{os.getpid()}.tmp"
+    if os.path.exists(temporary_root):
+        shutil.rmtree(temporary_root)
+    os.makedirs(temporary_root)
+    try:
+        manifest = _write_partitions(chunks, temporary_root, cell_size_deg)
+        _replace_directory(temporary_root, root)
+    except BaseException:
+        shutil.rmtree(temporary_root, ignore_errors=True)
+        raise
+    return manifest
+
+# Write the partition files and manifest of a fresh dataset directory
+def _write_partitions(chunks, root, cell_size_deg):
+    """Partition every chunk under root and write the manifest; returns the manifest dict"""
+    partitions = []
+    row_offset = 0
+    for chunk_number, chunk in enumerate(chunks):
+        chunk = chunk.reset_index(drop=True)
+        chunk[ROW_NUMBER_COLUMN] = np.arange(row_offset, row_offset + len(chunk), dtype=np.int64)
+        row_offset += len(chunk)
+
+        date_column = next(column for column in DATE_COLUMNS if column in chunk.columns)
+        dates = pd.to_datetime(chunk[date_column]).dt.strftime("%Y-%m-%d")
+        lat_cells = np.floor(chunk["dest_lat"].to_numpy(dtype=np.float64) / cell_size_deg).astype(np.int64)
+        lon_cells = np.floor(chunk["dest_lon"].to_numpy(dtype=np.float64) / cell_size_deg).astype(np.int64)
+
+        for (date, lat_cell, lon_cell), part in chunk.groupby([dates, lat_cells, lon_cells], sort=True):
+            directory = os.path.join(f"date={date}", f"cell={lat_cell}_{lon_cell}")
+            os.makedirs(os.path.join(root, directory), exist_ok=True)
+            path = os.path.join(directory, f"part-{chunk_number:05d}.feather")
+            feather.write_feather(part.reset_index(drop=True), os.path.join(root, path), compression="uncompressed")
+
+            partitions.append(dict(path=path, date=date, lat_cell=int(lat_cell), lon_cell=int(lon_cell),
+                                   **_partition_statistics(part)))
+
+    manifest = {
+        "cell_size_deg": cell_size_deg,
+        "date_column": date_column if partitions else None,
+        "rows": row_offset,
+        "partitions": partitions,
+    }
+    write_json(os.path.join(root, MANIFEST_NAME), manifest)
+    return manifest
+
+def read_manifest(root):
+    """Return the manifest of a partitioned dataset"""
+    with open(os.path.join(root, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+def shipment_predicate(shipment_info, dest_threshold_km=50, time_threshold_hours=48):
+    """
+    Build the query predicate of a shipment: the rows it can be matched with lie in
+    the time window around its timestamp, have room for its units and deliver
+    within dest_threshold_km of its destination
+
+    Pass dest_threshold_km=None to drop the destination radius, e.g. to find the
+    nearest truck beyond the threshold (see recommend_from_partitions)
+    """
+    shipment_ns = pd.Timestamp(shipment_info["timestamp"]).value
+    window_ns = int(time_threshold_hours * 3.6e12)
+    predicate = {
+        "time_low": shipment_ns - window_ns,
+        "time_high": shipment_ns + window_ns,
+        "min_storage": shipment_info["units"],
+    }
+    if dest_threshold_km is not None:
+        predicate.update(dest_lat=shipment_info["dest_lat"], dest_lon=shipment_info["dest_lon"],
+                         radius_km=dest_threshold_km)
+    return predicate
+
+def partition_may_match(partition, predicate):
+    """
+    Check a partition's statistics against a predicate
+
+    Parameters:
+    - partition: manifest entry of one partition file
+    - predicate: dict with any of time_low/time_high (epoch ns, on timestamp),
+      min_storage, and dest_lat/dest_lon/radius_km
+
+    Returns:
+    - False only if no row of the partition can satisfy the predicate
+    """
+    if predicate.get("time_low") is not None and partition["timestamp_max"] < predicate["time_low"]:
+        return False
+    if predicate.get("time_high") is not None and partition["timestamp_min"] > predicate["time_high"]:
+        return False
+    if predicate.get("min_storage") is not None and partition["storage_left_max"] < predicate["min_storage"]:
+        return False
+
+    if predicate.get("radius_km") is not None:
+        lat, lon = predicate["dest_lat"], predicate["dest_lon"]
+        dlat, dlon = circle_extent(lat, predicate["radius_km"])
+        if partition["dest_lat_max"] < lat - dlat or partition["dest_lat_min"] > lat + dlat:
+            return False
+        if dlon is not None:
+            # Longitude distance from the query to the partition's range, across the antimeridian
+            low_offset = (partition["dest_lon_min"] - lon + 180) % 360 - 180
+            high_offset = (partition["dest_lon_max"] - lon + 180) % 360 - 180
+            inside = low_offset <= 0 <= high_offset
+            if not inside and min(abs(low_offset), abs(high_offset)) > dlon:
+                return False
+
+    return True
+
+def load_partitioned_dataset(root, predicate=None):
+    """
+    Load the rows of a partitioned dataset, reading only partitions that can match
+
+    Parameters:
+    - root: directory written by write_partitioned_dataset
+    - predicate: optional predicate dict (see partition_may_match and shipment_predicate)
+
+    Returns:
+    - DataFrame of the rows in the selected partitions, in original dataset order.
+      Rows are not filtered individually: the matcher applies the exact criteria.
+    """
+    _require_pyarrow()
+    manifest = read_manifest(root)
+    partitions = [partition for partition in manifest["partitions"]
+                  if predicate is None or partition_may_match(partition, predicate)]
+
+    frames = [feather.read_table(os.path.join(root, partition["path"]), memory_map=True).to_pandas()
+              for partition in partitions]
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    df = df.sort_values(ROW_NUMBER_COLUMN, kind="stable").drop(columns=ROW_NUMBER_COLUMN).reset_index(drop=True)
+
+    # Partition files have their own categories; concat falls back to strings
+    for column, dtype in COMPACT_DTYPES.items():
+        if dtype == "category" and column in df.columns:
+            df[column] = df[column].astype("category")
+    return df
+
+def recommend_from_partitions(root, shipment_info, goods_types_dict, num_recommendations=5,
+                              dest_threshold_km=50, time_threshold_hours=48, overlap_threshold=2, fallback=True):
+    """
+    Find the best matching trucks for a shipment, reading only the partitions that can hold them
+
+    Gives the same recommendations as recommend_best_matches on the whole dataset.
+    The partitions inside the destination radius are read first. If no truck there
+    matches, the matcher falls back to the nearest truck beyond the threshold, which
+    may lie in any partition, so the partitions of the time window are read again
+    without the radius.
+
+    Parameters:
+    - root: directory written by write_partitioned_dataset
+    - shipment_info, goods_types_dict, num_recommendations, dest_threshold_km,
+      time_threshold_hours, overlap_threshold: as for recommend_best_matches
+    - fallback: False skips the second read and the nearest-truck fallback, so
+      only matches inside the destination radius are returned
+
+    Returns:
+    - List of recommended shipments with their matching scores
+    """
+    from backend_model.supply_chain_algorithm import recommend_best_matches
+
+    def recommend(predicate):
+        fleet = load_partitioned_dataset(root, predicate)
+        if fleet.empty:
+            return []
+        return recommend_best_matches(shipment_info, fleet, goods_types_dict, num_recommendations,
+                                      dest_threshold_km, time_threshold_hours, overlap_threshold)
+
+    recommendations = recommend(shipment_predicate(shipment_info, dest_threshold_km, time_threshold_hours))
+    within_threshold = [match for match in recommendations if not match.get("exceeds_threshold")]
+    if within_threshold or not fallback:
+        return within_threshold
+    return recommend(shipment_predicate(shipment_info, None, time_threshold_hours))
@@ -0,0 +1,230 @@
+import pandas as pd
+import numpy as np
+
+from backend_model.spatial_index import haversine_distance
+
+# Maximum absolute difference (in points) between calculate_match_scores and
+# calculate_match_score. Haversine stays within 0.6% of the WGS-84 geodesic, and
+# the proximity components are continuous at their thresholds, so the destination
+# (20 points) and source (15 points) terms drift by at most 0.12 + 0.09 points.
+SCORE_TOLERANCE = 0.25
+
+# Convert a timestamp or a column of timestamps to float hours since the epoch
+def to_epoch_hours(values):
+    """Convert a datetime scalar, Series or array to hours since the epoch"""
+    if np.ndim(values) == 0:
+        return pd.Timestamp(values).value / 3.6e12
+    
+    values = np.asarray(values)
+    if values.dtype.kind != "M":
+        values = np.asarray(pd.to_datetime(values))
+    return values.astype("datetime64[ns]").astype(np.int64) / 3.6e12
+
+# Maximum points of each score component (they add up to 100)
+STORAGE_POINTS = 35
+DESTINATION_POINTS = 20
+SOURCE_POINTS = 15
+TIMING_POINTS = 10
+COMPANY_POINTS = 5
+DELIVERY_POINTS = 15
+
+# 1. Storage space - higher available space gets higher score (max 35 points)
+def storage_points(shipment, candidates):
+    """Storage component of the match score for every candidate"""
+    storage_ratio = np.asarray(candidates["storage_left"], dtype=np.float64) / shipment["units"]
+    return np.where(storage_ratio >= 1,
+                    np.minimum(STORAGE_POINTS, 20 + 15 * (storage_ratio - 1)),
+                    20 * storage_ratio)
+
+# 2. Destination proximity - closer destinations get higher score (max 20 points)
+def destination_points(dest_distance, dest_threshold_km=50):
+    """Destination proximity component for precomputed destination distances (km)"""
+    dest_distance = np.asarray(dest_distance, dtype=np.float64)
+    return np.where(dest_distance <= dest_threshold_km,
+                    np.maximum(0, DESTINATION_POINTS * (1 - dest_distance / dest_threshold_km)), 0)
+
+# 3. Source proximity - closer pickup locations get higher score (max 15 points)
+def source_points(shipment, candidates):
+    """Source proximity component of the match score for every candidate"""
+    source_distance = haversine_distance(shipment["source_lat"], shipment["source_lon"],
+                                         candidates["source_lat"], candidates["source_lon"])
+    source_threshold_km = 30
+    return np.where(source_distance <= source_threshold_km,
+                    np.maximum(0, SOURCE_POINTS * (1 - source_distance / source_threshold_km)), 0)
+
+# 4. Timing - shipments closer in time get higher score (max 10 points)
+def timing_points(shipment, candidates):
+    """Timing component of the match score for every candidate"""
+    time_diff = np.abs(to_epoch_hours(candidates["timestamp"]) - to_epoch_hours(shipment["timestamp"]))
+    time_threshold = 48
+    return np.where(time_diff <= time_threshold,
+                    np.maximum(0, TIMING_POINTS * (1 - time_diff / time_threshold)), 0)
+
+# 5. Different company bonus (encouraging cross-company collaboration) - 5 points
+def company_points(shipment, candidates):
+    """Cross-company bonus of the match score for every candidate"""
+    return COMPANY_POINTS * (np.asarray(candidates["company"]) != shipment["company"])
+
+# 6. Scheduled delivery time compatibility (max 15 points)
+def has_delivery_times(shipment, candidates):
+    """Check whether the delivery component applies to this shipment and candidates"""
+    return "scheduled_delivery_time" in shipment and "scheduled_delivery_time" in candidates
+
+def delivery_points(shipment, candidates):
+    """Delivery alignment component of the match score (0 when delivery times are missing)"""
+    if not has_delivery_times(shipment, candidates):
+        return 0.0
+    delivery_diff = np.abs(to_epoch_hours(candidates["scheduled_delivery_time"]) -
+                           to_epoch_hours(shipment["scheduled_delivery_time"]))
+    delivery_threshold = 24
+    return np.where(delivery_diff <= delivery_threshold,
+                    np.maximum(0, DELIVERY_POINTS * (1 - delivery_diff / delivery_threshold)), 0)
+
+# Calculate match scores for a whole block of candidates at once
+def calculate_match_scores(shipment, candidates, dest_threshold_km=50, dest_distance=None):
+    """
+    Vectorized version of calculate_match_score
+    
+    Parameters:
+    - shipment: dict with details of the shipment needing space
+    - candidates: DataFrame (or dict of equal-length arrays) of potential matches
+    - dest_threshold_km: Maximum distance between destinations to be considered close
+    - dest_distance: Optional precomputed destination distances (km) for the candidates
+    
+    Shipment values may also be column arrays of shape (requests, 1) to score a
+    block of requests against the candidates as a (requests, candidates) matrix;
+    company values then only need to be comparable codes.
+    
+    Returns:
+    - float64 array of scores (0-100), within SCORE_TOLERANCE of calculate_match_score
+    """
+    if dest_distance is None:
+        dest_distance = haversine_distance(shipment["dest_lat"], shipment["dest_lon"],
+                                           candidates["dest_lat"], candidates["dest_lon"])
+    
+    # Components are added in the same order as calculate_match_score
+    scores = storage_points(shipment, candidates)
+    scores = scores + destination_points(dest_distance, dest_threshold_km)
+    scores = scores + source_points(shipment, candidates)
+    scores = scores + timing_points(shipment, candidates)
+    scores = scores + company_points(shipment, candidates)
+    scores = scores + delivery_points(shipment, candidates)
+    
+    return scores
+
+# Pick the best k scores without sorting all of them
+def select_top_k(scores, k):
+    """
+    Return the indices of the k highest scores, best first
+    
+    Uses argpartition to find the k-th best score and only sorts the scores at or
+    above it. Ties are broken by index, like a stable descending sort.
+    """
+    scores = np.asarray(scores)
+    if len(scores) > k:
+        kth_best = np.partition(scores, len(scores) - k)[len(scores) - k]
+        indices = np.flatnonzero(scores >= kth_best)
+    else:
+        indices = np.arange(len(scores))
+    
+    return indices[np.argsort(-scores[indices], kind="stable")[:k]]
+
+# Score candidates and keep the best k, skipping work for hopeless candidates
+def top_k_match_scores(shipment, candidates, k, dest_threshold_km=50, dest_distance=None):
+    """
+    Find the k best candidates for a shipment
+    
+    The cheap components (storage, destination, timing, company) are computed for
+    every candidate first. Their sum is a lower bound of the final score and adding
+    the maximum source and delivery points gives an upper bound, so any candidate
+    whose upper bound is below the k-th best lower bound is dropped before the
+    source distance and delivery alignment are computed.
+    
+    Parameters:
+    - shipment: dict with details of the shipment needing space
+    - candidates: DataFrame (or dict of equal-length arrays) of potential matches
+    - k: Number of matches to keep
+    - dest_threshold_km: Maximum distance between destinations to be considered close
+    - dest_distance: Optional precomputed destination distances (km) for the candidates
+    
+    Returns:
+    - (indices, scores): candidate indices of the best k (best first, ties by index)
+      and their scores, equal to calculate_match_scores for those candidates
+    """
+    if dest_distance is None:
+        dest_distance = haversine_distance(shipment["dest_lat"], shipment["dest_lon"],
+                                           candidates["dest_lat"], candidates["dest_lon"])
+    
+    storage = storage_points(shipment, candidates)
+    destination = destination_points(dest_distance, dest_threshold_km)
+    timing = timing_points(shipment, candidates)
+    company = company_points(shipment, candidates)
+    
+    alive = np.arange(len(storage))
+    if len(storage) > k:
+        lower_bound = storage + destination + timing + company
+        remaining_points = SOURCE_POINTS + (DELIVERY_POINTS if has_delivery_times(shipment, candidates) else 0)
+        kth_best = np.partition(lower_bound, len(lower_bound) - k)[len(lower_bound) - k]
+        alive = np.flatnonzero(lower_bound + remaining_points >= kth_best)
+    
+    survivors = {column: np.asarray(candidates[column])[alive]
+                 for column in ("source_lat", "source_lon", "scheduled_delivery_time")
+                 if column in candidates}
+    
+    # Same summation order as calculate_match_scores, so the scores are identical
+    scores = storage[alive] + destination[alive]
+    scores = scores + source_points(shipment, survivors)
+    scores = scores + timing[alive]
+    scores = scores + company[alive]
+    scores = scores + delivery_points(shipment, survivors)
+    
+    top = select_top_k(scores, k)
+    return alive[top], scores[top]
+
+# Python float of a column value; float32 columns (see COMPACT_DTYPES) keep their
+# shortest decimal form, e.g. 1.23 rather than 1.2300000190734863
+def to_python_float(value):
+    return float(str(value)) if isinstance(value, np.float32) else float(value)
+
+# Build the result dictionary returned for one recommended truck
+def build_recommendation(match, score, distance=None):
+    """
+    Turn a candidate row (dict or Series) and its score into a recommendation dict
+
+    Numbers are returned as Python floats (not NumPy scalars), so the result can be
+    passed to json.dumps like the rows of the original matcher
+    """
+    result = {
+        "shipment_id": match["shipment_id"],
+        "company": match["company"],
+        "truck_type": match["truck_type"],
+        "source": match["source"],
+        "destination": match["destination"],
+        "storage_left": float(match["storage_left"]),
+        "goods_type": match["goods_type"],
+        "score": float(score),
+    }
+    
+    # Add scheduled delivery time if available
+    if "scheduled_delivery_time" in match:
+        result["scheduled_delivery_time"] = match["scheduled_delivery_time"]
+    
+    # Add carbon footprint data if available (static calculation)
+    if "carbon_footprint_per_km" in match:
+        result["carbon_footprint_per_km"] = to_python_float(match["carbon_footprint_per_km"])
+        
+        # Calculate static carbon savings (assuming 30% savings from sharing)
+        # This is a simplified model that avoids dynamic calculations
+        base_emissions = to_python_float(match["carbon_footprint_per_km"])
+        carbon_savings_percent = 30.0  # Fixed 30% savings
+        carbon_savings = base_emissions * 0.3  # 30% of the base emissions
+        
+        result["carbon_savings_percent"] = carbon_savings_percent
+        result["carbon_savings"] = round(carbon_savings, 2)
+    
+    # Add distance info if this is the nearest match that exceeds threshold
+    if distance is not None:
+        result["exceeds_threshold"] = True
+        result["distance"] = float(distance)
+    
+    return result
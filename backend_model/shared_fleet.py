@@ -0,0 +1,369 @@
+import numpy as np
+import pandas as pd
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from backend_model.goods_compatibility import GOODS_TYPES, get_compatibility_registry
+from backend_model.shipment_index import ShipmentIndex, get_shipment_index
+from backend_model.sorted_index import SortedColumnIndex, FleetSortedIndex
+from backend_model.spatial_index import SpatialGridIndex, FleetSpatialIndex
+from backend_model.dataset_cache import write_atomic, write_json
+from backend_model.fleet_summary import FleetSummary, load_fleet_summary
+from backend_model.supply_chain_algorithm import load_data, build_fleet_lookups
+
+# Default directory of the published fleet: tmpfs when available, so the data lives in RAM once per node
+DEFAULT_SHARED_FLEET_DIR = "/dev/shm/cargo_sharing_fleet" if os.path.isdir("/dev/shm") else \
+    os.path.join(tempfile.gettempdir(), "cargo_sharing_fleet")
+
+# File holding the number of the current generation; replacing it publishes a new fleet
+CURRENT_FILE = "current.json"
+
+# Generations kept on disk, so readers attaching while a new one is published find their files
+KEEP_GENERATIONS = 2
+
+# Bump when the file layout changes
+SHARED_FORMAT_VERSION = 1
+
+# String columns of the index, stored as codes into a list of names
+CODED_COLUMNS = ["truck_type", "source", "destination"]
+
+def _generation_paths(root, generation):
+    """Return the (data, header) paths of one generation"""
+    return (os.path.join(root, f"fleet-{generation:06d}.bin"),
+            os.path.join(root, f"fleet-{generation:06d}.json"))
+
+def read_generation(root):
+    """Return the number of the current generation in root (0 if nothing is published)"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return json.load(f)["generation"]
+    except (OSError, ValueError, KeyError):
+        return 0
+
+def _encode_names(names):
+    """Names as a fixed-width UTF-8 bytes array (with a fast path for ASCII names)"""
+    values = np.asarray(names, dtype=object)
+    try:
+        return values.astype(bytes)
+    except UnicodeEncodeError:
+        return np.array([str(name).encode() for name in values], dtype=bytes)
+
+def _index_arrays(index):
+    """
+    Every array a ShipmentIndex is made of, by name
+
+    Returns:
+    - (arrays, names): dict of NumPy arrays, and the names of the string columns'
+      codes (small lists, stored in the header)
+    """
+    arrays = {
+        "shipment_id_codes": index.shipment_id_codes,
+        "shipment_id_names": _encode_names(index.shipment_id_names),
+        "company_codes": index.company_codes,
+        "goods_codes": index.goods_codes,
+        "temp_codes": index.temp_codes,
+        "time_order": index.sorted.timestamp.order,
+        "time_sorted": index.sorted.timestamp.sorted_values,
+        "storage_order": index.sorted.storage_left.order,
+        "storage_sorted": index.sorted.storage_left.sorted_values,
+    }
+    for column in ("storage_left", "source_lat", "source_lon", "dest_lat", "dest_lon", "carbon_footprint_per_km"):
+        if column in index.columns:
+            arrays[column] = np.asarray(index.columns[column])
+    for column in ("timestamp", "scheduled_delivery_time"):
+        if column in index.columns:
+            arrays[column] = index.columns[column].view(np.int64)
+    for side in ("dest", "source"):
+        grid = getattr(index.spatial, side)
+        for attribute in ("positions", "cell_starts", "cell_ends", "cell_lat", "cell_lon"):
+            arrays[f"{side}_{attribute}"] = getattr(grid, attribute)
+
+    names = {}
+    for column in CODED_COLUMNS:
+        codes, uniques = pd.factorize(index.columns[column])
+        arrays[f"{column}_codes"] = codes.astype(np.int32)
+        names[column] = [str(name) for name in uniques]
+    return arrays, names
+
+def publish_fleet(df, root=DEFAULT_SHARED_FLEET_DIR, goods_types_dict=None, lookups=None, summary=None):
+    """
+    Publish a fleet for other processes to attach to with FleetSubscriber
+
+    The fleet's ShipmentIndex (numeric columns, string column codes, sorted and
+    spatial indexes) is written into one memory-mapped file of a new generation,
+    then the generation counter is bumped. Readers therefore see either the old
+    or the new fleet, never a mix. Files of generations older than the last
+    KEEP_GENERATIONS are removed; processes still mapping them keep their data
+    until they move on.
+
+    Parameters:
+    - df: fleet DataFrame (load_data output)
+    - root: directory of the published fleet (default: under /dev/shm)
+    - lookups: optional build_fleet_lookups(df) output to publish with the fleet
+    - summary: optional FleetSummary to publish with the fleet
+
+    Returns:
+    - The number of the new generation
+    """
+    os.makedirs(root, exist_ok=True)
+    index = get_shipment_index(df, goods_types_dict)
+    arrays, names = _index_arrays(index)
+
+    # Lay the arrays out back to back, 64-byte aligned
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = (offset, array.dtype.str, len(array))
+        offset += -(-array.nbytes // 64) * 64
+
+    generation = read_generation(root) + 1
+    data_path, header_path = _generation_paths(root, generation)
+
+    def write(target):
+        data = np.memmap(target, dtype=np.uint8, mode="w+", shape=max(offset, 1))
+        for name, array in arrays.items():
+            start, dtype, length = layout[name]
+            data[start:start + array.nbytes].view(dtype)[:] = array
+        data.flush()
+        del data
+
+    write_atomic(data_path, write)
+    write_json(header_path, {
+        "format_version": SHARED_FORMAT_VERSION,
+        "generation": generation,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "size": index.size,
+        "layout": layout,
+        "names": names,
+        "company_names": [str(name) for name in index.company_names],
+        "goods_names": list(index.registry.goods_names),
+        "temp_ranges": index.registry.temp_ranges.tolist(),
+        "cell_size_deg": index.spatial.dest.cell_size_deg,
+        "result_columns": index.result_columns,
+        "lookups": lookups,
+        "summary": None if summary is None else summary.to_dict(),
+    })
+    write_json(os.path.join(root, CURRENT_FILE), {"generation": generation})
+
+    # Remove generations no reader can still be attaching to
+    for old in range(generation - KEEP_GENERATIONS, 0, -1):
+        old_paths = _generation_paths(root, old)
+        if not os.path.exists(old_paths[0]):
+            break
+        for path in old_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return generation
+
+class CodedColumn:
+    """
+    Read-only string column stored as integer codes into an array of names
+
+    Indexing works like the object arrays of a ShipmentIndex: a position gives a
+    str, an array of positions an object array. Names stored as bytes (the
+    shipment ids, kept in the shared file) are decoded on access.
+    """
+
+    def __init__(self, codes, names):
+        self.codes = codes
+        self.names = names
+        self.decode = names.dtype.kind == "S"
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, key):
+        values = self.names[self.codes[key]]
+        if not self.decode:
+            return values
+        if np.ndim(values) == 0:
+            return values.decode()
+        return np.char.decode(values, "utf-8").astype(object)
+
+# Objects of the index classes rebuilt from published arrays, without recomputing them
+def _restore(cls, **attributes):
+    """Create an instance of cls with the given attributes, skipping __init__"""
+    instance = cls.__new__(cls)
+    instance.__dict__.update(attributes)
+    return instance
+
+class SharedShipmentIndex(ShipmentIndex):
+    """
+    ShipmentIndex over a published fleet, attached read-only
+
+    Every array is a view of the generation's memory-mapped file, so all attached
+    processes share one copy of the fleet in the page cache. Only the short lists
+    of names from the header are private. Queries work as on a ShipmentIndex built
+    from the DataFrame and give the same results.
+    """
+
+    def __init__(self, data_path, header, goods_types_dict=None):
+        self.generation = header["generation"]
+        self.size = header["size"]
+        self.registry = get_compatibility_registry(goods_types_dict)
+        self._data = np.memmap(data_path, dtype=np.uint8, mode="r")
+        arrays = {
+            name: self._data[offset:offset + length * np.dtype(dtype).itemsize].view(dtype)
+            for name, (offset, dtype, length) in header["layout"].items()
+        }
+
+        # Codes follow the publisher's registry; remap them (a private copy) only
+        # if this process registered goods types or temperature ranges differently
+        goods_lookup = self.registry.encode_goods(np.array(header["goods_names"], dtype=object))
+        temp_ranges = np.array(header["temp_ranges"], dtype=np.float64).reshape(-1, 2)
+        temp_lookup = self.registry.encode_temp_ranges(temp_ranges[:, 0], temp_ranges[:, 1])
+        self.goods_codes = arrays["goods_codes"]
+        if not np.array_equal(goods_lookup, np.arange(len(goods_lookup))):
+            self.goods_codes = goods_lookup[self.goods_codes]
+        self.temp_codes = arrays["temp_codes"]
+        if not np.array_equal(temp_lookup, np.arange(len(temp_lookup))):
+            self.temp_codes = temp_lookup[self.temp_codes]
+
+        self.shipment_id_names = arrays["shipment_id_names"]
+        self.shipment_id_codes = arrays["shipment_id_codes"]
+        self.company_names = pd.Index(header["company_names"], dtype=object)
+        self.company_lookup = {name: code for code, name in enumerate(self.company_names)}
+        self.company_codes = arrays["company_codes"]
+
+        self.columns = {
+            "shipment_id": CodedColumn(self.shipment_id_codes, self.shipment_id_names),
+            "company": CodedColumn(self.company_codes, self.company_names.to_numpy()),
+            "goods_type": CodedColumn(arrays["goods_codes"], np.array(header["goods_names"], dtype=object)),
+        }
+        for column in CODED_COLUMNS:
+            self.columns[column] = CodedColumn(arrays[f"{column}_codes"],
+                                               np.array(header["names"][column], dtype=object))
+        for column in ("storage_left", "source_lat", "source_lon", "dest_lat", "dest_lon", "carbon_footprint_per_km"):
+            if column in arrays:
+                self.columns[column] = arrays[column]
+        for column in ("timestamp", "scheduled_delivery_time"):
+            if column in arrays:
+                self.columns[column] = arrays[column].view("datetime64[ns]")
+        self.result_columns = header["result_columns"]
+
+        self.sorted = _restore(
+            FleetSortedIndex, size=self.size,
+            timestamp=_restore(SortedColumnIndex, values=arrays["timestamp"], order=arrays["time_order"],
+                               sorted_values=arrays["time_sorted"]),
+            storage_left=_restore(SortedColumnIndex, values=arrays["storage_left"], order=arrays["storage_order"],
+                                  sorted_values=arrays["storage_sorted"]),
+        )
+        grids = {
+            side: _restore(SpatialGridIndex, cell_size_deg=header["cell_size_deg"], size=self.size,
+                           lat=arrays[f"{side}_lat"], lon=arrays[f"{side}_lon"],
+                           **{attribute: arrays[f"{side}_{attribute}"]
+                              for attribute in ("positions", "cell_starts", "cell_ends", "cell_lat", "cell_lon")})
+            for side in ("dest", "source")
+        }
+        self.spatial = _restore(FleetSpatialIndex, size=self.size, **grids)
+
+    def same_shipment_mask(self, positions, shipment_id):
+        """Check which of the given rows are the shipment with this id (compared by code)"""
+        return self.shipment_id_codes[positions] == self.encode_shipment_ids([shipment_id])[0]
+
+    def encode_shipment_ids(self, shipment_ids):
+        """Encode shipment ids as shipment id codes (-1 for ids not in the fleet)"""
+        encoded = np.array([str(shipment_id).encode() for shipment_id in shipment_ids], dtype=bytes)
+        if len(encoded) == 0 or len(self.shipment_id_names) == 0:
+            return np.full(len(encoded), -1, dtype=np.int64)
+        # The names are sorted (categories of the publisher's pd.Categorical), UTF-8 keeps that order
+        codes = np.minimum(np.searchsorted(self.shipment_id_names, encoded), len(self.shipment_id_names) - 1)
+        return np.where(self.shipment_id_names[codes] == encoded, codes, -1).astype(np.int64)
+
+class AttachedFleet:
+    """
+    One generation of a published fleet, attached read-only
+
+    Attributes:
+    - generation: number of the generation
+    - index: SharedShipmentIndex of the fleet (pass it to recommend_best_matches
+      in place of the DataFrame)
+    - lookups: build_fleet_lookups output published with the fleet (or None)
+    - summary: FleetSummary published with the fleet (or None)
+    """
+
+    def __init__(self, root, generation, goods_types_dict=None):
+        data_path, header_path = _generation_paths(root, generation)
+        with open(header_path) as f:
+            header = json.load(f)
+        if header.get("format_version") != SHARED_FORMAT_VERSION:
+            raise ValueError(f"Unsupported shared fleet format in {header_path}")
+
+        self.generation = generation
+        self.index = SharedShipmentIndex(data_path, header, goods_types_dict)
+        self.lookups = header["lookups"]
+        if self.lookups is not None:
+            # JSON turned the coordinate and temperature tuples into lists
+            self.lookups["city_coordinates"] = {city: tuple(point)
+                                                for city, point in self.lookups["city_coordinates"].items()}
+            self.lookups["goods_temp_ranges"] = {goods: tuple(temp_range)
+                                                 for goods, temp_range in self.lookups["goods_temp_ranges"].items()}
+        self.summary = None if header["summary"] is None else FleetSummary.from_dict(header["summary"])
+
+class FleetSubscriber:
+    """
+    Keeps a process attached to the current generation of a published fleet
+
+    current() checks the generation counter (one small file read) and attaches to
+    a new generation when one was published, so a long-running worker picks up
+    fleet swaps without restarting. The previous generation is released when no
+    reference to its AttachedFleet is left.
+    """
+
+    def __init__(self, root=DEFAULT_SHARED_FLEET_DIR, goods_types_dict=None):
+        self.root = root
+        self.goods_types_dict = GOODS_TYPES if goods_types_dict is None else goods_types_dict
+        self._fleet = None
+
+    def current(self, retries=3):
+        """Return the AttachedFleet of the current generation (FileNotFoundError if none is published)"""
+        for attempt in range(retries):
+            generation = read_generation(self.root)
+            if generation == 0:
+                raise FileNotFoundError(f"No fleet published in {self.root}")
+            if self._fleet is not None and self._fleet.generation == generation:
+                return self._fleet
+            try:
+                self._fleet = AttachedFleet(self.root, generation, self.goods_types_dict)
+                return self._fleet
+            except FileNotFoundError:
+                # Two newer generations were published while attaching; read the counter again
+                if attempt == retries - 1:
+                    raise
+
+def publish_dataset(csv_path, root=DEFAULT_SHARED_FLEET_DIR, goods_types_dict=None):
+    """Load a dataset CSV and publish it with its lookups and overview summary"""
+    df = load_data(csv_path)
+    return publish_fleet(df, root, goods_types_dict, build_fleet_lookups(df), load_fleet_summary(csv_path, df))
+
+def run_publisher(csv_path, root=DEFAULT_SHARED_FLEET_DIR, interval_s=10.0):
+    """
+    Loader process: publish the dataset, then republish it whenever the CSV changes
+
+    Parameters:
+    - csv_path: path of the dataset CSV
+    - root: directory of the published fleet
+    - interval_s: seconds between checks of the CSV's size and modification time
+    """
+    published = None
+    while True:
+        stat = os.stat(csv_path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if signature != published:
+            start = time.perf_counter()
+            generation = publish_dataset(csv_path, root)
+            published = signature
+            print(f"Published generation {generation} of {csv_path} to {root} in {time.perf_counter() - start:.2f}s")
+        time.sleep(interval_s)
+
+# Loader process: python -m backend_model.shared_fleet [path/to/cargo_sharing_dataset.csv] [shared fleet dir]
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "cargo_sharing_dataset.csv"
+    root = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_SHARED_FLEET_DIR
+    run_publisher(csv_path, root)
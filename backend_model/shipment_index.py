@@ -0,0 +1,308 @@
+import numpy as np
+import pandas as pd
+import weakref
+
+from backend_model.goods_compatibility import GOODS_TYPES, get_compatibility_registry
+from backend_model.spatial_index import FleetSpatialIndex, haversine_distance
+from backend_model.sorted_index import FleetSortedIndex, to_epoch_ns
+from backend_model.scoring import top_k_match_scores, build_recommendation
+from backend_model.metrics import get_loader_metrics
+
+# Columns copied into the result dictionaries of recommend()
+RESULT_COLUMNS = ["shipment_id", "company", "truck_type", "source", "destination",
+                  "storage_left", "goods_type"]
+OPTIONAL_RESULT_COLUMNS = ["scheduled_delivery_time", "carbon_footprint_per_km"]
+
+# Columns read by the match score
+SCORING_COLUMNS = ["storage_left", "source_lat", "source_lon", "timestamp", "scheduled_delivery_time"]
+
+class ShipmentIndex:
+    """
+    Read-only, query-ready view of a fleet DataFrame
+
+    Built once from load_data output: holds typed NumPy columns, goods and
+    temperature codes, the sorted timestamp/storage indexes and the spatial
+    indexes. recommend() works on row positions and only materializes the final
+    recommendations, so no DataFrame is filtered, copied or modified per call.
+    """
+
+    def __init__(self, df, goods_types_dict=None):
+        self.size = len(df)
+        self.registry = get_compatibility_registry(goods_types_dict)
+
+        # Typed columns in dataset order
+        self.columns = {column: df[column].to_numpy() for column in RESULT_COLUMNS}
+        for column in OPTIONAL_RESULT_COLUMNS:
+            if column in df.columns:
+                self.columns[column] = df[column].to_numpy()
+        for column in ("storage_left", "source_lat", "source_lon", "dest_lat", "dest_lon"):
+            self.columns[column] = df[column].to_numpy(dtype=np.float64)
+        for column in ("timestamp", "scheduled_delivery_time"):
+            if column in df.columns:
+                self.columns[column] = to_epoch_ns(df[column]).view("datetime64[ns]")
+
+        self.result_columns = RESULT_COLUMNS + [column for column in OPTIONAL_RESULT_COLUMNS
+                                                if column in self.columns]
+
+        # Precomputed shipment id, company and compatibility codes
+        shipment_ids = pd.Categorical(df["shipment_id"])
+        self.shipment_id_names = shipment_ids.categories
+        self.shipment_id_codes = shipment_ids.codes.astype(np.int64)
+
+        companies = pd.Categorical(df["company"])
+        self.company_names = companies.categories
+        self.company_lookup = {name: code for code, name in enumerate(self.company_names)}
+        self.company_codes = companies.codes.astype(np.int32)
+        self.goods_codes = self.registry.encode_goods(df["goods_type"].to_numpy())
+        self.temp_codes = self.registry.encode_temp_ranges(df["temp_min"].to_numpy(), df["temp_max"].to_numpy())
+
+        # Time/storage and destination/source indexes
+        self.sorted = FleetSortedIndex(self.columns["timestamp"].view(np.int64), self.columns["storage_left"])
+        self.spatial = FleetSpatialIndex(self.columns)
+
+    def __len__(self):
+        return self.size
+
+    def take(self, positions, columns=None):
+        """Return the typed columns (all, or the given ones) for the given row positions as a dict of arrays"""
+        columns = self.columns if columns is None else [column for column in columns if column in self.columns]
+        return {column: self.columns[column][positions] for column in columns}
+
+    def row(self, position):
+        """Return the result columns of one row as a dict of Python/pandas scalars"""
+        row = {column: self.columns[column][position] for column in self.result_columns}
+        if "scheduled_delivery_time" in row:
+            row["scheduled_delivery_time"] = pd.Timestamp(row["scheduled_delivery_time"])
+        return row
+
+    def encode_shipment_ids(self, shipment_ids):
+        """Encode shipment ids as shipment id codes (-1 for ids not in the fleet)"""
+        return self.shipment_id_names.get_indexer(pd.Index(shipment_ids, dtype=object)).astype(np.int64)
+
+    def same_shipment_mask(self, positions, shipment_id):
+        """Check which of the given rows are the shipment with this id"""
+        return self.columns["shipment_id"][positions] == shipment_id
+
+    def encode_companies(self, companies):
+        """Encode company names (scalar or array-like) as company codes (-1 for companies not in the fleet)"""
+        if np.ndim(companies) == 0:
+            return self.company_lookup.get(companies, -1)
+        return self.company_names.get_indexer(pd.Index(companies, dtype=object)).astype(np.int32)
+
+    def compatible_mask(self, shipment_info, positions, overlap_threshold=2):
+        """Check goods and temperature compatibility of the given rows with one matrix lookup each"""
+        return self.registry.compatible_mask(
+            shipment_info["goods_type"],
+            (shipment_info["temp_min"], shipment_info["temp_max"]),
+            self.goods_codes[positions],
+            self.temp_codes[positions],
+            overlap_threshold
+        )
+
+    def find_candidates(self, shipment_info, dest_threshold_km=50, time_threshold_hours=48, overlap_threshold=2,
+                        alive=None, fallback=True, trace=None):
+        """
+        Find the trucks a shipment can be matched with
+
+        Parameters:
+        - shipment_info: dict with details of the shipment needing space
+        - dest_threshold_km: Maximum distance between destinations to be considered close
+        - time_threshold_hours: Maximum time difference between shipments
+        - overlap_threshold: Minimum temperature range overlap required in degrees
+        - alive: optional function mapping row positions to a boolean mask of the rows
+          that may be matched (used to hide deleted rows)
+        - fallback: whether to look for the nearest match when none is inside the threshold
+        - trace: optional MatchTrace recording stage times and candidate counts
+
+        Returns:
+        - (positions, dest_distance, nearest_distance): row positions in dataset order,
+          their destination distances, and the distance of the nearest match when it
+          is returned as an exceeds_threshold fallback (None otherwise)
+        """
+        empty = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64), None
+        shipment_id = shipment_info.get("shipment_id", "")
+        units = shipment_info["units"]
+
+        # Time window in epoch nanoseconds
+        shipment_ns = pd.Timestamp(shipment_info["timestamp"]).value
+        window_ns = time_threshold_hours * 3.6e12
+        time_low, time_high = shipment_ns - window_ns, shipment_ns + window_ns
+
+        def passes_filters(positions, check_basic=True):
+            """Check basic criteria, goods and temperature compatibility for the given rows"""
+            # Must not be the same shipment
+            mask = ~self.same_shipment_mask(positions, shipment_id)
+            if alive is not None:
+                mask &= alive(positions)
+
+            if check_basic:
+                # Must have enough storage space left and be within the time window
+                mask &= self.sorted.storage_left.in_range(positions, low=units)
+                mask &= self.sorted.timestamp.in_range(positions, time_low, time_high)
+
+            return mask & self.compatible_mask(shipment_info, positions, overlap_threshold)
+
+        # Rows inside the time window with enough storage left, via searchsorted range lookups
+        basic_positions = self.sorted.candidate_positions(time_low, time_high, units)
+        if trace is not None:
+            time_start, time_end = self.sorted.timestamp.range_bounds(time_low, time_high)
+            trace.lap("time_storage_filter", fleet=self.size, time_window=int(time_end - time_start),
+                      time_and_storage=len(basic_positions))
+        if len(basic_positions) == 0:
+            return empty
+
+        dest_lat, dest_lon = shipment_info["dest_lat"], shipment_info["dest_lon"]
+
+        if len(basic_positions) <= self.spatial.dest.candidate_count(dest_lat, dest_lon, dest_threshold_km):
+            # The time/storage window is the smaller set: measure its destinations directly
+            basic_distance = haversine_distance(dest_lat, dest_lon,
+                                                self.spatial.dest.lat[basic_positions],
+                                                self.spatial.dest.lon[basic_positions])
+            if trace is not None:
+                trace.plan = "time_first"
+                trace.lap("destination_distance", within_destination=int((basic_distance <= dest_threshold_km).sum()))
+            compatible = passes_filters(basic_positions, check_basic=False)
+            within_threshold = compatible & (basic_distance <= dest_threshold_km)
+            if trace is not None:
+                trace.lap("compatibility", compatible=int(within_threshold.sum()))
+
+            if within_threshold.any():
+                return basic_positions[within_threshold], basic_distance[within_threshold], None
+            if not fallback or not compatible.any():
+                return empty
+
+            # If no compatible matches within threshold, fall back to the nearest match
+            nearest = int(np.argmin(np.where(compatible, basic_distance, np.inf)))
+            if trace is not None:
+                trace.fallback = True
+                trace.lap("nearest_fallback")
+            return basic_positions[[nearest]], basic_distance[[nearest]], float(basic_distance[nearest])
+
+        # Only trucks inside the destination radius can be normal matches
+        positions, dest_distance = self.spatial.dest.query_radius(dest_lat, dest_lon, dest_threshold_km)
+        if trace is not None:
+            trace.plan = "destination_first"
+            # Count in the same filter order as the time-first plan
+            within_basic = (self.sorted.storage_left.in_range(positions, low=units) &
+                            self.sorted.timestamp.in_range(positions, time_low, time_high))
+            trace.lap("destination_distance", within_destination=int(within_basic.sum()))
+        compatible = passes_filters(positions)
+        if trace is not None:
+            trace.lap("compatibility", compatible=int(compatible.sum()))
+        if compatible.any():
+            return positions[compatible], dest_distance[compatible], None
+        if not fallback:
+            return empty
+
+        # If no compatible matches within threshold, fall back to the nearest match
+        # (nothing inside the threshold qualified, so start the search beyond it)
+        nearest, nearest_distance = self.spatial.dest.nearest(
+            dest_lat, dest_lon, accept=passes_filters, start_radius_km=2 * dest_threshold_km
+        )
+        if trace is not None:
+            trace.fallback = True
+            trace.lap("nearest_fallback")
+        if nearest is None:
+            return empty
+        return np.array([nearest]), np.array([nearest_distance]), nearest_distance
+
+    def recommend(self, shipment_info, k=5, dest_threshold_km=50, time_threshold_hours=48, overlap_threshold=2,
+                  trace=None):
+        """
+        Find the best matching trucks for a given shipment
+
+        Parameters:
+        - shipment_info: dict with details of the shipment needing space (not modified)
+        - k: Number of recommendations to return
+        - dest_threshold_km: Maximum distance between destinations to be considered close
+        - time_threshold_hours: Maximum time difference between shipments
+        - overlap_threshold: Minimum temperature range overlap required in degrees
+        - trace: optional MatchTrace recording stage times and candidate counts
+
+        Returns:
+        - List of recommended shipments with their matching scores, best first
+        """
+        positions, dest_distance, nearest_distance = self.find_candidates(
+            shipment_info, dest_threshold_km, time_threshold_hours, overlap_threshold, trace=trace
+        )
+        if len(positions) == 0:
+            if trace is not None:
+                trace.funnel.update(scored=0, returned=0)
+            return []
+
+        scored = len(positions)
+        positions, scores = self.top_k(shipment_info, positions, dest_distance, k, dest_threshold_km)
+        if trace is not None:
+            trace.lap("scoring", scored=scored)
+
+        # Only the final k results are turned into dicts
+        recommendations = [
+            build_recommendation(self.row(position), float(score), nearest_distance)
+            for position, score in zip(positions, scores)
+        ]
+        if trace is not None:
+            trace.lap("results", returned=len(recommendations))
+        return recommendations
+
+    def top_k(self, shipment_info, positions, dest_distance, k=5, dest_threshold_km=50):
+        """
+        Score candidate rows (companies compared by code) and keep the top k,
+        pruning any that cannot reach it
+
+        Returns:
+        - (positions, scores) of the best k, best first, ties in dataset order
+        """
+        shipment = dict(shipment_info, company=self.encode_companies(shipment_info["company"]))
+        candidates = self.take(positions, SCORING_COLUMNS)
+        candidates["company"] = self.company_codes[positions]
+        top, scores = top_k_match_scores(shipment, candidates, k, dest_threshold_km,
+                                         dest_distance=dest_distance)
+        return positions[top], scores
+
+# Shipment indexes already built for a DataFrame, keyed by id()
+_SHIPMENT_INDEXES = {}
+
+# Version token of each fleet DataFrame, keyed by id(); bumped by invalidate_shipment_index
+_FRAME_VERSIONS = {}
+
+def frame_version(df):
+    """Return the version token of a fleet DataFrame (0 until a writer bumps it)"""
+    return _FRAME_VERSIONS.get(id(df), 0)
+
+def build_shipment_index(df, goods_types_dict=None):
+    """Build the ShipmentIndex for a fleet DataFrame and remember it for later queries"""
+    index = ShipmentIndex(df, goods_types_dict)
+    key = id(df)
+    _SHIPMENT_INDEXES[key] = (weakref.ref(df), index, frame_version(df))
+    weakref.finalize(df, _SHIPMENT_INDEXES.pop, key, None)
+    return index
+
+def invalidate_shipment_index(df):
+    """
+    Mark a fleet DataFrame as changed, so the next query rebuilds its ShipmentIndex
+
+    Writers call this after editing the frame's values in place (df.loc[...] = ...,
+    new or replaced columns, writes through NumPy arrays taken from the frame).
+    Adding or removing rows returns a new DataFrame, which gets its own index.
+    """
+    key = id(df)
+    if key not in _FRAME_VERSIONS:
+        weakref.finalize(df, _FRAME_VERSIONS.pop, key, None)
+    _FRAME_VERSIONS[key] = frame_version(df) + 1
+
+def get_shipment_index(df, goods_types_dict=None):
+    """
+    Return the ShipmentIndex of a fleet DataFrame, building it on first use
+    The index is rebuilt if rows were added or removed since it was built, if
+    invalidate_shipment_index was called for the frame, or if a different goods
+    types dictionary is requested
+    """
+    goods_types_dict = GOODS_TYPES if goods_types_dict is None else goods_types_dict
+
+    cached = _SHIPMENT_INDEXES.get(id(df))
+    if (cached is not None and cached[0]() is df and cached[1].size == len(df) and
+            cached[1].registry.goods_types_dict is goods_types_dict and cached[2] == frame_version(df)):
+        get_loader_metrics().index_hits.inc()
+        return cached[1]
+    get_loader_metrics().index_misses.inc()
+    return build_shipment_index(df, goods_types_dict)
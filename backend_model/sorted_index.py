@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+# Convert a column of timestamps to int64 nanoseconds since the epoch
+def to_epoch_ns(values):
+    """Convert a datetime Series or array to int64 nanoseconds since the epoch"""
+    return np.asarray(pd.to_datetime(values), dtype="datetime64[ns]").astype(np.int64)
+
+class SortedColumnIndex:
+    """
+    Secondary index over one numeric column
+
+    Keeps the column in its original row order (for per-row checks) and a stable
+    argsort of it, so a value range becomes two searchsorted calls and a slice of
+    row positions instead of a full-column boolean mask.
+    """
+
+    def __init__(self, values):
+        self.values = np.asarray(values)
+        self.order = np.argsort(self.values, kind="stable")
+        self.sorted_values = self.values[self.order]
+
+    def range_bounds(self, low=None, high=None):
+        """Return the [start, end) slice of sorted_values with low <= value <= high"""
+        start = 0 if low is None else int(np.searchsorted(self.sorted_values, low, side="left"))
+        end = len(self.sorted_values) if high is None else int(np.searchsorted(self.sorted_values, high, side="right"))
+        return start, max(start, end)
+
+    def range_positions(self, low=None, high=None):
+        """Return the row positions with low <= value <= high (ordered by value)"""
+        start, end = self.range_bounds(low, high)
+        return self.order[start:end]
+
+    def in_range(self, positions, low=None, high=None):
+        """Check low <= value <= high for the given row positions"""
+        values = self.values[positions]
+        mask = np.ones(len(values), dtype=bool)
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+        return mask
+
+class FleetSortedIndex:
+    """Sorted indexes over the timestamp (int64 epoch ns) and storage_left columns of a fleet"""
+
+    def __init__(self, timestamp_ns, storage_left):
+        self.size = len(timestamp_ns)
+        self.timestamp = SortedColumnIndex(np.asarray(timestamp_ns, dtype=np.int64))
+        self.storage_left = SortedColumnIndex(np.asarray(storage_left, dtype=np.float64))
+
+    def candidate_positions(self, time_low, time_high, min_storage):
+        """
+        Find rows with time_low <= timestamp <= time_high and storage_left >= min_storage
+
+        The more selective of the two ranges is sliced from its sorted index and the
+        other condition is checked on those rows only.
+
+        Returns:
+        - Row positions in ascending (dataset) order
+        """
+        time_start, time_end = self.timestamp.range_bounds(time_low, time_high)
+        storage_start, storage_end = self.storage_left.range_bounds(low=min_storage)
+
+        if time_end - time_start <= storage_end - storage_start:
+            positions = self.timestamp.order[time_start:time_end]
+            positions = positions[self.storage_left.in_range(positions, low=min_storage)]
+        else:
+            positions = self.storage_left.order[storage_start:storage_end]
+            positions = positions[self.timestamp.in_range(positions, time_low, time_high)]
+
+        return np.sort(positions)
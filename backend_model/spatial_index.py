@@ -0,0 +1,142 @@
+import numpy as np
+import math
+
+# Mean Earth radius (km) used by the vectorized haversine distance
+EARTH_RADIUS_KM = 6371.0088
+
+# Half of the Earth's circumference: no two points are further apart than this
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+# Vectorized great-circle distance
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """
+    Calculate great-circle distances in kilometers
+    Accepts scalars or NumPy arrays (broadcast against each other) and
+    returns a float64 array
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64))
+                              for value in (lat1, lon1, lat2, lon2))
+
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+# Latitude/longitude half-widths of the box around a search circle
+def circle_extent(lat, radius_km):
+    """
+    Return (dlat, dlon) in degrees such that every point within radius_km of a
+    point at latitude lat lies within +-dlat and +-dlon of it; dlon is None when
+    the circle reaches a pole (every longitude)
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angular)
+    if abs(lat) + dlat >= 90 or angular >= math.pi / 2:
+        return dlat, None
+    dlon = math.degrees(math.asin(min(1.0, math.sin(angular) / math.cos(math.radians(lat)))))
+    return dlat, dlon
+
+class SpatialGridIndex:
+    """
+    Uniform latitude/longitude grid over a set of points
+
+    Row positions are bucketed by grid cell and stored contiguously (CSR layout),
+    so a radius query only checks the occupied cells and then computes exact
+    haversine distances for the rows in cells that overlap the search circle.
+    Query cost depends on how many points are near the query, not on fleet size.
+    """
+
+    def __init__(self, lat, lon, cell_size_deg=0.5):
+        self.cell_size_deg = cell_size_deg
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.size = len(self.lat)
+
+        lat_cells = np.floor(self.lat / cell_size_deg).astype(np.int64)
+        lon_cells = np.floor(self.lon / cell_size_deg).astype(np.int64)
+
+        # Pack (lat cell, lon cell) into one sortable key per row
+        cell_keys = lat_cells * 1_000_000 + lon_cells
+        self.positions = np.argsort(cell_keys, kind="stable")
+
+        _, starts = np.unique(cell_keys[self.positions], return_index=True)
+        self.cell_starts = starts
+        self.cell_ends = np.append(starts[1:], self.size)
+
+        # Cell centers for the bounding-box test
+        self.cell_lat = (lat_cells[self.positions[starts]] + 0.5) * cell_size_deg
+        self.cell_lon = (lon_cells[self.positions[starts]] + 0.5) * cell_size_deg
+
+    def _candidate_cells(self, lat, lon, radius_km):
+        """Return the occupied cells whose extent may intersect the search circle"""
+        dlat, dlon = circle_extent(lat, radius_km)
+        half_cell = self.cell_size_deg / 2
+
+        in_band = np.abs(self.cell_lat - lat) <= dlat + half_cell
+
+        # Every longitude when the circle reaches a pole
+        if dlon is None:
+            return np.flatnonzero(in_band)
+        lon_offset = np.abs((self.cell_lon - lon + 180) % 360 - 180)
+
+        return np.flatnonzero(in_band & (lon_offset <= dlon + half_cell))
+
+    def candidate_count(self, lat, lon, radius_km):
+        """Upper bound on the number of rows a radius query would measure"""
+        cells = self._candidate_cells(lat, lon, radius_km)
+        return int((self.cell_ends[cells] - self.cell_starts[cells]).sum())
+
+    def query_radius(self, lat, lon, radius_km):
+        """
+        Find every point within radius_km of (lat, lon)
+
+        Returns:
+        - (positions, distances): row positions in ascending order and their distances in km
+        """
+        cells = self._candidate_cells(lat, lon, radius_km)
+        if len(cells) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        positions = np.sort(np.concatenate([
+            self.positions[start:end]
+            for start, end in zip(self.cell_starts[cells], self.cell_ends[cells])
+        ]))
+        distances = haversine_distance(lat, lon, self.lat[positions], self.lon[positions])
+
+        within = distances <= radius_km
+        return positions[within], distances[within]
+
+    def nearest(self, lat, lon, accept=None, start_radius_km=50):
+        """
+        Find the nearest point to (lat, lon), optionally among accepted points only
+
+        Parameters:
+        - lat, lon: query coordinates
+        - accept: optional function mapping an array of row positions to a boolean mask
+        - start_radius_km: first search radius, doubled until a point is found
+
+        Returns:
+        - (position, distance), or (None, None) when no point is accepted
+        """
+        radius_km = max(start_radius_km, 1.0)
+        while True:
+            positions, distances = self.query_radius(lat, lon, radius_km)
+            if accept is not None and len(positions):
+                accepted = accept(positions)
+                positions, distances = positions[accepted], distances[accepted]
+
+            if len(positions):
+                # Rows are in dataset order, so ties go to the first one
+                best = int(np.argmin(distances))
+                return int(positions[best]), float(distances[best])
+
+            if radius_km >= MAX_DISTANCE_KM:
+                return None, None
+            radius_km = min(radius_km * 2, MAX_DISTANCE_KM)
+
+class FleetSpatialIndex:
+    """Spatial indexes over the destination and source coordinates of a fleet (DataFrame or dict of arrays)"""
+
+    def __init__(self, df, cell_size_deg=0.5):
+        self.size = len(df["dest_lat"])
+        self.dest = SpatialGridIndex(df["dest_lat"], df["dest_lon"], cell_size_deg)
+        self.source = SpatialGridIndex(df["source_lat"], df["source_lon"], cell_size_deg)
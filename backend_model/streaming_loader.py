@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from backend_model.goods_compatibility import get_compatibility_registry
+from backend_model.spatial_index import haversine_distance
+from backend_model.sorted_index import to_epoch_ns
+from backend_model.scoring import top_k_match_scores, build_recommendation
+from backend_model.supply_chain_algorithm import read_dataset_csv
+
+# Rows read from the CSV at a time; peak memory grows with this, not with the file
+DEFAULT_CHUNK_ROWS = 100_000
+
+def chunk_filter_mask(chunk, shipment_info, registry, time_threshold_hours=48, overlap_threshold=2):
+    """
+    Check the basic, goods and temperature criteria of a shipment for every row of a chunk
+
+    Returns:
+    - Boolean mask of the rows that can be matched with the shipment (destination
+      distance is not checked)
+    """
+    # Must be within the time window and have enough storage space left
+    shipment_ns = pd.Timestamp(shipment_info["timestamp"]).value
+    window_ns = time_threshold_hours * 3.6e12
+    mask = np.abs(to_epoch_ns(chunk["timestamp"]) - shipment_ns) <= window_ns
+    mask &= chunk["storage_left"].to_numpy(dtype=np.float64) >= shipment_info["units"]
+
+    # Must not be the same shipment
+    mask &= chunk["shipment_id"].to_numpy() != shipment_info.get("shipment_id", "")
+
+    # Goods and temperature compatibility with one matrix lookup each
+    goods_codes = registry.encode_goods(chunk["goods_type"].to_numpy())
+    temp_codes = registry.encode_temp_ranges(chunk["temp_min"].to_numpy(), chunk["temp_max"].to_numpy())
+    mask &= registry.compatible_mask(shipment_info["goods_type"],
+                                     (shipment_info["temp_min"], shipment_info["temp_max"]),
+                                     goods_codes, temp_codes, overlap_threshold)
+    return mask
+
+def iter_matching_rows(file_path, shipment_info, chunk_rows=DEFAULT_CHUNK_ROWS, time_threshold_hours=48,
+                       overlap_threshold=2, goods_types_dict=None):
+    """
+    Stream the rows of a dataset CSV that pass a shipment's basic and compatibility criteria
+
+    The CSV is read chunk_rows rows at a time (compact columns and dtypes) and the
+    time-window, capacity and goods/temperature predicates are applied inside each
+    chunk, so only qualifying rows are kept in memory.
+
+    Yields:
+    - DataFrames of qualifying rows; the index is the row number in the CSV
+    """
+    registry = get_compatibility_registry(goods_types_dict)
+    for chunk in read_dataset_csv(file_path, chunksize=chunk_rows):
+        rows = chunk[chunk_filter_mask(chunk, shipment_info, registry, time_threshold_hours, overlap_threshold)]
+        if len(rows):
+            yield rows
+
+def load_matching_rows(file_path, shipment_info, chunk_rows=DEFAULT_CHUNK_ROWS, time_threshold_hours=48,
+                       overlap_threshold=2, goods_types_dict=None):
+    """Return all rows of a dataset CSV that pass a shipment's basic and compatibility criteria"""
+    frames = list(iter_matching_rows(file_path, shipment_info, chunk_rows, time_threshold_hours,
+                                     overlap_threshold, goods_types_dict))
+    return pd.concat(frames) if frames else pd.DataFrame()
+
+def stream_recommendations(file_path, shipment_info, k=5, dest_threshold_km=50, time_threshold_hours=48,
+                           overlap_threshold=2, chunk_rows=DEFAULT_CHUNK_ROWS, goods_types_dict=None):
+    """
+    Find the best matching trucks for a shipment in one pass over a dataset CSV
+
+    Qualifying rows from iter_matching_rows are scored chunk by chunk and only the
+    best k (and the nearest compatible truck, for the exceeds-threshold fallback)
+    are kept between chunks, so memory is bounded by chunk_rows. Results are the
+    same as recommend_best_matches on the fully loaded dataset.
+
+    Returns:
+    - List of recommended shipments with their matching scores, best first
+    """
+    best_rows, best_scores = None, np.zeros(0)
+    nearest_row, nearest_distance = None, np.inf
+
+    for rows in iter_matching_rows(file_path, shipment_info, chunk_rows, time_threshold_hours,
+                                   overlap_threshold, goods_types_dict):
+        dest_distance = haversine_distance(shipment_info["dest_lat"], shipment_info["dest_lon"],
+                                           rows["dest_lat"].to_numpy(), rows["dest_lon"].to_numpy())
+        within_threshold = dest_distance <= dest_threshold_km
+
+        if not within_threshold.any():
+            # Only needed while nothing inside the threshold has been found
+            nearest = int(np.argmin(dest_distance))
+            if best_rows is None and dest_distance[nearest] < nearest_distance:
+                nearest_row, nearest_distance = rows.iloc[[nearest]], float(dest_distance[nearest])
+            continue
+
+        candidates = rows[within_threshold]
+        top, scores = top_k_match_scores(shipment_info, scoring_columns(candidates), k, dest_threshold_km,
+                                         dest_distance=dest_distance[within_threshold])
+
+        # Merge with the best rows so far: best score first, ties in dataset (row number) order
+        merged_rows = candidates.iloc[top] if best_rows is None else pd.concat([best_rows, candidates.iloc[top]])
+        merged_scores = np.concatenate([best_scores, scores])
+        order = np.lexsort((merged_rows.index.to_numpy(), -merged_scores))[:k]
+        best_rows, best_scores = merged_rows.iloc[order], merged_scores[order]
+
+    if best_rows is not None:
+        return [build_recommendation(result_row(best_rows, i), float(score)) for i, score in enumerate(best_scores)]
+    if nearest_row is None:
+        return []
+
+    # If no compatible matches within threshold, return the nearest match
+    _, scores = top_k_match_scores(shipment_info, scoring_columns(nearest_row), 1, dest_threshold_km,
+                                   dest_distance=np.array([nearest_distance]))
+    return [build_recommendation(result_row(nearest_row, 0), float(scores[0]), nearest_distance)]
+
+def result_row(rows, position):
+    """
+    One row of a DataFrame as a dict of column scalars
+
+    Unlike iterrows, values keep their column dtype (e.g. float32), so
+    build_recommendation formats them like ShipmentIndex.row does
+    """
+    return {column: rows[column].iloc[position] for column in rows.columns}
+
+def scoring_columns(rows):
+    """Typed columns of a DataFrame of candidate rows, as read by the match score"""
+    columns = {
+        "storage_left": rows["storage_left"].to_numpy(dtype=np.float64),
+        "source_lat": rows["source_lat"].to_numpy(dtype=np.float64),
+        "source_lon": rows["source_lon"].to_numpy(dtype=np.float64),
+        "timestamp": to_epoch_ns(rows["timestamp"]).view("datetime64[ns]"),
+        "company": rows["company"].to_numpy(dtype=object),
+    }
+    if "scheduled_delivery_time" in rows.columns:
+        columns["scheduled_delivery_time"] = to_epoch_ns(rows["scheduled_delivery_time"]).view("datetime64[ns]")
+    return columns
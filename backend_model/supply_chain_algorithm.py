@@ -1,18 +1,93 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from geopy.distance import geodesic
-import math
 import os
+import sys
+import time
+
+# Add parent directory to path so the backend_model package imports work when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend_model.goods_compatibility import GOODS_TYPES
+from backend_model.shipment_index import ShipmentIndex, build_shipment_index, get_shipment_index
+from backend_model.distance_service import get_distance_service
+from backend_model.dataset_cache import cache_available, load_cached_dataset
+from backend_model.match_trace import MatchTrace
+from backend_model.metrics import get_matcher_metrics, get_loader_metrics
+
+# Compact dtypes of the dataset columns; columns not listed keep pandas' default dtype
+COMPACT_DTYPES = {
+    "shipment_id": "str",
+    "company": "category",
+    "goods_type": "category",
+    "source": "category",
+    "destination": "category",
+    "truck_type": "category",
+    "priority": "category",
+    "storage_left": np.float64,
+    "source_lat": np.float32,
+    "source_lon": np.float32,
+    "dest_lat": np.float32,
+    "dest_lon": np.float32,
+    "temp_min": np.int8,
+    "temp_max": np.int8,
+    "carbon_footprint_per_km": np.float32,
+    "units": np.int32,
+    "truck_capacity": np.int32,
+    "historical_shared_success": np.int8,
+}
+
+# Timestamp columns parsed while reading; stored as datetime64[ns] (int64 epoch nanoseconds)
+TIMESTAMP_COLUMNS = ["timestamp", "eta", "scheduled_delivery_time"]
+
+# Read the dataset CSV
+def read_dataset_csv(file_path, compact=True, chunksize=None):
+    """
+    Read the dataset CSV into a DataFrame
+    
+    Parameters:
+    - file_path: path of the dataset CSV
+    - compact: read the columns in COMPACT_DTYPES and TIMESTAMP_COLUMNS with
+      explicit dtypes (categorical names, float32 coordinates, timestamps parsed
+      during the read); every other column is read too, with its default dtype.
+      False reads every column with default dtypes
+    - chunksize: if given, return an iterator of DataFrames of at most this many rows
+    """
+    if not compact:
+        return pd.read_csv(file_path, chunksize=chunksize)
+    
+    header = pd.read_csv(file_path, nrows=0).columns
+    return pd.read_csv(file_path,
+                       dtype={column: dtype for column, dtype in COMPACT_DTYPES.items() if column in header},
+                       parse_dates=[column for column in TIMESTAMP_COLUMNS if column in header],
+                       chunksize=chunksize)
 
 # Load the data (assuming the data was generated using the previous script)
-def load_data(file_path="cargo_sharing_dataset.csv"):
-    """Load shipment data from CSV file"""
+def load_data(file_path="cargo_sharing_dataset.csv", compact=True, use_cache=True):
+    """
+    Load shipment data from CSV file
+    
+    Parameters:
+    - file_path: path of the dataset CSV
+    - compact: read the columns with compact dtypes (see read_dataset_csv); False
+      reads every column with default dtypes
+    - use_cache: load compact data from the memory-mapped columnar artifact of the
+      CSV, building it first if it is missing or the CSV changed (needs pyarrow).
+      This speeds up the read only; the ShipmentIndex is still built on every load
+    """
     # Ensure file path exists
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Dataset file not found at: {file_path}")
-        
-    df = pd.read_csv(file_path)
+    
+    start = time.perf_counter()
+    metrics = get_loader_metrics()
+    if compact and use_cache and cache_available():
+        df, status = load_cached_dataset(file_path, read_dataset_csv)
+        (metrics.cache_hits if status == "hit" else metrics.cache_misses).inc()
+        # Rebuilds and direct reads parse the CSV, so their latency counts as a CSV load
+        source = "cache" if status == "hit" else "csv"
+    else:
+        df = read_dataset_csv(file_path, compact)
+        source = "csv"
     
     # Convert timestamp and scheduled_delivery_time to datetime if they are strings
     if 'timestamp' in df.columns and isinstance(df['timestamp'].iloc[0], str):
@@ -20,9 +95,66 @@ def load_data(file_path="cargo_sharing_dataset.csv"):
     
     if 'scheduled_delivery_time' in df.columns and isinstance(df['scheduled_delivery_time'].iloc[0], str):
         df['scheduled_delivery_time'] = pd.to_datetime(df['scheduled_delivery_time'])
-        
+    
+    # Build the typed columns, codes and spatial/time/storage indexes once, up front
+    build_shipment_index(df)
+    
+    # Precompute city-to-city distances when the coordinates repeat
+    get_distance_service().register_points(
+        np.concatenate([df["source_lat"].to_numpy(), df["dest_lat"].to_numpy()]),
+        np.concatenate([df["source_lon"].to_numpy(), df["dest_lon"].to_numpy()])
+    )
+    
+    metrics.load_seconds[source].observe(time.perf_counter() - start)
     return df
 
+# Lookups the app derives from the fleet (dropdown values and city coordinates)
+def build_fleet_lookups(df):
+    """
+    Build the dropdown values and city coordinates of a loaded fleet in one pass
+    
+    Returns:
+    - Dict with sorted "companies", "cities" (source cities) and "goods_types",
+      "city_coordinates" mapping each source city to the (lat, lon) of its first row,
+      and "goods_temp_ranges" mapping each goods type to the (temp_min, temp_max) of
+      its first row
+    """
+    first_rows = df.drop_duplicates("source")
+    city_coordinates = {
+        city: (float(lat), float(lon))
+        for city, lat, lon in zip(first_rows["source"], first_rows["source_lat"], first_rows["source_lon"])
+    }
+    first_goods = df.drop_duplicates("goods_type")
+    goods_temp_ranges = {
+        goods_type: (int(temp_min), int(temp_max))
+        for goods_type, temp_min, temp_max in zip(first_goods["goods_type"], first_goods["temp_min"],
+                                                  first_goods["temp_max"])
+    }
+    return {
+        "companies": sorted(df["company"].unique().tolist()),
+        "cities": sorted(city_coordinates),
+        "goods_types": sorted(goods_temp_ranges),
+        "city_coordinates": city_coordinates,
+        "goods_temp_ranges": goods_temp_ranges,
+    }
+
+# Per-column memory breakdown of a DataFrame
+def memory_report(df):
+    """
+    Report how much memory every column of a DataFrame uses
+    
+    Returns:
+    - DataFrame indexed by column with dtype, bytes and share of the total,
+      largest first
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        "dtype": df.dtypes.astype(str),
+        "bytes": usage,
+        "share": usage / max(usage.sum(), 1),
+    })
+    return report.sort_values("bytes", ascending=False)
+
 # Define compatibility checker based on goods type
 def are_goods_compatible(goods_type1, goods_type2, goods_types_dict):
     """Check if two types of goods are compatible for shipment together"""
@@ -58,8 +190,8 @@ def is_temp_compatible(temp_range1, temp_range2, overlap_threshold=2):
 
 # Calculate distance between two locations
 def calculate_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points in kilometers"""
-    return geodesic((lat1, lon1), (lat2, lon2)).kilometers
+    """Calculate distance between two points in kilometers (memoized geodesic)"""
+    return get_distance_service().distance(lat1, lon1, lat2, lon2)
 
 # Check if destinations are close enough
 def are_destinations_close(lat1, lon1, lat2, lon2, threshold_km=50):
@@ -126,137 +258,47 @@ def calculate_match_score(shipment, potential_match, dest_threshold_km=50):
 
 # Main recommendation function
 def recommend_best_matches(shipment_info, all_shipments, goods_types_dict, num_recommendations=5, 
-                           dest_threshold_km=50, time_threshold_hours=48):
+                           dest_threshold_km=50, time_threshold_hours=48, overlap_threshold=2, trace=None):
     """
     Find the best matching trucks for a given shipment using a greedy approach
     
     Parameters:
     - shipment_info: dict with details of the shipment needing space
-    - all_shipments: DataFrame containing all available shipments
+    - all_shipments: DataFrame containing all available shipments, or a ShipmentIndex
+      (e.g. the index of a fleet attached with backend_model/shared_fleet.py)
     - goods_types_dict: Dictionary with compatibility information
     - num_recommendations: Number of recommendations to return
     - dest_threshold_km: Maximum distance between destinations to be considered close
     - time_threshold_hours: Maximum time difference between shipments
+    - overlap_threshold: Minimum temperature range overlap required in degrees
+    - trace: optional MatchTrace; if given, per-stage times and the candidate count
+      after every filter are recorded in it
     
     Returns:
     - List of recommended shipments with their matching scores
-    """
-    # Convert timestamp strings to datetime if needed
-    if isinstance(shipment_info["timestamp"], str):
-        shipment_info["timestamp"] = pd.to_datetime(shipment_info["timestamp"])
-    
-    if "scheduled_delivery_time" in shipment_info and isinstance(shipment_info["scheduled_delivery_time"], str):
-        shipment_info["scheduled_delivery_time"] = pd.to_datetime(shipment_info["scheduled_delivery_time"])
-    
-    if isinstance(all_shipments["timestamp"].iloc[0], str):
-        all_shipments["timestamp"] = pd.to_datetime(all_shipments["timestamp"])
-    
-    # Filter out shipments that don't meet basic criteria
-    potential_matches = all_shipments[
-        # Must have enough storage space left
-        (all_shipments["storage_left"] >= shipment_info["units"]) &
-        # Must not be the same shipment
-        (all_shipments["shipment_id"] != shipment_info.get("shipment_id", "")) &
-        # Time difference should be within threshold
-        (abs((all_shipments["timestamp"] - shipment_info["timestamp"]).dt.total_seconds() / 3600) <= time_threshold_hours)
-    ].copy()
-    
-    if potential_matches.empty:
-        return []
-    
-    # Check goods compatibility and temperature compatibility
-    compatible_matches = []
-    
-    # Keep track of the nearest match (even if it exceeds destination threshold)
-    nearest_match = None
-    nearest_distance = float('inf')
-    
-    for _, match in potential_matches.iterrows():
-        # Check goods type compatibility
-        if not are_goods_compatible(shipment_info["goods_type"], match["goods_type"], goods_types_dict):
-            continue
-        
-        # Check temperature compatibility
-        shipment_temp_range = (shipment_info["temp_min"], shipment_info["temp_max"])
-        match_temp_range = (match["temp_min"], match["temp_max"])
-        
-        if not is_temp_compatible(shipment_temp_range, match_temp_range):
-            continue
-        
-        # Calculate destination distance
-        dest_distance = calculate_distance(
-            shipment_info["dest_lat"], shipment_info["dest_lon"],
-            match["dest_lat"], match["dest_lon"]
-        )
-        
-        # Check if this is the nearest match so far
-        if dest_distance < nearest_distance:
-            nearest_distance = dest_distance
-            nearest_match = match.copy()
-            nearest_match["distance"] = dest_distance
-        
-        # Check if destinations are close enough for a normal match
-        if dest_distance <= dest_threshold_km:
-            # If all constraints are satisfied, add to compatible matches
-            compatible_matches.append(match)
-    
-    if not compatible_matches:
-        # If no compatible matches within threshold, but we have a nearest match
-        if nearest_match is not None:
-            # Add a flag to indicate this is beyond the typical threshold
-            nearest_match["exceeds_threshold"] = True
-            compatible_matches = [nearest_match]
-        else:
-            return []
-    
-    # Convert list to DataFrame for easier handling
-    compatible_df = pd.DataFrame(compatible_matches)
-    
-    # Calculate match score for each compatible match
-    scores = []
-    for _, match in compatible_df.iterrows():
-        match_score = calculate_match_score(shipment_info, match, dest_threshold_km)
-        
-        result = {
-            "shipment_id": match["shipment_id"],
-            "company": match["company"],
-            "truck_type": match["truck_type"],
-            "source": match["source"],
-            "destination": match["destination"],
-            "storage_left": match["storage_left"],
-            "goods_type": match["goods_type"],
-            "score": match_score,
-        }
-        
-        # Add scheduled delivery time if available
-        if "scheduled_delivery_time" in match:
-            result["scheduled_delivery_time"] = match["scheduled_delivery_time"]
-        
-        # Add carbon footprint data if available (static calculation)
-        if "carbon_footprint_per_km" in match:
-            result["carbon_footprint_per_km"] = match["carbon_footprint_per_km"]
-            
-            # Calculate static carbon savings (assuming 30% savings from sharing)
-            # This is a simplified model that avoids dynamic calculations
-            base_emissions = match["carbon_footprint_per_km"]
-            carbon_savings_percent = 30.0  # Fixed 30% savings
-            carbon_savings = base_emissions * 0.3  # 30% of the base emissions
-            
-            result["carbon_savings_percent"] = carbon_savings_percent
-            result["carbon_savings"] = round(carbon_savings, 2)
-        
-        # Add distance info if this is the nearest match that exceeds threshold
-        if "exceeds_threshold" in match and match["exceeds_threshold"]:
-            result["exceeds_threshold"] = True
-            result["distance"] = match["distance"]
-            
-        scores.append(result)
     
-    # Sort by score (descending)
-    sorted_matches = sorted(scores, key=lambda x: x["score"], reverse=True)
+    Matching runs on the ShipmentIndex built for all_shipments by load_data (or on
+    first use); neither shipment_info nor all_shipments is modified. Every call is
+    recorded in the matcher metrics (see backend_model/metrics.py); if trace
+    sampling is enabled, one in trace_every calls is traced for the candidate funnel.
+    """
+    metrics = get_matcher_metrics()
+    start = time.perf_counter()
+    if trace is None and metrics.sample_trace():
+        trace = MatchTrace()
     
-    # Return top N recommendations
-    return sorted_matches[:num_recommendations]
+    if isinstance(all_shipments, ShipmentIndex):
+        index = all_shipments
+    else:
+        index = get_shipment_index(all_shipments, goods_types_dict)
+    if trace is not None:
+        trace.lap("index_lookup")
+    
+    recommendations = index.recommend(shipment_info, num_recommendations, dest_threshold_km=dest_threshold_km,
+                                      time_threshold_hours=time_threshold_hours,
+                                      overlap_threshold=overlap_threshold, trace=trace)
+    metrics.record(time.perf_counter() - start, recommendations, trace)
+    return recommendations
 
 # Calculate carbon impact of a shipment sharing (static calculation)
 def calculate_carbon_impact(shipment1, shipment2):
@@ -303,30 +345,10 @@ if __name__ == "__main__":
     # Load data
     df_shipments = load_data()
     
-    # Import GOODS_TYPES from the data generation script or define it here
-    # This is a simplified version for the example
-    GOODS_TYPES = {
-        "Garments": {"temp_range": (15, 25), "compatibility": ["Footwear", "Accessories", "Textiles"]},
-        "Footwear": {"temp_range": (15, 25), "compatibility": ["Garments", "Accessories", "Textiles"]},
-        "Electronics": {"temp_range": (10, 30), "compatibility": ["Appliances", "Accessories"]},
-        "Pharmaceuticals": {"temp_range": (2, 8), "compatibility": ["Medical Supplies"]},
-        "Frozen Food": {"temp_range": (-25, -15), "compatibility": ["Refrigerated Food"]},
-        "Refrigerated Food": {"temp_range": (0, 5), "compatibility": ["Frozen Food"]},
-        "Dry Food": {"temp_range": (10, 25), "compatibility": ["Beverages", "Packaged Goods"]},
-        "Beverages": {"temp_range": (5, 25), "compatibility": ["Dry Food", "Packaged Goods"]},
-        "Furniture": {"temp_range": (10, 35), "compatibility": ["Home Decor", "Building Materials"]},
-        "Automotive Parts": {"temp_range": (0, 35), "compatibility": ["Industrial Equipment", "Machinery"]},
-        "Medical Supplies": {"temp_range": (2, 25), "compatibility": ["Pharmaceuticals"]},
-        "Hazardous Materials": {"temp_range": (5, 30), "compatibility": []},
-        "Building Materials": {"temp_range": (0, 40), "compatibility": ["Furniture", "Home Decor"]},
-        "Industrial Equipment": {"temp_range": (0, 40), "compatibility": ["Machinery", "Automotive Parts"]},
-        "Textiles": {"temp_range": (15, 30), "compatibility": ["Garments", "Accessories"]},
-        "Accessories": {"temp_range": (15, 30), "compatibility": ["Garments", "Footwear", "Textiles"]},
-        "Machinery": {"temp_range": (0, 40), "compatibility": ["Industrial Equipment", "Automotive Parts"]},
-        "Packaged Goods": {"temp_range": (10, 25), "compatibility": ["Dry Food", "Beverages"]},
-        "Home Decor": {"temp_range": (10, 35), "compatibility": ["Furniture", "Building Materials"]},
-        "Appliances": {"temp_range": (10, 35), "compatibility": ["Electronics"]}
-    }
+    # Show how much memory every column takes
+    report = memory_report(df_shipments)
+    print(report)
+    print(f"Total: {report['bytes'].sum() / 2**20:.1f} MB for {len(df_shipments)} rows\n")
     
     # Example shipment
     sample_shipment = df_shipments.iloc[0].to_dict()
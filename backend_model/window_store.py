@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+import threading
+
+from backend_model.goods_compatibility import GOODS_TYPES
+from backend_model.sorted_index import to_epoch_ns
+from backend_model.fleet_store import FleetSegment, parse_timestamps, recommend_segments
+
+# Width of one expiry bucket (narrower buckets free memory sooner but add a
+# little per-bucket work to every query)
+DEFAULT_BUCKET_HOURS = 24
+
+# Columns that mark when a truck has left the market, in order of preference
+EXPIRY_COLUMNS = ["scheduled_delivery_time", "eta"]
+
+# Appended rows are merged with a bucket's newest segment while that segment is
+# at most this many times larger than them (see FleetStore)
+MERGE_RATIO = 2
+
+# Memory held by one segment
+def segment_nbytes(segment):
+    """Approximate bytes held by a segment: its rows plus its typed index columns"""
+    columns = segment.index.columns
+    return int(segment.frame.memory_usage(deep=True).sum() +
+               sum(values.nbytes for values in columns.values()) +
+               segment.deleted_version.nbytes)
+
+class TimeWindowFleet:
+    """
+    Fleet store that drops shipments once their delivery time has passed
+
+    Rows are bucketed by expiry time (scheduled_delivery_time, or eta when the
+    fleet has no delivery times) into buckets of bucket_hours each, kept oldest
+    first like a ring. Each bucket is a short list of segments of growing size:
+    appended rows form a small delta segment, merged with the bucket's newest
+    segments once they are of similar size, so an append never re-indexes a whole
+    bucket and every row is re-indexed O(log n) times. expire() releases every
+    bucket that ends before now as a whole, with all its segments, without
+    touching the remaining rows; rows of the current bucket whose time has already
+    passed are skipped by queries until their bucket goes. Queries work on the
+    bucket list published at the time they start.
+    """
+
+    def __init__(self, df=None, bucket_hours=DEFAULT_BUCKET_HOURS, goods_types_dict=None, now=None):
+        self.bucket_ns = int(bucket_hours * 3.6e12)
+        self.goods_types_dict = GOODS_TYPES if goods_types_dict is None else goods_types_dict
+        self._lock = threading.Lock()
+        self._buckets = ()  # (bucket number, tuple of segments), oldest first
+        self.expiry_column = None
+        self.expired_rows = 0
+        self.bytes_reclaimed = 0
+        if df is not None and len(df):
+            self.append(df, now=now)
+
+    def append(self, rows, now=None):
+        """
+        Add shipments, placing each in the bucket of its expiry time
+
+        Rows that have already expired are dropped (and counted as expired).
+        """
+        rows = parse_timestamps(rows)
+        with self._lock:
+            if self.expiry_column is None:
+                self.expiry_column = next((column for column in EXPIRY_COLUMNS if column in rows.columns), None)
+                if self.expiry_column is None:
+                    raise ValueError(f"Fleet needs one of the columns {EXPIRY_COLUMNS} to expire shipments")
+
+            expiry_ns = to_epoch_ns(rows[self.expiry_column])
+            live = expiry_ns > _now_ns(now)
+            self.expired_rows += int((~live).sum())
+            rows, expiry_ns = rows[live], expiry_ns[live]
+
+            buckets = dict(self._buckets)
+            bucket_numbers = expiry_ns // self.bucket_ns
+            for bucket_number in np.unique(bucket_numbers):
+                segments = list(buckets.get(int(bucket_number), ()))
+                frames = [rows[bucket_numbers == bucket_number]]
+                size = len(frames[0])
+                while segments and segments[-1].size <= MERGE_RATIO * size:
+                    frames.insert(0, segments.pop().frame)
+                    size += len(frames[0])
+                segments.append(self._new_segment(pd.concat(frames, ignore_index=True)))
+                buckets[int(bucket_number)] = tuple(segments)
+
+            self._buckets = tuple(sorted(buckets.items()))
+
+    def _new_segment(self, rows):
+        """Build a bucket segment with the expiry time of every row"""
+        segment = FleetSegment(rows, self.goods_types_dict)
+        segment.expiry_ns = to_epoch_ns(segment.frame[self.expiry_column])
+        segment.nbytes = segment_nbytes(segment) + segment.expiry_ns.nbytes
+        return segment
+
+    def expire(self, now=None):
+        """
+        Drop every bucket whose shipments have all expired by now
+
+        Returns:
+        - Number of rows dropped
+        """
+        now_ns = _now_ns(now)
+        with self._lock:
+            expired = [segments for bucket_number, segments in self._buckets
+                       if (bucket_number + 1) * self.bucket_ns <= now_ns]
+            if not expired:
+                return 0
+            self._buckets = self._buckets[len(expired):]
+
+            expired = [segment for segments in expired for segment in segments]
+            dropped = sum(segment.size for segment in expired)
+            self.expired_rows += dropped
+            self.bytes_reclaimed += sum(segment.nbytes for segment in expired)
+            return dropped
+
+    def to_frame(self, now=None):
+        """Return the rows that have not expired by now as one DataFrame, oldest bucket first"""
+        now_ns = _now_ns(now)
+        frames = [segment.frame[segment.expiry_ns > now_ns] for segment in self.segments()]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def recommend(self, shipment_info, k=5, dest_threshold_km=50, time_threshold_hours=48, overlap_threshold=2,
+                  now=None):
+        """
+        Expire old buckets, then find the best matching trucks among the live rows
+
+        Parameters are the same as ShipmentIndex.recommend, plus now (defaults
+        to the current time). Results are the same as ShipmentIndex.recommend on
+        to_frame(now).
+        """
+        now_ns = _now_ns(now)
+        self.expire(now_ns)
+        return recommend_segments(self.segments(), shipment_info, k, dest_threshold_km, time_threshold_hours,
+                                  overlap_threshold,
+                                  alive=lambda segment, positions: segment.expiry_ns[positions] > now_ns)
+
+    def segments(self):
+        """Return the segments of all buckets, oldest bucket first, in append order within a bucket"""
+        return [segment for _, segments in self._buckets for segment in segments]
+
+    def stats(self, now=None):
+        """Return live-row, bucket, segment and memory counters"""
+        now_ns = _now_ns(now)
+        buckets = self._buckets
+        segments = [segment for _, bucket_segments in buckets for segment in bucket_segments]
+        return {
+            "live_rows": int(sum((segment.expiry_ns > now_ns).sum() for segment in segments)),
+            "stored_rows": sum(segment.size for segment in segments),
+            "buckets": len(buckets),
+            "segments": len(segments),
+            "live_bytes": sum(segment.nbytes for segment in segments),
+            "expired_rows": self.expired_rows,
+            "bytes_reclaimed": self.bytes_reclaimed,
+        }
+
+# Current time (or a given one) in epoch nanoseconds
+def _now_ns(now=None):
+    """Convert now (timestamp, epoch ns, or None for the current time) to epoch nanoseconds"""
+    if now is None:
+        return pd.Timestamp.now().value
+    if isinstance(now, (int, np.integer)):
+        return int(now)
+    return pd.Timestamp(now).value
@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Add the repository root (backend_model package) and the dataset generator to the path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "dataset"))
+
+from backend_model.goods_compatibility import GOODS_TYPES
+from backend_model.supply_chain_algorithm import (
+    load_data, recommend_best_matches, calculate_match_score, calculate_carbon_impact
+)
+from Final_Dataset2 import CITIES, CITY_COORDINATES, generate_fleet
+
+# Fleet sizes benchmarked by default
+DEFAULT_SIZES = [25_000, 250_000, 2_500_000]
+
+# Queries per fleet size, and scalar calls for calculate_match_score / calculate_carbon_impact
+DEFAULT_QUERIES = 200
+DEFAULT_SCALAR_CALLS = 5_000
+
+# Fixed "now" of the generated fleets, so the CSVs can be reused between runs
+REFERENCE_DATE = "2025-01-01"
+
+# Ranges of the sidebar sliders in app.py
+DEST_THRESHOLD_RANGE_KM = (10, 200)
+TIME_THRESHOLD_RANGE_HOURS = (6, 168)
+
+# Where generated fleet CSVs are kept between runs
+DEFAULT_DATA_DIR = os.path.join(ROOT, "benchmarks", ".data")
+
+# Peak resident memory of this process
+def reset_peak_rss():
+    """Reset the peak RSS counter (Linux only); returns False if it cannot be reset"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():
+    """Peak resident memory of the process in MB (since the last reset_peak_rss on Linux)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def summarize(latencies_s, peak_mb):
+    """Latency percentiles (ms), throughput and peak RSS of one stage"""
+    latencies_ms = np.asarray(latencies_s) * 1000
+    total_s = float(np.sum(latencies_s))
+    return {
+        "calls": len(latencies_ms),
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "max_ms": float(latencies_ms.max()),
+        "throughput_per_s": len(latencies_ms) / total_s if total_s > 0 else None,
+        "peak_rss_mb": round(peak_mb, 1),
+    }
+
+def run_stage(calls):
+    """Time every call of a stage; returns the stage summary and the call results"""
+    reset_peak_rss()
+    latencies, results = [], []
+    for call in calls:
+        start = time.perf_counter()
+        results.append(call())
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, peak_rss_mb()), results
+
+def fleet_csv(num_rows, seed, data_dir):
+    """Return the path of a generated fleet CSV, generating it if needed"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"fleet_{num_rows}_seed{seed}.csv")
+    if not os.path.exists(path):
+        generate_fleet(num_rows, seed, REFERENCE_DATE).to_csv(path, index=False)
+    return path
+
+def query_mix(df, num_queries, seed):
+    """
+    Realistic shipment requests: random goods types, city pairs, units and slider
+    values, timed within the fleet's time span
+
+    Returns:
+    - List of (shipment_info, dest_threshold_km, time_threshold_hours)
+    """
+    rng = np.random.default_rng(seed)
+    goods_names = list(GOODS_TYPES.keys())
+    timestamps = df["timestamp"].to_numpy()
+    queries = []
+    for _ in range(num_queries):
+        source, destination = rng.choice(len(CITIES), 2, replace=False)
+        goods_type = goods_names[rng.integers(len(goods_names))]
+        temp_min, temp_max = GOODS_TYPES[goods_type]["temp_range"]
+        timestamp = pd.Timestamp(timestamps[rng.integers(len(timestamps))])
+        shipment_info = {
+            "shipment_id": f"BENCH{len(queries)}",
+            "timestamp": timestamp,
+            "company": f"Bench Company {rng.integers(5)}",
+            "goods_type": goods_type,
+            "source": CITIES[source],
+            "destination": CITIES[destination],
+            "units": int(rng.integers(1, 101)),
+            "source_lat": CITY_COORDINATES[CITIES[source]][0],
+            "source_lon": CITY_COORDINATES[CITIES[source]][1],
+            "dest_lat": CITY_COORDINATES[CITIES[destination]][0],
+            "dest_lon": CITY_COORDINATES[CITIES[destination]][1],
+            "temp_min": temp_min,
+            "temp_max": temp_max,
+            "scheduled_delivery_time": timestamp + pd.Timedelta(hours=int(rng.integers(24, 96))),
+        }
+        queries.append((shipment_info, int(rng.integers(*DEST_THRESHOLD_RANGE_KM, endpoint=True)),
+                        int(rng.integers(*TIME_THRESHOLD_RANGE_HOURS, endpoint=True))))
+    return queries
+
+def benchmark_size(num_rows, num_queries=DEFAULT_QUERIES, scalar_calls=DEFAULT_SCALAR_CALLS, seed=0,
+                   data_dir=DEFAULT_DATA_DIR, load_repeats=3):
+    """
+    Benchmark every stage on one fleet size
+
+    Stages: load_data from the CSV (cold, without the columnar cache) and from the
+    cache, recommend_best_matches on the query mix, and calculate_match_score and
+    calculate_carbon_impact on single (request, truck) pairs.
+
+    Returns:
+    - Dict with the fleet size, generation time and one summary per stage
+    """
+    start = time.perf_counter()
+    path = fleet_csv(num_rows, seed, data_dir)
+    prepare_s = time.perf_counter() - start
+
+    stages = {}
+    # Loaded fleets are dropped right away so the peak RSS is that of one load
+    stages["load_data_csv"], _ = run_stage([lambda: len(load_data(path, use_cache=False))] * load_repeats)
+    # The first cached load builds the artifact; time only the loads that reuse it
+    df = load_data(path)
+    stages["load_data_cached"], _ = run_stage([lambda: len(load_data(path))] * load_repeats)
+
+    queries = query_mix(df, num_queries, seed)
+    # Warm-up: the first query pays for lazy index structures
+    recommend_best_matches(queries[0][0], df, GOODS_TYPES)
+    stages["recommend_best_matches"], recommendations = run_stage([
+        lambda shipment_info=shipment_info, dest=dest, hours=hours: recommend_best_matches(
+            shipment_info, df, GOODS_TYPES, num_recommendations=10,
+            dest_threshold_km=dest, time_threshold_hours=hours)
+        for shipment_info, dest, hours in queries
+    ])
+
+    rng = np.random.default_rng(seed)
+    pairs = [(queries[rng.integers(len(queries))], df.iloc[int(rng.integers(len(df)))].to_dict())
+             for _ in range(scalar_calls)]
+    stages["calculate_match_score"], _ = run_stage([
+        lambda query=query, row=row: calculate_match_score(query[0], row, query[1]) for query, row in pairs
+    ])
+    stages["calculate_carbon_impact"], _ = run_stage([
+        lambda query=query, row=row: calculate_carbon_impact(
+            dict(query[0], carbon_footprint_per_km=1.0), row) for query, row in pairs
+    ])
+
+    matched = [recs for recs in recommendations if recs]
+    return {
+        "rows": num_rows,
+        "prepare_s": prepare_s,
+        "queries": num_queries,
+        "queries_with_matches": len(matched),
+        "fallback_rate": sum(any(rec.get("exceeds_threshold", False) for rec in recs) for recs in matched)
+                         / max(len(matched), 1),
+        "stages": stages,
+    }
+
+def run_benchmarks(sizes=DEFAULT_SIZES, num_queries=DEFAULT_QUERIES, scalar_calls=DEFAULT_SCALAR_CALLS, seed=0,
+                   data_dir=DEFAULT_DATA_DIR):
+    """Benchmark every fleet size and return the results with the run's environment"""
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "seed": seed,
+        "results": [benchmark_size(num_rows, num_queries, scalar_calls, seed, data_dir) for num_rows in sizes],
+    }
+
+# Run: python benchmarks/benchmark_matching.py [--sizes 25000,250000] [--output results.json]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the matching engine across fleet sizes")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated fleet sizes")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES, help="recommend queries per fleet size")
+    parser.add_argument("--scalar-calls", type=int, default=DEFAULT_SCALAR_CALLS,
+                        help="calls of calculate_match_score and calculate_carbon_impact per fleet size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where generated fleet CSVs are kept")
+    parser.add_argument("--output", default=f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    args = parser.parse_args()
+
+    report = run_benchmarks([int(size) for size in args.sizes.split(",")], args.queries, args.scalar_calls,
+                            args.seed, args.data_dir)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for result in report["results"]:
+        print(f"\n{result['rows']} rows")
+        for stage, summary in result["stages"].items():
+            print(f"  {stage:<24} p50 {summary['p50_ms']:9.3f} ms  p95 {summary['p95_ms']:9.3f} ms  "
+                  f"p99 {summary['p99_ms']:9.3f} ms  {summary['throughput_per_s']:10.2f}/s  "
+                  f"peak {summary['peak_rss_mb']:.0f} MB")
+    print(f"\nWrote {args.output}")
@@ -0,0 +1,44 @@
+import pandas as pd
+
+from backend_model.supply_chain_algorithm import (
+    are_goods_compatible, calculate_distance, calculate_match_score, is_temp_compatible,
+)
+
+def baseline_candidates(shipment_info, all_shipments, goods_types_dict, dest_threshold_km=50,
+                        time_threshold_hours=48):
+    """
+    Row-by-row candidate search of the original recommend_best_matches
+
+    Returns:
+    - (matches, nearest): rows inside the destination threshold, and the nearest
+      compatible row (None if there is none) with its distance in "distance"
+    """
+    potential_matches = all_shipments[
+        (all_shipments["storage_left"] >= shipment_info["units"]) &
+        (all_shipments["shipment_id"] != shipment_info.get("shipment_id", "")) &
+        (abs((all_shipments["timestamp"] - pd.Timestamp(shipment_info["timestamp"])).dt.total_seconds() / 3600)
+         <= time_threshold_hours)
+    ]
+
+    matches = []
+    nearest, nearest_distance = None, float("inf")
+    for _, match in potential_matches.iterrows():
+        if not are_goods_compatible(shipment_info["goods_type"], match["goods_type"], goods_types_dict):
+            continue
+        if not is_temp_compatible((shipment_info["temp_min"], shipment_info["temp_max"]),
+                                  (match["temp_min"], match["temp_max"])):
+            continue
+        dest_distance = calculate_distance(shipment_info["dest_lat"], shipment_info["dest_lon"],
+                                           match["dest_lat"], match["dest_lon"])
+        if dest_distance < nearest_distance:
+            nearest_distance = dest_distance
+            nearest = match.copy()
+            nearest["distance"] = dest_distance
+        if dest_distance <= dest_threshold_km:
+            matches.append(match)
+    return matches, nearest
+
+def baseline_scores(shipment_info, matches, dest_threshold_km=50):
+    """Scores of the original per-row calculate_match_score, by shipment_id"""
+    return {match["shipment_id"]: calculate_match_score(shipment_info, match, dest_threshold_km)
+            for match in matches}
@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Make the backend_model package and the dataset generator importable
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "dataset"))
+
+from Final_Dataset2 import generate_fleet
+from backend_model.goods_compatibility import GOODS_TYPES
+from backend_model.supply_chain_algorithm import load_data, recommend_best_matches
+
+# Small seeded fleet, so every run sees the same rows
+FLEET_ROWS = 3000
+FLEET_SEED = 7
+REFERENCE_DATE = "2024-12-20 12:00:00"
+
+@pytest.fixture(scope="session")
+def fleet_csv(tmp_path_factory):
+    """Path of a generated fleet CSV shared by the whole test session"""
+    path = tmp_path_factory.mktemp("fleet") / "fleet.csv"
+    generate_fleet(FLEET_ROWS, seed=FLEET_SEED, reference_date=REFERENCE_DATE).to_csv(path, index=False)
+    return str(path)
+
+@pytest.fixture
+def fleet(fleet_csv):
+    """A freshly loaded fleet DataFrame (tests may edit it)"""
+    return load_data(fleet_csv, use_cache=False)
+
+def shipment_info(df, position, units=5):
+    """Shipment request built from one row of the fleet"""
+    info = df.iloc[position].to_dict()
+    info["shipment_id"] = "TEST-SHIPMENT"
+    info["units"] = units
+    return info
+
+# Fleet rows the test requests are built from, with the units they ask for
+REQUEST_ROWS = [(0, 5), (17, 50), (250, 5), (901, 120), (1500, 20), (1999, 5), (2500, 300), (2999, 10)]
+
+@pytest.fixture
+def goods_types():
+    return GOODS_TYPES
+
+@pytest.fixture
+def requests_df(fleet):
+    """Shipment requests built from fleet rows, plus one with no truck near its destination"""
+    requests = [shipment_info(fleet, position, units) for position, units in REQUEST_ROWS]
+    far_away = shipment_info(fleet, 42)
+    far_away["dest_lat"] += 20.0
+    requests.append(far_away)
+    for number, request in enumerate(requests):
+        request["shipment_id"] = f"TEST-{number:03d}"
+    return pd.DataFrame(requests)
+
+def reference_recommendations(requests_df, fleet, k=5, dest_threshold_km=50, time_threshold_hours=48):
+    """recommend_best_matches for every request, the results other matchers must reproduce"""
+    return [recommend_best_matches(request, fleet, GOODS_TYPES, k, dest_threshold_km, time_threshold_hours)
+            for request in requests_df.to_dict("records")]
@@ -0,0 +1,14 @@
+import pytest
+
+from backend_model.batch_matching import recommend_batch
+from backend_model.shipment_index import get_shipment_index
+from tests.conftest import reference_recommendations
+
+@pytest.mark.parametrize("k, dest_threshold_km, time_threshold_hours", [(5, 50, 48), (3, 400, 240)])
+def test_batch_matches_single_requests(requests_df, fleet, k, dest_threshold_km, time_threshold_hours):
+    expected = reference_recommendations(requests_df, fleet, k, dest_threshold_km, time_threshold_hours)
+    assert recommend_batch(requests_df, fleet, k, dest_threshold_km, time_threshold_hours) == expected
+
+def test_small_memory_budget_gives_same_results(requests_df, fleet):
+    expected = reference_recommendations(requests_df, fleet, 5, 400, 240)
+    assert recommend_batch(requests_df, get_shipment_index(fleet), 5, 400, 240, memory_budget_mb=0.01) == expected
@@ -0,0 +1,65 @@
+import os
+import shutil
+
+import pytest
+
+from backend_model.dataset_cache import fresh_manifest, load_cached_dataset
+from backend_model.metrics import get_loader_metrics
+from backend_model.supply_chain_algorithm import load_data, read_dataset_csv
+
+pytest.importorskip("pyarrow")
+
+@pytest.fixture
+def csv_copy(fleet_csv, tmp_path):
+    """A private copy of the fleet CSV, so each test starts without a cache"""
+    path = str(tmp_path / "fleet.csv")
+    shutil.copy(fleet_csv, path)
+    return path
+
+def test_cached_load_matches_csv(csv_copy):
+    df, status = load_cached_dataset(csv_copy, read_dataset_csv)
+    assert status == "rebuild"
+    cached, status = load_cached_dataset(csv_copy, read_dataset_csv)
+    assert status == "hit"
+    assert cached.equals(read_dataset_csv(csv_copy))
+    assert df.equals(cached)
+
+def test_changed_csv_invalidates_cache(csv_copy):
+    load_cached_dataset(csv_copy, read_dataset_csv)
+    old_manifest = fresh_manifest(csv_copy)
+    with open(csv_copy) as f:
+        lines = f.readlines()
+    with open(csv_copy, "w") as f:
+        f.writelines(lines[:-10])
+
+    assert fresh_manifest(csv_copy) is None
+    df, status = load_cached_dataset(csv_copy, read_dataset_csv)
+    assert status == "rebuild"
+    assert len(df) == len(lines) - 11
+    assert fresh_manifest(csv_copy)["sha256"] != old_manifest["sha256"]
+
+def test_touched_csv_with_same_content_stays_cached(csv_copy):
+    load_cached_dataset(csv_copy, read_dataset_csv)
+    stat = os.stat(csv_copy)
+    os.utime(csv_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_cached_dataset(csv_copy, read_dataset_csv)[1] == "hit"
+
+def test_unwritable_cache_falls_back_to_csv(csv_copy, monkeypatch):
+    import backend_model.dataset_cache as dataset_cache
+
+    def fail(*args, **kwargs):
+        raise OSError("read-only")
+    monkeypatch.setattr(dataset_cache, "build_dataset_cache", fail)
+    df, status = load_cached_dataset(csv_copy, read_dataset_csv)
+    assert status == "csv"
+    assert len(df) > 0
+
+def test_load_data_counts_cache_requests_once(csv_copy):
+    metrics = get_loader_metrics()
+    hits, misses = metrics.cache_hits.value, metrics.cache_misses.value
+    csv_loads, cache_loads = metrics.load_seconds["csv"].count, metrics.load_seconds["cache"].count
+    load_data(csv_copy)
+    load_data(csv_copy)
+    assert (metrics.cache_hits.value - hits, metrics.cache_misses.value - misses) == (1, 1)
+    assert metrics.load_seconds["csv"].count - csv_loads == 1
+    assert metrics.load_seconds["cache"].count - cache_loads == 1
@@ -0,0 +1,28 @@
+import pytest
+
+import Final_Dataset2
+from Final_Dataset2 import generate_fleet, generate_sharded_dataset, load_sharded_dataset
+from backend_model.goods_compatibility import GOODS_TYPES
+
+REFERENCE_DATE = "2024-12-20 12:00:00"
+
+def test_same_seed_gives_same_rows():
+    first = generate_fleet(500, seed=11, reference_date=REFERENCE_DATE)
+    assert first.equals(generate_fleet(500, seed=11, reference_date=REFERENCE_DATE))
+    assert not first.equals(generate_fleet(500, seed=12, reference_date=REFERENCE_DATE))
+    assert first["shipment_id"].is_unique
+
+def test_sharded_output_does_not_depend_on_workers(tmp_path):
+    pytest.importorskip("pyarrow")
+    generate_sharded_dataset(900, str(tmp_path / "one"), seed=5, workers=1, shard_rows=250,
+                             reference_date=REFERENCE_DATE)
+    generate_sharded_dataset(900, str(tmp_path / "two"), seed=5, workers=2, shard_rows=250,
+                             reference_date=REFERENCE_DATE)
+    one, two = load_sharded_dataset(str(tmp_path / "one")), load_sharded_dataset(str(tmp_path / "two"))
+    assert len(one) == 900
+    assert one.equals(two)
+    assert one["shipment_id"].is_unique
+
+def test_generator_goods_types_match_matcher():
+    # The generator keeps its own copy so it runs without the backend_model package
+    assert Final_Dataset2.GOODS_TYPES == GOODS_TYPES
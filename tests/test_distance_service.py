@@ -0,0 +1,26 @@
+import pytest
+
+from Final_Dataset2 import CITIES, CITY_COORDINATES
+from backend_model.distance_service import DistanceService, get_distance_service
+from backend_model.supply_chain_algorithm import calculate_distance
+
+def test_float64_city_coordinates_hit_matrix_after_load(fleet):
+    # load_data stores coordinates as float32 and registers them with the service
+    assert fleet["source_lat"].dtype == "float32"
+    service = get_distance_service()
+    service.clear()
+    first, second = CITY_COORDINATES[CITIES[0]], CITY_COORDINATES[CITIES[1]]
+    calculate_distance(first[0], first[1], second[0], second[1])
+    assert service.stats()["matrix_hits"] == 1
+    assert service.stats()["misses"] == 0
+
+def test_matrix_distance_matches_uncached_distance():
+    from geopy.distance import geodesic
+
+    service = DistanceService()
+    lats = [CITY_COORDINATES[city][0] for city in CITIES]
+    lons = [CITY_COORDINATES[city][1] for city in CITIES]
+    assert service.register_points(lats, lons)
+    first, second = CITY_COORDINATES[CITIES[2]], CITY_COORDINATES[CITIES[5]]
+    assert service.distance(*first, *second) == pytest.approx(geodesic(first, second).kilometers, abs=0.01)
+    assert service.stats()["matrix_hits"] == 1
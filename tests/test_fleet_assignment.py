@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from backend_model.batch_matching import recommend_batch
+from backend_model.fleet_assignment import assign_shipments
+
+@pytest.fixture
+def crowded_requests(fleet):
+    """Many large requests competing for the same trucks"""
+    requests = fleet.sample(400, random_state=3).reset_index(drop=True)
+    requests["shipment_id"] = [f"REQ-{number:04d}" for number in range(len(requests))]
+    requests["units"] = np.random.default_rng(3).integers(50, 300, len(requests)).astype(float)
+    return requests
+
+def test_assignment_never_exceeds_capacity(crowded_requests, fleet):
+    result = assign_shipments(crowded_requests, fleet, 10, 400, 240)
+    assignments = result["assignments"]
+    assert len(assignments) > 0 and result["unassigned"]
+    assert assignments["request"].is_unique
+    assert len(assignments) + len(result["unassigned"]) == len(crowded_requests)
+
+    capacity = fleet.set_index("shipment_id")["storage_left"]
+    used = assignments.groupby("truck_id")["units"].sum()
+    assert (used <= capacity[used.index] + 1e-9).all()
+    assert np.allclose(result["storage_left"][used.index], capacity[used.index] - used)
+    assert (result["storage_left"] >= 0).all()
+    assert result["total_score"] == pytest.approx(assignments["score"].sum())
+
+def test_assigned_pairs_are_recommended_matches(crowded_requests, fleet):
+    result = assign_shipments(crowded_requests, fleet, 10, 400, 240)
+    recommendations = recommend_batch(crowded_requests, fleet, 10, 400, 240)
+    for request, truck_id, score in result["assignments"][["request", "truck_id", "score"]].itertuples(index=False):
+        scores = {match["shipment_id"]: match["score"] for match in recommendations[request]}
+        assert scores[truck_id] == pytest.approx(score)
+        assert crowded_requests["units"][request] <= fleet.loc[fleet["shipment_id"] == truck_id, "storage_left"].iloc[0]
@@ -0,0 +1,54 @@
+import pandas as pd
+
+from backend_model.fleet_store import FleetSegment, FleetStore
+from backend_model.fleet_summary import FleetSummary
+from backend_model.supply_chain_algorithm import recommend_best_matches
+from tests.conftest import reference_recommendations
+
+def test_snapshot_matches_loaded_fleet(requests_df, fleet):
+    store = FleetStore()
+    for start in range(0, len(fleet), 700):
+        store.append(fleet.iloc[start:start + 700])
+    snapshot = store.snapshot()
+    assert snapshot.to_frame()["shipment_id"].tolist() == fleet["shipment_id"].tolist()
+
+    expected = reference_recommendations(requests_df, fleet, 5, 400, 240)
+    assert [snapshot.recommend(request, 5, 400, 240) for request in requests_df.to_dict("records")] == expected
+
+def test_updates_and_deletes_match_reloaded_fleet(requests_df, fleet, goods_types):
+    store = FleetStore(fleet)
+    before = store.snapshot()
+    first = store.recommend(requests_df.iloc[0].to_dict(), 5, 400, 240)
+
+    # Fill the best truck of the first request and remove the second best
+    store.update(first[0]["shipment_id"], storage_left=0.0)
+    store.delete(first[1]["shipment_id"])
+
+    edited = fleet[fleet["shipment_id"] != first[1]["shipment_id"]]
+    updated = edited["shipment_id"] == first[0]["shipment_id"]
+    edited = pd.concat([edited[~updated], edited[updated].assign(storage_left=0.0)], ignore_index=True)
+
+    snapshot = store.snapshot()
+    assert snapshot.to_frame()["shipment_id"].tolist() == edited["shipment_id"].tolist()
+    for request in requests_df.to_dict("records"):
+        assert snapshot.recommend(request, 5, 400, 240) == \
+            recommend_best_matches(dict(request), edited, goods_types, 5, 400, 240)
+
+    # Snapshots taken before the writes keep seeing the old fleet
+    assert before.recommend(requests_df.iloc[0].to_dict(), 5, 400, 240) == first
+    assert store.summary.to_dict() == FleetSummary.from_frame(edited).to_dict()
+
+def test_cascading_merge_builds_one_segment(fleet, monkeypatch):
+    import backend_model.fleet_store as fleet_store
+
+    store = FleetStore()
+    for start, end in ((0, 1000), (1000, 1400), (1400, 1550), (1550, 1610)):
+        store.append(fleet.iloc[start:end])
+    assert len(store.snapshot().segments) == 4
+
+    built = []
+    monkeypatch.setattr(fleet_store, "FleetSegment",
+                        lambda frame, goods_types_dict: built.append(len(frame)) or FleetSegment(frame, goods_types_dict))
+    store.append(fleet.iloc[1610:1640])
+    assert built == [1640]
+    assert store.snapshot().to_frame()["shipment_id"].tolist() == fleet["shipment_id"].iloc[:1640].tolist()
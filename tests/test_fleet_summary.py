@@ -0,0 +1,30 @@
+import numpy as np
+
+from backend_model.fleet_summary import HISTOGRAM_EDGES, FleetSummary, load_fleet_summary
+
+def test_summary_counts_are_exact(fleet):
+    summary = FleetSummary.from_frame(fleet)
+    assert summary.rows == len(fleet)
+    assert summary.available_trucks == int((fleet["storage_left"] >= 1).sum())
+    assert summary.goods_counts == fleet["goods_type"].value_counts().loc[lambda counts: counts > 0].to_dict()
+    assert summary.unique_companies == fleet["company"].nunique()
+
+    values = fleet["storage_left"].to_numpy(dtype=np.float64)
+    counts, _ = np.histogram(np.clip(values, 0, 500), HISTOGRAM_EDGES["storage_left"])
+    assert summary.histograms["storage_left"].tolist() == counts.tolist()
+
+def test_incremental_updates_match_rebuild(fleet):
+    summary = FleetSummary.from_frame(fleet.iloc[:2000])
+    summary.add(fleet.iloc[2000:])
+    summary.remove(fleet.iloc[:500])
+    assert summary.to_dict() == FleetSummary.from_frame(fleet.iloc[500:]).to_dict()
+
+def test_stored_summary_round_trips(fleet_csv, fleet, tmp_path):
+    from backend_model.dataset_cache import build_dataset_cache
+    from backend_model.supply_chain_algorithm import read_dataset_csv
+
+    cache_dir = str(tmp_path)
+    build_dataset_cache(fleet_csv, read_dataset_csv, cache_dir)
+    built = load_fleet_summary(fleet_csv, fleet, cache_dir)
+    # The second call reads the stored artifact and never looks at the frame
+    assert load_fleet_summary(fleet_csv, fleet.iloc[:0], cache_dir).to_dict() == built.to_dict()
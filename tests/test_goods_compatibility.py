@@ -0,0 +1,18 @@
+import pytest
+
+from backend_model.goods_compatibility import get_compatibility_registry
+from backend_model.supply_chain_algorithm import are_goods_compatible, is_temp_compatible
+
+@pytest.mark.parametrize("overlap_threshold", [0, 2, 5])
+def test_compatibility_masks_match_pairwise_checks(fleet, goods_types, overlap_threshold):
+    registry = get_compatibility_registry(goods_types)
+    goods_codes = registry.encode_goods(fleet["goods_type"].to_numpy())
+    temp_codes = registry.encode_temp_ranges(fleet["temp_min"].to_numpy(), fleet["temp_max"].to_numpy())
+    rows = fleet[["goods_type", "temp_min", "temp_max"]].drop_duplicates()
+
+    for goods_type, temp_min, temp_max in rows.itertuples(index=False):
+        mask = registry.compatible_mask(goods_type, (temp_min, temp_max), goods_codes, temp_codes, overlap_threshold)
+        expected = [are_goods_compatible(goods_type, other, goods_types) and
+                    is_temp_compatible((temp_min, temp_max), (other_min, other_max), overlap_threshold)
+                    for other, other_min, other_max in zip(fleet["goods_type"], fleet["temp_min"], fleet["temp_max"])]
+        assert mask.tolist() == expected
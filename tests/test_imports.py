@@ -0,0 +1,10 @@
+import subprocess
+import sys
+
+from tests.conftest import ROOT
+
+def test_matcher_import_defers_geopy():
+    # geopy is imported on the first distance the matrix and the cache do not cover
+    code = "import sys, backend_model.supply_chain_algorithm; print('geopy' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,46 @@
+import shutil
+
+import pytest
+
+from backend_model.scoring import SCORE_TOLERANCE
+from backend_model.supply_chain_algorithm import (
+    build_fleet_lookups, load_data, memory_report, recommend_best_matches,
+)
+from tests.conftest import reference_recommendations
+
+def test_cached_load_gives_identical_recommendations(requests_df, fleet, fleet_csv, tmp_path):
+    pytest.importorskip("pyarrow")
+    csv_path = str(tmp_path / "fleet.csv")
+    shutil.copy(fleet_csv, csv_path)
+    load_data(csv_path)  # builds the cache
+    cached = load_data(csv_path)
+    assert cached.equals(fleet)
+    assert reference_recommendations(requests_df, cached, 5, 400, 240) == \
+        reference_recommendations(requests_df, fleet, 5, 400, 240)
+
+def test_compact_layout_keeps_every_column(fleet, fleet_csv):
+    full = load_data(fleet_csv, compact=False, use_cache=False)
+    assert list(fleet.columns) == list(full.columns)
+    assert fleet["eta"].dtype.kind == "M"
+    assert (fleet["units"] == full["units"]).all()
+
+def test_compact_layout_keeps_recommendations(requests_df, fleet, fleet_csv, goods_types):
+    full = load_data(fleet_csv, compact=False, use_cache=False)
+    assert memory_report(fleet)["bytes"].sum() < memory_report(full)["bytes"].sum()
+    # float32 coordinates move trucks by about a metre: same matches, scores within tolerance
+    for request in requests_df.to_dict("records"):
+        compact = recommend_best_matches(dict(request), fleet, goods_types, len(fleet), 400, 240)
+        reference = {match["shipment_id"]: match["score"]
+                     for match in recommend_best_matches(dict(request), full, goods_types, len(fleet), 400, 240)}
+        assert {match["shipment_id"] for match in compact} == set(reference)
+        for match in compact:
+            assert match["score"] == pytest.approx(reference[match["shipment_id"]], abs=SCORE_TOLERANCE)
+
+def test_fleet_lookups_match_frame(fleet):
+    lookups = build_fleet_lookups(fleet)
+    assert lookups["companies"] == sorted(fleet["company"].unique())
+    assert lookups["cities"] == sorted(fleet["source"].unique())
+    assert lookups["goods_types"] == sorted(fleet["goods_type"].unique())
+    for city, (lat, lon) in lookups["city_coordinates"].items():
+        first = fleet[fleet["source"] == city].iloc[0]
+        assert (lat, lon) == (float(first["source_lat"]), float(first["source_lon"]))
@@ -0,0 +1,26 @@
+from backend_model.match_trace import MatchTrace
+from backend_model.metrics import get_matcher_metrics
+from backend_model.supply_chain_algorithm import recommend_best_matches
+from tests.conftest import shipment_info
+
+def test_trace_does_not_change_results(fleet, goods_types):
+    info = shipment_info(fleet, 17, 5)
+    trace = MatchTrace()
+    assert recommend_best_matches(dict(info), fleet, goods_types, 5, 400, 240, trace=trace) == \
+        recommend_best_matches(dict(info), fleet, goods_types, 5, 400, 240)
+    assert trace.to_dict()["stages"]
+
+def test_trace_sampling_is_opt_in(fleet, goods_types):
+    metrics = get_matcher_metrics()
+    info = shipment_info(fleet, 17, 5)
+    traced = metrics.traced.value
+    for _ in range(3):
+        recommend_best_matches(dict(info), fleet, goods_types, 5, 400, 240)
+    assert metrics.traced.value == traced
+
+    metrics.trace_every = 1
+    try:
+        recommend_best_matches(dict(info), fleet, goods_types, 5, 400, 240)
+    finally:
+        metrics.trace_every = 0
+    assert metrics.traced.value == traced + 1
@@ -0,0 +1,26 @@
+from backend_model import parallel_matching
+from backend_model.parallel_matching import ParallelMatcher, SharedFleet
+from backend_model.shipment_index import get_shipment_index
+from tests.conftest import reference_recommendations
+
+def test_sharded_matching_matches_single_process(requests_df, fleet):
+    expected = reference_recommendations(requests_df, fleet, 5, 400, 240)
+    with ParallelMatcher(fleet, workers=2, num_shards=3) as matcher:
+        assert matcher.recommend_batch(requests_df, 5, 400, 240) == expected
+        assert [matcher.recommend(request, 5, 400, 240) for request in requests_df.to_dict("records")] == expected
+
+def test_attaching_a_new_block_closes_the_old_one(fleet, goods_types):
+    index = get_shipment_index(fleet, goods_types)
+    first, second = SharedFleet(index, 2), SharedFleet(index, 2)
+    try:
+        parallel_matching._attached_columns(first.spec())
+        old_shm = parallel_matching._ATTACHED[first.shm.name][0]
+        parallel_matching._attached_columns(second.spec())
+        assert list(parallel_matching._ATTACHED) == [second.shm.name]
+        assert old_shm.buf is None
+
+        parallel_matching._close_attached()
+        assert not parallel_matching._ATTACHED
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from backend_model.partitioned_dataset import (
+    load_partitioned_dataset, recommend_from_partitions, write_partitioned_dataset,
+)
+from backend_model.supply_chain_algorithm import recommend_best_matches
+from tests.conftest import shipment_info
+
+pytest.importorskip("pyarrow")
+
+@pytest.fixture(scope="module")
+def partition_root(fleet_csv, tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("partitioned") / "fleet")
+    write_partitioned_dataset(fleet_csv, root)
+    return root
+
+def test_full_load_keeps_rows_and_order(partition_root, fleet):
+    loaded = load_partitioned_dataset(partition_root)
+    assert loaded["shipment_id"].tolist() == fleet["shipment_id"].tolist()
+
+@pytest.mark.parametrize("position", [0, 17, 250, 1999])
+def test_pruned_matches_equal_full_dataset(partition_root, fleet, goods_types, position):
+    info = shipment_info(fleet, position)
+    expected = recommend_best_matches(dict(info), fleet, goods_types, 5, 50, 48)
+    assert recommend_from_partitions(partition_root, dict(info), goods_types, 5, 50, 48) == expected
+
+def test_no_truck_in_radius_falls_back_like_full_dataset(partition_root, fleet, goods_types):
+    # Move the destination far from every city, so only the nearest-truck fallback can match
+    info = shipment_info(fleet, 42)
+    info["dest_lat"] += 20.0
+    expected = recommend_best_matches(dict(info), fleet, goods_types, 5, 50, 48)
+    assert len(expected) == 1 and expected[0]["exceeds_threshold"]
+
+    assert recommend_from_partitions(partition_root, dict(info), goods_types, 5, 50, 48) == expected
+    assert recommend_from_partitions(partition_root, dict(info), goods_types, 5, 50, 48, fallback=False) == []
+
+def test_failed_rewrite_keeps_previous_dataset(fleet, tmp_path):
+    root = str(tmp_path / "fleet")
+    write_partitioned_dataset(fleet.head(100), root)
+    with pytest.raises(KeyError):
+        write_partitioned_dataset(fleet.drop(columns="dest_lat"), root)
+    assert len(load_partitioned_dataset(root)) == 100
+    assert sorted(os.listdir(tmp_path)) == ["fleet"]
+
+    write_partitioned_dataset(fleet.head(50), root)
+    assert len(load_partitioned_dataset(root)) == 50
+    assert sorted(os.listdir(tmp_path)) == ["fleet"]
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from backend_model.scoring import SCORE_TOLERANCE, calculate_match_scores
+from backend_model.supply_chain_algorithm import calculate_distance, recommend_best_matches
+from tests.baseline import baseline_candidates, baseline_scores
+from tests.conftest import REQUEST_ROWS, shipment_info
+
+# Haversine and the geodesic differ by at most 0.6%, so the two searches may only
+# disagree about trucks this close to the destination threshold
+THRESHOLD_MARGIN = 0.006
+
+@pytest.mark.parametrize("position, units", REQUEST_ROWS)
+def test_vectorized_scores_within_tolerance(fleet, position, units):
+    info = shipment_info(fleet, position, units)
+    candidates = fleet.iloc[::7]
+    reference = baseline_scores(info, [row for _, row in candidates.iterrows()])
+    scores = calculate_match_scores(info, candidates)
+    differences = np.abs(scores - np.array([reference[shipment_id] for shipment_id in candidates["shipment_id"]]))
+    assert differences.max() <= SCORE_TOLERANCE
+
+@pytest.mark.parametrize("dest_threshold_km, time_threshold_hours", [(50, 48), (400, 240)])
+@pytest.mark.parametrize("position, units", REQUEST_ROWS)
+def test_recommendations_agree_with_row_by_row_matcher(fleet, goods_types, position, units, dest_threshold_km,
+                                                       time_threshold_hours):
+    info = shipment_info(fleet, position, units)
+    matches, nearest = baseline_candidates(info, fleet, goods_types, dest_threshold_km, time_threshold_hours)
+    reference = baseline_scores(info, matches, dest_threshold_km)
+    recommendations = recommend_best_matches(dict(info), fleet, goods_types, len(fleet), dest_threshold_km,
+                                             time_threshold_hours)
+
+    if not matches and nearest is None:
+        assert recommendations == []
+        return
+    if not matches:
+        assert len(recommendations) == 1 and recommendations[0]["exceeds_threshold"]
+        assert recommendations[0]["shipment_id"] == nearest["shipment_id"]
+        return
+
+    found = {match["shipment_id"]: match["score"] for match in recommendations}
+    for shipment_id in set(found) ^ set(reference):
+        row = fleet[fleet["shipment_id"] == shipment_id].iloc[0]
+        distance = calculate_distance(info["dest_lat"], info["dest_lon"], row["dest_lat"], row["dest_lon"])
+        assert abs(distance - dest_threshold_km) <= THRESHOLD_MARGIN * dest_threshold_km
+    for shipment_id in set(found) & set(reference):
+        assert found[shipment_id] == pytest.approx(reference[shipment_id], abs=SCORE_TOLERANCE)
+
+    scores = [match["score"] for match in recommendations]
+    assert scores == sorted(scores, reverse=True)
+
+def test_nearest_truck_fallback_matches_row_by_row_matcher(requests_df, fleet, goods_types):
+    info = requests_df.iloc[-1].to_dict()
+    matches, nearest = baseline_candidates(info, fleet, goods_types)
+    assert not matches and nearest is not None
+
+    recommendations = recommend_best_matches(dict(info), fleet, goods_types)
+    assert len(recommendations) == 1
+    assert recommendations[0]["exceeds_threshold"]
+    assert recommendations[0]["shipment_id"] == nearest["shipment_id"]
+    assert recommendations[0]["distance"] == pytest.approx(nearest["distance"], rel=THRESHOLD_MARGIN)
+
+def test_top_k_is_best_of_all_matches(fleet, goods_types):
+    info = shipment_info(fleet, 0, 5)
+    everything = recommend_best_matches(dict(info), fleet, goods_types, len(fleet), 400, 240)
+    top = recommend_best_matches(dict(info), fleet, goods_types, 5, 400, 240)
+    assert len(everything) > 5
+    assert top == everything[:5]
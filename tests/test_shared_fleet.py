@@ -0,0 +1,26 @@
+from backend_model.shared_fleet import FleetSubscriber, publish_fleet
+from backend_model.supply_chain_algorithm import build_fleet_lookups, recommend_best_matches
+from tests.conftest import reference_recommendations
+
+def test_attached_fleet_matches_in_process_index(requests_df, fleet, goods_types, tmp_path):
+    root = str(tmp_path / "shared")
+    publish_fleet(fleet, root, lookups=build_fleet_lookups(fleet))
+    attached = FleetSubscriber(root).current()
+
+    expected = reference_recommendations(requests_df, fleet, 5, 400, 240)
+    assert [recommend_best_matches(request, attached.index, goods_types, 5, 400, 240)
+            for request in requests_df.to_dict("records")] == expected
+    assert attached.lookups == build_fleet_lookups(fleet)
+
+def test_subscriber_switches_to_new_generation(fleet, tmp_path):
+    root = str(tmp_path / "shared")
+    subscriber = FleetSubscriber(root)
+    publish_fleet(fleet, root)
+    first = subscriber.current()
+    assert subscriber.current() is first
+
+    publish_fleet(fleet.iloc[:1000], root)
+    second = subscriber.current()
+    assert second.generation == first.generation + 1
+    assert len(second.index) == 1000
+    assert len(first.index) == len(fleet)
@@ -0,0 +1,39 @@
+import json
+
+from backend_model.shipment_index import get_shipment_index, invalidate_shipment_index
+from backend_model.supply_chain_algorithm import recommend_best_matches
+from tests.conftest import shipment_info
+
+def test_index_is_reused_while_fleet_is_unchanged(fleet):
+    assert get_shipment_index(fleet) is get_shipment_index(fleet)
+
+def test_invalidated_edit_rebuilds_index(fleet, goods_types):
+    info = shipment_info(fleet, 10)
+    before = recommend_best_matches(info, fleet, goods_types, 5, 100, 72)
+    assert before
+    index = get_shipment_index(fleet)
+
+    # Fill the best truck in place: same DataFrame object, same length
+    best = before[0]["shipment_id"]
+    fleet.loc[fleet["shipment_id"] == best, "storage_left"] = 0
+    invalidate_shipment_index(fleet)
+    after = recommend_best_matches(info, fleet, goods_types, 5, 100, 72)
+
+    assert get_shipment_index(fleet) is not index
+    assert best not in [match["shipment_id"] for match in after]
+
+def test_invalidate_forces_one_rebuild(fleet):
+    index = get_shipment_index(fleet)
+    invalidate_shipment_index(fleet)
+    rebuilt = get_shipment_index(fleet)
+    assert rebuilt is not index
+    assert get_shipment_index(fleet) is rebuilt
+
+def test_recommendations_are_json_serializable(fleet, goods_types):
+    recommendations = recommend_best_matches(shipment_info(fleet, 10), fleet, goods_types, 5, 100, 72)
+    assert recommendations
+    for match in recommendations:
+        for key in ("storage_left", "score", "carbon_footprint_per_km", "carbon_savings"):
+            assert type(match[key]) is float
+    # Delivery times stay Timestamps (the app formats them with .dt.strftime)
+    json.dumps(recommendations, default=str)
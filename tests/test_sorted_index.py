@@ -0,0 +1,13 @@
+import numpy as np
+
+from backend_model.sorted_index import FleetSortedIndex, to_epoch_ns
+
+def test_sorted_candidates_match_boolean_mask(fleet):
+    timestamp_ns = to_epoch_ns(fleet["timestamp"])
+    storage_left = fleet["storage_left"].to_numpy(np.float64)
+    index = FleetSortedIndex(timestamp_ns, storage_left)
+    for position, hours, units in ((0, 48, 5), (1000, 240, 300), (2500, 1, 1)):
+        window_ns = int(hours * 3.6e12)
+        low, high = timestamp_ns[position] - window_ns, timestamp_ns[position] + window_ns
+        expected = np.flatnonzero((timestamp_ns >= low) & (timestamp_ns <= high) & (storage_left >= units))
+        assert index.candidate_positions(low, high, units).tolist() == expected.tolist()
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from backend_model.spatial_index import SpatialGridIndex, haversine_distance
+
+@pytest.mark.parametrize("radius_km", [10, 50, 400, 3000])
+def test_radius_query_matches_full_scan(fleet, radius_km):
+    lat, lon = fleet["dest_lat"].to_numpy(np.float64), fleet["dest_lon"].to_numpy(np.float64)
+    grid = SpatialGridIndex(lat, lon)
+    for query in (0, 100, 2000):
+        positions, distances = grid.query_radius(lat[query] + 0.3, lon[query] - 0.2, radius_km)
+        all_distances = haversine_distance(lat[query] + 0.3, lon[query] - 0.2, lat, lon)
+        assert positions.tolist() == np.flatnonzero(all_distances <= radius_km).tolist()
+        assert np.allclose(distances, all_distances[positions])
+
+def test_nearest_matches_full_scan(fleet):
+    lat, lon = fleet["dest_lat"].to_numpy(np.float64), fleet["dest_lon"].to_numpy(np.float64)
+    grid = SpatialGridIndex(lat, lon)
+    position, distance = grid.nearest(lat[5] + 15.0, lon[5])
+    all_distances = haversine_distance(lat[5] + 15.0, lon[5], lat, lon)
+    assert position == int(np.argmin(all_distances))
+    assert distance == pytest.approx(all_distances.min())
@@ -0,0 +1,11 @@
+import pytest
+
+from backend_model.streaming_loader import stream_recommendations
+from tests.conftest import reference_recommendations
+
+@pytest.mark.parametrize("chunk_rows", [256, 1_000_000])
+def test_streaming_matches_loaded_dataset(requests_df, fleet, fleet_csv, chunk_rows):
+    expected = reference_recommendations(requests_df, fleet, 5, 400, 240)
+    streamed = [stream_recommendations(fleet_csv, request, 5, 400, 240, chunk_rows=chunk_rows)
+                for request in requests_df.to_dict("records")]
+    assert streamed == expected
@@ -0,0 +1,46 @@
+import pandas as pd
+
+from backend_model.supply_chain_algorithm import recommend_best_matches
+from backend_model.window_store import TimeWindowFleet
+
+def test_expired_trucks_are_not_matched(requests_df, fleet, goods_types):
+    now = fleet["scheduled_delivery_time"].median()
+    window = TimeWindowFleet(fleet, bucket_hours=6, now=fleet["scheduled_delivery_time"].min())
+    # Score ties are broken in bucket order, the order of to_frame
+    live = window.to_frame(now)
+    assert sorted(live["shipment_id"]) == sorted(fleet.loc[fleet["scheduled_delivery_time"] > now, "shipment_id"])
+
+    for request in requests_df.to_dict("records"):
+        expected = recommend_best_matches(dict(request), live, goods_types, 5, 400, 240)
+        assert window.recommend(request, 5, 400, 240, now=now) == expected
+    assert window.stats(now)["live_rows"] == len(live)
+    assert window.expired_rows > 0
+
+def test_live_rows_keep_expiry_order(fleet):
+    now = fleet["scheduled_delivery_time"].quantile(0.25)
+    window = TimeWindowFleet(fleet, bucket_hours=24, now=fleet["scheduled_delivery_time"].min())
+    expected = fleet[fleet["scheduled_delivery_time"] > now]
+    frame = window.to_frame(now)
+    assert sorted(frame["shipment_id"]) == sorted(expected["shipment_id"])
+    assert pd.Series(frame["scheduled_delivery_time"] > now).all()
+
+def test_eta_is_used_without_delivery_times(fleet):
+    fleet = fleet.drop(columns="scheduled_delivery_time")
+    now = fleet["eta"].median()
+    window = TimeWindowFleet(fleet, bucket_hours=6, now=fleet["eta"].min())
+    assert sorted(window.to_frame(now)["shipment_id"]) == sorted(fleet.loc[fleet["eta"] > now, "shipment_id"])
+
+def test_small_appends_leave_large_segments_alone(requests_df, fleet, goods_types):
+    start = fleet["scheduled_delivery_time"].min()
+    window = TimeWindowFleet(fleet.iloc[:2500], bucket_hours=24 * 365, now=start)
+    largest = window.segments()[0]
+    for position in range(2500, 2600):
+        window.append(fleet.iloc[[position]], now=start)
+    assert window.segments()[0] is largest
+    assert window.stats(start)["segments"] <= window.stats(start)["buckets"] * 8
+
+    live = window.to_frame(start)
+    assert sorted(live["shipment_id"]) == sorted(fleet["shipment_id"].iloc[:2600])
+    for request in requests_df.to_dict("records"):
+        assert window.recommend(request, 5, 400, 240, now=start) == \
+            recommend_best_matches(dict(request), live, goods_types, 5, 400, 240)